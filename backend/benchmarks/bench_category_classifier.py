@@ -0,0 +1,66 @@
+"""
+Benchmark: receipt line-item categorization on a labeled fixture set.
+
+Compares the CategoryClassifier against the keyword chain that used to live
+in router/receipts.py, for accuracy and batch throughput.
+
+Run from the backend directory:
+    python -m benchmarks.bench_category_classifier
+"""
+import json
+import os
+import time
+from services.category_classifier import CategoryClassifier
+
+FIXTURE_PATH = os.path.join(os.path.dirname(__file__), "fixtures", "category_labels.json")
+THROUGHPUT_ITEMS = 10_000
+
+
+def legacy_category(name: str) -> str:
+    """The original per-item keyword chain from upload_receipt"""
+    item_lower = name.lower()
+    if any(word in item_lower for word in ["milk", "cheese", "yogurt", "butter"]):
+        return "dairy"
+    elif any(word in item_lower for word in ["chicken", "beef", "pork", "fish", "meat"]):
+        return "meat"
+    elif any(word in item_lower for word in ["apple", "banana", "lettuce", "tomato", "vegetable", "fruit"]):
+        return "produce"
+    elif any(word in item_lower for word in ["frozen", "ice cream"]):
+        return "frozen"
+    return "pantry"
+
+
+def main():
+    with open(FIXTURE_PATH) as f:
+        fixtures = json.load(f)
+    names = [row["name"] for row in fixtures]
+    expected = [row["category"] for row in fixtures]
+
+    legacy = [legacy_category(name) for name in names]
+
+    classifier = CategoryClassifier()
+    start = time.perf_counter()
+    classifier.warm_up()
+    training = (time.perf_counter() - start) * 1000
+    predicted = classifier.classify_many(names)
+
+    legacy_accuracy = sum(a == b for a, b in zip(legacy, expected)) / len(expected)
+    accuracy = sum(p["category"] == e for p, e in zip(predicted, expected)) / len(expected)
+    print(f"Fixture set: {len(expected)} labeled items")
+    print(f"  legacy keyword chain accuracy: {legacy_accuracy:.1%}")
+    print(f"  CategoryClassifier accuracy:   {accuracy:.1%} (model training at startup {training:.0f} ms)")
+
+    misses = [(n, e, p["category"]) for n, e, p in zip(names, expected, predicted) if p["category"] != e]
+    for name, want, got in misses:
+        print(f"    miss: {name!r} expected {want}, got {got}")
+
+    # Throughput on distinct-looking names (defeats the resolution cache)
+    batch = [f"{names[i % len(names)]} {i}" for i in range(THROUGHPUT_ITEMS)]
+    start = time.perf_counter()
+    classifier.classify_many(batch)
+    elapsed = time.perf_counter() - start
+    print(f"Throughput: {THROUGHPUT_ITEMS} items in {elapsed * 1000:.0f} ms ({THROUGHPUT_ITEMS / elapsed:,.0f} items/s)")
+
+
+if __name__ == "__main__":
+    main()
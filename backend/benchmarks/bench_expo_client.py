@@ -0,0 +1,173 @@
+"""
+Benchmark: per-push latency of a fresh httpx client per call vs the pooled
+HTTP/2 client, against a local fake Expo server (TLS + HTTP/2).
+
+Run from the backend directory:
+    python -m benchmarks.bench_expo_client
+
+The fake server runs on loopback, so a handshake costs only CPU time; over a
+real network every avoided TCP+TLS handshake also saves two or three round
+trips to Expo.
+"""
+import asyncio
+import datetime
+import json
+import os
+import ssl
+import statistics
+import tempfile
+import threading
+import time
+import uuid
+
+import h2.config
+import h2.connection
+import h2.events
+import httpx
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from cryptography.x509.oid import NameOID
+
+PUSHES = 200
+HOST = "127.0.0.1"
+
+
+class FakeExpoProtocol(asyncio.Protocol):
+    """Minimal HTTP/2 server answering push requests with `ok` tickets"""
+
+    def __init__(self):
+        self.conn = h2.connection.H2Connection(
+            config=h2.config.H2Configuration(client_side=False, header_encoding="utf-8")
+        )
+        self.bodies = {}
+
+    def connection_made(self, transport):
+        self.transport = transport
+        self.conn.initiate_connection()
+        self.transport.write(self.conn.data_to_send())
+
+    def data_received(self, data):
+        for event in self.conn.receive_data(data):
+            if isinstance(event, h2.events.RequestReceived):
+                self.bodies[event.stream_id] = bytearray()
+            elif isinstance(event, h2.events.DataReceived):
+                self.bodies[event.stream_id] += event.data
+                self.conn.acknowledge_received_data(event.flow_controlled_length, event.stream_id)
+            elif isinstance(event, h2.events.StreamEnded):
+                self.respond(event.stream_id)
+        self.transport.write(self.conn.data_to_send())
+
+    def respond(self, stream_id):
+        payload = json.loads(bytes(self.bodies.pop(stream_id)) or b"{}")
+        if isinstance(payload, list):
+            data = [{"status": "ok", "id": str(uuid.uuid4())} for _ in payload]
+        else:
+            data = {"status": "ok", "id": str(uuid.uuid4())}
+        body = json.dumps({"data": data}).encode()
+        self.conn.send_headers(stream_id, [
+            (":status", "200"),
+            ("content-type", "application/json"),
+            ("content-length", str(len(body)))
+        ])
+        self.conn.send_data(stream_id, body, end_stream=True)
+
+
+def self_signed_context(directory: str) -> ssl.SSLContext:
+    """TLS context with a throwaway certificate for 127.0.0.1, advertising h2"""
+    key = ec.generate_private_key(ec.SECP256R1())
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, HOST)])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    cert = (
+        x509.CertificateBuilder()
+        .subject_name(name)
+        .issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now)
+        .not_valid_after(now + datetime.timedelta(days=1))
+        .sign(key, hashes.SHA256())
+    )
+    cert_path = os.path.join(directory, "cert.pem")
+    key_path = os.path.join(directory, "key.pem")
+    with open(cert_path, "wb") as f:
+        f.write(cert.public_bytes(serialization.Encoding.PEM))
+    with open(key_path, "wb") as f:
+        f.write(key.private_bytes(
+            serialization.Encoding.PEM,
+            serialization.PrivateFormat.PKCS8,
+            serialization.NoEncryption()
+        ))
+
+    context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+    context.load_cert_chain(cert_path, key_path)
+    context.set_alpn_protocols(["h2"])
+    return context
+
+
+def start_server(context: ssl.SSLContext) -> int:
+    """Run the fake server on its own event loop thread; returns the port"""
+    loop = asyncio.new_event_loop()
+    ready = threading.Event()
+    port = []
+
+    async def serve():
+        server = await loop.create_server(FakeExpoProtocol, HOST, 0, ssl=context)
+        port.append(server.sockets[0].getsockname()[1])
+        ready.set()
+        await server.serve_forever()
+
+    threading.Thread(target=lambda: loop.run_until_complete(serve()), daemon=True).start()
+    ready.wait()
+    return port[0]
+
+
+def summarize(label: str, timings):
+    timings = sorted(timings)
+    print(f"{label:<28} median {statistics.median(timings):6.2f} ms, "
+          f"p95 {timings[int(len(timings) * 0.95)]:6.2f} ms")
+
+
+async def run(url: str):
+    from services.notification_service import NotificationService
+
+    message = {"to": "ExponentPushToken[bench]", "title": "t", "body": "b", "data": {}}
+
+    # Previous behaviour: a new client (TCP + TLS handshake) for every push
+    fresh = []
+    for _ in range(PUSHES):
+        start = time.perf_counter()
+        async with httpx.AsyncClient(http2=True, verify=False) as client:
+            response = await client.post(url, json=message)
+            assert response.json()["data"]["status"] == "ok"
+        fresh.append((time.perf_counter() - start) * 1000)
+
+    await NotificationService.startup(NotificationService.build_client(verify=False))
+    service = NotificationService()
+    await service.send_push_notification("ExponentPushToken[bench]", "t", "b")  # open the connection
+
+    pooled = []
+    for _ in range(PUSHES):
+        start = time.perf_counter()
+        assert await service.send_push_notification("ExponentPushToken[bench]", "t", "b")
+        pooled.append((time.perf_counter() - start) * 1000)
+
+    http_version = (await service.client.post(url, json=message)).http_version
+    await NotificationService.shutdown()
+
+    summarize("fresh client per push", fresh)
+    summarize(f"pooled client ({http_version})", pooled)
+    print(f"per-push latency reduction: {statistics.median(fresh) / statistics.median(pooled):.1f}x")
+
+
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        port = start_server(self_signed_context(directory))
+    url = f"https://{HOST}:{port}/--/api/v2/push/send"
+    # NotificationService reads the endpoint at import time
+    os.environ["EXPO_PUSH_URL"] = url
+    asyncio.run(run(url))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+# Lets `pytest` run from the backend directory with the app's top-level imports (services, utils, ...)
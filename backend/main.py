@@ -1,6 +1,7 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
+import asyncio
 import os
 
 # Load environment variables
@@ -13,7 +14,8 @@ from router import (
     pantry_router,
     comparison_router,
     analytics_router,
-    notifications_router
+    notifications_router,
+    recipes_router
 )
 
 app = FastAPI(
@@ -38,6 +40,7 @@ app.include_router(pantry_router)
 app.include_router(comparison_router)
 app.include_router(analytics_router)
 app.include_router(notifications_router)
+app.include_router(recipes_router)
 
 
 @app.get("/")
@@ -60,10 +63,23 @@ async def startup_event():
     """Initialize services and start background tasks"""
     print("🚀 Aristos API starting up...")
     print("📱 Backend ready to serve requests")
-    # Background tasks for notifications will be handled separately
+    from services.notification_service import NotificationService
+    await NotificationService.startup()
+    # Train the receipt category model now rather than in the first upload
+    from services.category_classifier import CategoryClassifier
+    await asyncio.to_thread(CategoryClassifier().warm_up)
+    # Every worker runs the scheduler; job leases make sure each job fires on only one of them
+    if os.getenv("RUN_SCHEDULER", "true").lower() == "true":
+        from tasks.scheduled_tasks import start_scheduler
+        start_scheduler()
 
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """Cleanup on shutdown"""
     print("👋 Aristos API shutting down...")
+    if os.getenv("RUN_SCHEDULER", "true").lower() == "true":
+        from tasks.scheduled_tasks import stop_scheduler
+        stop_scheduler()
+    from services.notification_service import NotificationService
+    await NotificationService.shutdown()
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 from datetime import datetime
 from enum import Enum
 
@@ -32,3 +32,10 @@ class NotificationCreate(BaseModel):
 
 class PushTokenRegister(BaseModel):
     expo_push_token: str
+    device_id: Optional[str] = None  # Defaults to one derived from the token
+    platform: Optional[str] = None
+    device_name: Optional[str] = None
+
+
+class NotificationMarkRead(BaseModel):
+    notification_ids: List[str]
@@ -1,6 +1,7 @@
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, field_validator
 from typing import List, Optional
 from datetime import datetime
+from zoneinfo import ZoneInfo
 
 
 class UserPreferences(BaseModel):
@@ -8,6 +9,16 @@ class UserPreferences(BaseModel):
     daily_calorie_goal: int = 2000
     daily_budget: float = 50.0
     protein_goal: float = 150.0
+    timezone: str = "UTC"  # IANA name; notifications are scheduled at local time
+
+    @field_validator("timezone")
+    @classmethod
+    def validate_timezone(cls, value: str) -> str:
+        try:
+            ZoneInfo(value)
+        except Exception:
+            raise ValueError(f"Unknown timezone: {value}")
+        return value
 
 
 class User(BaseModel):
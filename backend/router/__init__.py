@@ -4,6 +4,7 @@ from .pantry import router as pantry_router
 from .comparison import router as comparison_router
 from .analytics import router as analytics_router
 from .notifications import router as notifications_router
+from .recipes import router as recipes_router
 
 __all__ = [
     "auth_router",
@@ -12,4 +13,5 @@ __all__ = [
     "comparison_router",
     "analytics_router",
     "notifications_router",
+    "recipes_router",
 ]
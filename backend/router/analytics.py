@@ -1,89 +1,211 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
 from services.firebase_service import FirebaseService
 from services.analytics_service import AnalyticsService
+from services.analytics_columns import ReceiptColumns, PantryColumns, GRANULARITIES, period_keys, period_window
+from services.analytics_cache import AnalyticsCache
 from middleware.auth import get_current_user
-from typing import Dict, Any
+from utils.dates import zone_of
+from typing import Dict, Any, Optional, Tuple, Callable, Awaitable
+import asyncio
 
 router = APIRouter(prefix="/api/analytics", tags=["analytics"])
 firebase_service = FirebaseService()
 analytics_service = AnalyticsService()
+analytics_cache = AnalyticsCache()
+
+DASHBOARD_SECTIONS = ("today", "spending", "calories", "waste", "savings")
+
+
+async def cached_response(
+    request: Request,
+    current_user: Dict[str, Any],
+    endpoint: str,
+    params: Tuple,
+    compute: Callable[[], Awaitable[Any]]
+) -> Response:
+    """
+    Serve an analytics result from the per-user cache, computing it on a
+    miss. Responses carry an ETag; a matching If-None-Match gets a 304.
+    """
+    etag = analytics_cache.etag(current_user, endpoint, params)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if analytics_cache.matches(request.headers.get("if-none-match"), etag):
+        analytics_cache.not_modified()
+        return Response(status_code=304, headers=headers)
+
+    content = analytics_cache.get(etag)
+    if content is None:
+        try:
+            content = jsonable_encoder(await compute())
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        analytics_cache.store(etag, content)
+    return JSONResponse(content=content, headers=headers)
+
+
+def get_consumed_items(user_id: str):
+    pantry_items = firebase_service.get_user_pantry(user_id)
+    return [item for item in pantry_items if item.get("consumed", False)]
+
+
+async def get_spending_from_rollups(current_user: Dict[str, Any], days: int, granularity: str) -> Dict[str, Any]:
+    """Spending series read from the user's rollups: at most MAX_POINTS + 1 documents for any horizon"""
+    zone = zone_of(current_user)
+    periods = period_keys(period_window(zone, days, granularity))
+    rollups = []
+    if periods:
+        rollups = await asyncio.to_thread(
+            firebase_service.get_spend_rollups, current_user["uid"], granularity, periods[0], periods[-1]
+        )
+    return analytics_service.spending_trends_from_rollups(rollups, days, granularity, zone)
+
+
+def resolve_granularity(days: int, granularity: Optional[str]) -> Tuple[int, str]:
+    """Clamp the horizon and pick a granularity that keeps the chart small"""
+    if granularity is not None and granularity not in GRANULARITIES:
+        raise HTTPException(status_code=400, detail=f"granularity must be one of: {', '.join(GRANULARITIES)}")
+    days = max(0, min(days, AnalyticsService.MAX_DAYS))
+    return days, analytics_service.choose_granularity(days, granularity)
 
 
 @router.get("/spending")
 async def get_spending_trends(
+    request: Request,
     current_user: Dict[str, Any] = Depends(get_current_user),
-    days: int = 14
+    days: int = 14,
+    granularity: Optional[str] = None
 ):
-    """Get spending trends over time"""
-    try:
-        receipts = firebase_service.get_user_receipts(current_user["uid"], limit=200)
-        trends = analytics_service.calculate_spending_trends(receipts, days)
-        return trends
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
+    """Get spending trends over time (day / week / month points; coarsened automatically for long horizons)"""
+    days, granularity = resolve_granularity(days, granularity)
+
+    async def compute():
+        return await get_spending_from_rollups(current_user, days, granularity)
+
+    return await cached_response(request, current_user, "spending", (days, granularity), compute)
 
 
 @router.get("/calories")
 async def get_calorie_trends(
+    request: Request,
     current_user: Dict[str, Any] = Depends(get_current_user),
     days: int = 14
 ):
     """Get calorie consumption trends"""
-    try:
-        receipts = firebase_service.get_user_receipts(current_user["uid"], limit=200)
-        
-        # Get consumed pantry items (you might want to add a filter for this in firebase_service)
-        pantry_items = firebase_service.get_user_pantry(current_user["uid"])
-        consumed_items = [item for item in pantry_items if item.get("consumed", False)]
-        
-        trends = analytics_service.calculate_calorie_trends(receipts, consumed_items, days)
-        return trends
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
+    async def compute():
+        consumed_items = await asyncio.to_thread(get_consumed_items, current_user["uid"])
+        return analytics_service.calculate_calorie_trends([], consumed_items, days, zone_of(current_user))
+
+    return await cached_response(request, current_user, "calories", (days,), compute)
 
 
 @router.get("/waste")
 async def get_waste_stats(
+    request: Request,
     current_user: Dict[str, Any] = Depends(get_current_user)
 ):
     """Get food waste statistics"""
-    try:
-        pantry_items = firebase_service.get_user_pantry(current_user["uid"])
-        stats = analytics_service.calculate_waste_stats(pantry_items)
-        return stats
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
+    async def compute():
+        pantry_items = await asyncio.to_thread(firebase_service.get_user_pantry, current_user["uid"])
+        return analytics_service.calculate_waste_stats(pantry_items, zone_of(current_user))
+
+    return await cached_response(request, current_user, "waste", (), compute)
 
 
 @router.get("/savings")
 async def get_savings_stats(
+    request: Request,
     current_user: Dict[str, Any] = Depends(get_current_user)
 ):
     """Get savings from home cooking vs delivery"""
-    try:
-        comparisons = firebase_service.get_user_comparisons(current_user["uid"], limit=200)
-        savings = analytics_service.calculate_savings(comparisons)
-        return savings
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
+    async def compute():
+        comparisons = await asyncio.to_thread(firebase_service.get_user_comparisons, current_user["uid"], 200)
+        return analytics_service.calculate_savings(comparisons)
+
+    return await cached_response(request, current_user, "savings", (), compute)
 
 
 @router.get("/today")
 async def get_today_summary(
+    request: Request,
     current_user: Dict[str, Any] = Depends(get_current_user)
 ):
     """Get today's summary statistics"""
-    try:
-        receipts = firebase_service.get_user_receipts(current_user["uid"], limit=50)
-        
-        # Get consumed pantry items
-        pantry_items = firebase_service.get_user_pantry(current_user["uid"])
-        consumed_items = [item for item in pantry_items if item.get("consumed", False)]
-        
-        # Get user's daily budget
-        budget = current_user.get("preferences", {}).get("daily_budget", 50.0)
-        
-        summary = analytics_service.get_today_summary(receipts, consumed_items, budget)
-        return summary
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
+    budget = current_user.get("preferences", {}).get("daily_budget", 50.0)
+
+    async def compute():
+        receipts, consumed_items = await asyncio.gather(
+            asyncio.to_thread(firebase_service.get_user_receipts, current_user["uid"], 50),
+            asyncio.to_thread(get_consumed_items, current_user["uid"])
+        )
+        return analytics_service.get_today_summary(receipts, consumed_items, budget, zone_of(current_user))
+
+    return await cached_response(request, current_user, "today", (budget,), compute)
+
+
+@router.get("/cache/stats")
+async def get_analytics_cache_stats(
+    current_user: Dict[str, Any] = Depends(get_current_user)
+):
+    """Get analytics cache hit rates"""
+    return analytics_cache.get_stats()
+
+
+@router.get("/dashboard")
+async def get_dashboard(
+    request: Request,
+    current_user: Dict[str, Any] = Depends(get_current_user),
+    days: int = 14,
+    sections: Optional[str] = None,
+    granularity: Optional[str] = None
+):
+    """
+    Everything the home screen needs in one call. Receipts, pantry and
+    comparisons are each read at most once, concurrently, and shared by all
+    requested sections (comma-separated `sections`, default: all).
+    """
+    requested = [s.strip() for s in sections.split(",") if s.strip()] if sections else list(DASHBOARD_SECTIONS)
+    unknown = [s for s in requested if s not in DASHBOARD_SECTIONS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown sections: {', '.join(unknown)}")
+    budget = current_user.get("preferences", {}).get("daily_budget", 50.0)
+    days, spending_granularity = resolve_granularity(days, granularity)
+
+    async def compute():
+        uid = current_user["uid"]
+        needs_receipts = "today" in requested
+        needs_pantry = any(s in requested for s in ("today", "calories", "waste"))
+        needs_comparisons = "savings" in requested
+
+        async def nothing():
+            return []
+
+        receipts, pantry_items, comparisons, spending = await asyncio.gather(
+            asyncio.to_thread(firebase_service.get_user_receipts, uid, 50) if needs_receipts else nothing(),
+            asyncio.to_thread(firebase_service.get_user_pantry, uid) if needs_pantry else nothing(),
+            asyncio.to_thread(firebase_service.get_user_comparisons, uid, 200) if needs_comparisons else nothing(),
+            get_spending_from_rollups(current_user, days, spending_granularity) if "spending" in requested else nothing()
+        )
+        # Convert each dataset to columns once; every section reduces over the same arrays.
+        # Unconsumed items have no consumed_date, so the full pantry serves the calorie sections too.
+        zone = zone_of(current_user)
+        receipts = ReceiptColumns(receipts, zone)
+        pantry = PantryColumns(pantry_items, zone)
+
+        dashboard = {}
+        if "today" in requested:
+            dashboard["today"] = analytics_service.get_today_summary(receipts, pantry, budget)
+        if "spending" in requested:
+            dashboard["spending"] = spending
+        if "calories" in requested:
+            dashboard["calories"] = analytics_service.calculate_calorie_trends(receipts, pantry, days)
+        if "waste" in requested:
+            dashboard["waste"] = analytics_service.calculate_waste_stats(pantry)
+        if "savings" in requested:
+            dashboard["savings"] = analytics_service.calculate_savings(comparisons)
+        return dashboard
+
+    return await cached_response(request, current_user, "dashboard", (days, spending_granularity, tuple(requested), budget), compute)
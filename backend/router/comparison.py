@@ -1,18 +1,21 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks
 from models.comparison import Comparison, ComparisonCreate, ComparisonResponse
 from services.firebase_service import FirebaseService
 from services.delivery_analyzer import DeliveryAnalyzer
+from services.achievement_engine import AchievementEngine
 from middleware.auth import get_current_user
 from typing import Dict, Any
 
 router = APIRouter(prefix="/api/compare", tags=["comparisons"])
 firebase_service = FirebaseService()
 delivery_analyzer = DeliveryAnalyzer()
+achievements = AchievementEngine(firebase_service)
 
 
 @router.post("/analyze", response_model=ComparisonResponse)
 async def analyze_delivery(
     comparison_data: ComparisonCreate,
+    background_tasks: BackgroundTasks,
     current_user: Dict[str, Any] = Depends(get_current_user)
 ):
     """Analyze delivery item and suggest home cooking alternative"""
@@ -73,6 +76,15 @@ async def analyze_delivery(
         comparison_id = firebase_service.create_comparison(current_user["uid"], comparison)
         comparison["comparison_id"] = comparison_id
         
+        if comparison_id:
+            background_tasks.add_task(
+                achievements.record,
+                current_user["uid"],
+                "comparison_saved",
+                {"event_id": comparison_id, "savings": comparison["savings"]},
+                current_user.get("preferences", {}).get("timezone")
+            )
+        
         return {
             "comparison": comparison,
             "recommendation": recommendation
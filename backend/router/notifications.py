@@ -1,14 +1,20 @@
-from fastapi import APIRouter, HTTPException, Depends
-from models.notification import Notification, NotificationCreate, PushTokenRegister
+from fastapi import APIRouter, HTTPException, Depends, Request
+from fastapi.responses import StreamingResponse
+from models.notification import Notification, NotificationCreate, PushTokenRegister, NotificationMarkRead
 from services.firebase_service import FirebaseService
 from services.notification_service import NotificationService
+from services.notification_broker import get_broker
 from middleware.auth import get_current_user
-from typing import Dict, Any
+from services.sse import SSE_HEADERS, format_sse
+from typing import Dict, Any, AsyncIterator
+import asyncio
 
 router = APIRouter(prefix="/api/notifications", tags=["notifications"])
 firebase_service = FirebaseService()
 notification_service = NotificationService()
 
+STREAM_KEEPALIVE_SECONDS = 25
+
 
 @router.get("/")
 async def get_notifications(
@@ -26,6 +32,85 @@ async def get_notifications(
         raise HTTPException(status_code=400, detail=str(e))
 
 
+@router.get("/stream")
+async def stream_notifications(
+    request: Request,
+    current_user: Dict[str, Any] = Depends(get_current_user)
+):
+    """
+    Stream notification events as Server-Sent Events: `unread_count` on
+    connect and after every change, `notification` for each new
+    notification and `read` ({notification_ids}) when some are marked read.
+    """
+    user_id = current_user["uid"]
+    broker = get_broker()
+    # Subscribe before reading the count so nothing created in between is missed
+    subscription = broker.subscribe(user_id)
+    initial_count = await asyncio.to_thread(firebase_service.get_unread_count, user_id)
+
+    async def events() -> AsyncIterator[str]:
+        unread = initial_count
+        try:
+            yield format_sse("unread_count", {"count": unread})
+            while not await request.is_disconnected():
+                try:
+                    event, data = await asyncio.wait_for(subscription.get(), STREAM_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    # SSE comment line keeps proxies from closing an idle connection
+                    yield ": keep-alive\n\n"
+                    continue
+                if event == "notification":
+                    unread += 1
+                elif event == "read":
+                    unread = max(0, unread - len(data.get("notification_ids", [])))
+                yield format_sse(event, data)
+                yield format_sse("unread_count", {"count": unread})
+        finally:
+            broker.unsubscribe(subscription)
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers=SSE_HEADERS)
+
+
+@router.get("/unread-count")
+async def get_unread_count(
+    current_user: Dict[str, Any] = Depends(get_current_user)
+):
+    """Get the number of unread notifications (one counter document read)"""
+    try:
+        return {"count": firebase_service.get_unread_count(current_user["uid"])}
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.put("/mark-read")
+async def mark_notifications_read(
+    request_data: NotificationMarkRead,
+    current_user: Dict[str, Any] = Depends(get_current_user)
+):
+    """Mark a list of notifications as read"""
+    try:
+        marked = firebase_service.mark_notifications_read(current_user["uid"], request_data.notification_ids)
+        if marked:
+            get_broker().publish(current_user["uid"], "read", {"notification_ids": marked})
+        return {"message": "Notifications marked as read", "count": len(marked)}
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.put("/mark-all-read")
+async def mark_all_notifications_read(
+    current_user: Dict[str, Any] = Depends(get_current_user)
+):
+    """Mark every unread notification as read"""
+    try:
+        marked = firebase_service.mark_all_notifications_read(current_user["uid"])
+        if marked:
+            get_broker().publish(current_user["uid"], "read", {"notification_ids": marked})
+        return {"message": "All notifications marked as read", "count": len(marked)}
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
 @router.put("/{notification_id}/read")
 async def mark_notification_read(
     notification_id: str,
@@ -33,11 +118,14 @@ async def mark_notification_read(
 ):
     """Mark a notification as read"""
     try:
-        success = firebase_service.mark_notification_read(notification_id)
+        changed = firebase_service.mark_notification_read(notification_id, current_user["uid"])
         
-        if not success:
+        if changed is None:
             raise HTTPException(status_code=500, detail="Failed to mark notification as read")
         
+        # Streams decrement their unread count on "read"; repeats of an already-read notification must not
+        if changed:
+            get_broker().publish(current_user["uid"], "read", {"notification_ids": [notification_id]})
         return {"message": "Notification marked as read"}
     except HTTPException:
         raise
@@ -54,7 +142,10 @@ async def register_push_token(
     try:
         success = firebase_service.save_push_token(
             current_user["uid"],
-            token_data.expo_push_token
+            token_data.expo_push_token,
+            device_id=token_data.device_id,
+            platform=token_data.platform,
+            device_name=token_data.device_name
         )
         
         if not success:
@@ -71,22 +162,28 @@ async def send_test_notification(
 ):
     """Send a test push notification"""
     try:
-        push_token = firebase_service.get_push_token(current_user["uid"])
+        push_tokens = firebase_service.get_push_tokens([current_user["uid"]]).get(current_user["uid"])
         
-        if not push_token:
+        if not push_tokens:
             raise HTTPException(status_code=404, detail="No push token registered")
         
-        success = await notification_service.send_push_notification(
-            push_token,
-            "🎉 Test Notification",
-            "This is a test notification from Aristos!",
-            {"type": "test"}
-        )
+        # One message per registered device
+        results = await notification_service.send_batch_notifications([
+            {
+                "token": token,
+                "user_id": current_user["uid"],
+                "title": "🎉 Test Notification",
+                "body": "This is a test notification from Aristos!",
+                "data": {"type": "test"}
+            }
+            for token in push_tokens
+        ])
+        success = any(results)
         
         if not success:
             raise HTTPException(status_code=500, detail="Failed to send notification")
         
-        return {"message": "Test notification sent successfully"}
+        return {"message": "Test notification sent successfully", "devices": len(results), "delivered": sum(results)}
     except HTTPException:
         raise
     except Exception as e:
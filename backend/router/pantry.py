@@ -1,14 +1,19 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks
 from models.ingredient import Ingredient, IngredientCreate, IngredientUpdate
 from services.firebase_service import FirebaseService
 from services.expiration_service import ExpirationService
+from services.ingredient_normalizer import IngredientNormalizer
+from services.achievement_engine import AchievementEngine
 from middleware.auth import get_current_user
+from utils.dates import to_utc, utc_now, zone_of
 from typing import Dict, Any, List, Optional
-from datetime import datetime, timedelta
+from datetime import timedelta
 
 router = APIRouter(prefix="/api/pantry", tags=["pantry"])
 firebase_service = FirebaseService()
 expiration_service = ExpirationService()
+ingredient_normalizer = IngredientNormalizer()
+achievements = AchievementEngine(firebase_service)
 
 
 @router.get("/")
@@ -21,15 +26,14 @@ async def get_pantry(
         items = firebase_service.get_user_pantry(current_user["uid"], category)
         
         # Add urgency level to each item
+        now = utc_now()
         for item in items:
-            exp_date = item.get("expiration_date")
-            if isinstance(exp_date, str):
-                exp_date = datetime.fromisoformat(exp_date.replace("Z", "+00:00"))
+            exp_date = to_utc(item.get("expiration_date"))
             
             if exp_date:
-                item["urgency"] = expiration_service.get_urgency_level(exp_date)
+                item["urgency"] = expiration_service.get_urgency_level(exp_date, now)
                 item["urgency_color"] = expiration_service.get_urgency_color(item["urgency"])
-                item["days_until_expiration"] = (exp_date - datetime.now()).days
+                item["days_until_expiration"] = (exp_date - now).days
         
         return items
         
@@ -44,19 +48,18 @@ async def get_expiring_items(
 ):
     """Get items expiring within specified days"""
     try:
-        cutoff_date = datetime.now() + timedelta(days=days)
+        cutoff_date = utc_now() + timedelta(days=days)
         items = firebase_service.get_expiring_items(current_user["uid"], cutoff_date)
         
         # Add urgency info
+        now = utc_now()
         for item in items:
-            exp_date = item.get("expiration_date")
-            if isinstance(exp_date, str):
-                exp_date = datetime.fromisoformat(exp_date.replace("Z", "+00:00"))
+            exp_date = to_utc(item.get("expiration_date"))
             
             if exp_date:
-                item["urgency"] = expiration_service.get_urgency_level(exp_date)
+                item["urgency"] = expiration_service.get_urgency_level(exp_date, now)
                 item["urgency_color"] = expiration_service.get_urgency_color(item["urgency"])
-                item["days_until_expiration"] = (exp_date - datetime.now()).days
+                item["days_until_expiration"] = (exp_date - now).days
         
         return items
         
@@ -71,22 +74,27 @@ async def add_pantry_item(
 ):
     """Manually add an item to pantry"""
     try:
-        # Set defaults
-        purchase_date = item_data.purchase_date or datetime.now()
+        # Set defaults; dates typed by the user are in their timezone, stored as UTC
+        zone = zone_of(current_user)
+        purchase_date = to_utc(item_data.purchase_date, zone) or utc_now()
+        resolved = ingredient_normalizer.resolve(item_data.name)
         
         # Estimate expiration if not provided
         if item_data.expiration_date:
-            expiration_date = item_data.expiration_date
+            expiration_date = to_utc(item_data.expiration_date, zone)
         else:
             expiration_date = expiration_service.estimate_expiration_date(
-                item_data.name,
+                resolved["name"] if resolved["confident"] else None,
                 item_data.category,
-                purchase_date
+                purchase_date,
+                resolved["modifiers"]
             )
         
         # Create pantry item
         pantry_item = {
             "name": item_data.name,
+            "canonical_id": resolved["id"] if resolved["confident"] else None,
+            "canonical_name": resolved["name"] if resolved["confident"] else None,
             "category": item_data.category,
             "quantity": item_data.quantity,
             "unit": item_data.unit,
@@ -122,7 +130,12 @@ async def update_pantry_item(
         if not update_data:
             raise HTTPException(status_code=400, detail="No update data provided")
         
-        success = firebase_service.update_pantry_item(item_id, update_data)
+        zone = zone_of(current_user)
+        for field in ("purchase_date", "expiration_date", "consumed_date"):
+            if update_data.get(field):
+                update_data[field] = to_utc(update_data[field], zone)
+        
+        success = firebase_service.update_pantry_item(item_id, update_data, current_user["uid"])
         
         if not success:
             raise HTTPException(status_code=500, detail="Failed to update item")
@@ -138,20 +151,29 @@ async def update_pantry_item(
 @router.post("/{item_id}/consume")
 async def mark_consumed(
     item_id: str,
+    background_tasks: BackgroundTasks,
     current_user: Dict[str, Any] = Depends(get_current_user)
 ):
     """Mark a pantry item as consumed"""
     try:
         update_data = {
             "consumed": True,
-            "consumed_date": datetime.now()
+            "consumed_date": utc_now()
         }
         
-        success = firebase_service.update_pantry_item(item_id, update_data)
+        success = firebase_service.update_pantry_item(item_id, update_data, current_user["uid"])
         
         if not success:
             raise HTTPException(status_code=500, detail="Failed to mark as consumed")
         
+        background_tasks.add_task(
+            achievements.record,
+            current_user["uid"],
+            "item_consumed",
+            {"event_id": item_id},
+            current_user.get("preferences", {}).get("timezone")
+        )
+        
         return {"message": "Item marked as consumed"}
         
     except Exception as e:
@@ -165,7 +187,7 @@ async def delete_pantry_item(
 ):
     """Delete a pantry item"""
     try:
-        success = firebase_service.delete_pantry_item(item_id)
+        success = firebase_service.delete_pantry_item(item_id, current_user["uid"])
         
         if not success:
             raise HTTPException(status_code=500, detail="Failed to delete item")
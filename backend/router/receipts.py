@@ -1,65 +1,110 @@
-from fastapi import APIRouter, HTTPException, Depends, UploadFile, File
+from fastapi import APIRouter, HTTPException, Depends, UploadFile, File, BackgroundTasks
 from models.receipt import Receipt, ReceiptCreate, ReceiptUpdate
 from services.firebase_service import FirebaseService
 from services.ocr_service import OCRService
+from services.ingredient_normalizer import IngredientNormalizer
+from services.category_classifier import CategoryClassifier
+from services.budget_alert_service import BudgetAlertService
+from services.achievement_engine import AchievementEngine
 from middleware.auth import get_current_user
+from utils.dates import to_utc, utc_now, zone_of
 from typing import Dict, Any, List
 import base64
 
 router = APIRouter(prefix="/api/receipts", tags=["receipts"])
 firebase_service = FirebaseService()
 ocr_service = OCRService()
+ingredient_normalizer = IngredientNormalizer()
+category_classifier = CategoryClassifier()
+budget_alerts = BudgetAlertService(firebase_service)
+achievements = AchievementEngine(firebase_service)
 
 
 @router.post("/upload")
 async def upload_receipt(
     receipt_data: ReceiptCreate,
+    background_tasks: BackgroundTasks,
     current_user: Dict[str, Any] = Depends(get_current_user)
 ):
     """Upload and process a receipt image"""
     try:
         # Process receipt with OCR
         processed_data = ocr_service.process_receipt(receipt_data.image_base64)
-        
+        # The printed date is the user's wall-clock time; store the instant in UTC
+        processed_data["purchase_date"] = to_utc(processed_data.get("purchase_date"), zone_of(current_user)) or utc_now()
+        
+        # Resolve each line item to a canonical ingredient once, up front. Partial
+        # matches ("apple" in "apple pie") aren't trusted: no canonical id, name,
+        # category or shelf life comes from them.
+        resolved_items = ingredient_normalizer.resolve_many(
+            [item["name"] for item in processed_data.get("items", [])]
+        )
+        for item, resolved in zip(processed_data.get("items", []), resolved_items):
+            item["canonical_id"] = resolved["id"] if resolved["confident"] else None
+            item["canonical_name"] = resolved["name"] if resolved["confident"] else None
+
         # Enhance with nutrition data
         if "items" in processed_data:
             processed_data["items"] = ocr_service.enhance_with_nutrition(processed_data["items"])
         
         # Create receipt in Firestore
-        receipt_id = firebase_service.create_receipt(current_user["uid"], processed_data)
+        receipt_id = firebase_service.create_receipt(current_user["uid"], processed_data, zone_of(current_user))
         
         if not receipt_id:
             raise HTTPException(status_code=500, detail="Failed to save receipt")
         
+        # Budget check runs after the response is sent
+        background_tasks.add_task(
+            budget_alerts.receipt_changed,
+            current_user["uid"],
+            current_user.get("preferences", {}),
+            receipt_id,
+            None,
+            processed_data
+        )
+        background_tasks.add_task(
+            achievements.record,
+            current_user["uid"],
+            "receipt_created",
+            {"event_id": receipt_id},
+            current_user.get("preferences", {}).get("timezone")
+        )
+        
         # Automatically add items to pantry
         if "items" in processed_data:
             from services.expiration_service import ExpirationService
-            from datetime import datetime
             
-            for item in processed_data["items"]:
-                # Determine category (simplified logic)
-                category = "pantry"  # Default
-                item_lower = item["name"].lower()
-                
-                if any(word in item_lower for word in ["milk", "cheese", "yogurt", "butter"]):
-                    category = "dairy"
-                elif any(word in item_lower for word in ["chicken", "beef", "pork", "fish", "meat"]):
-                    category = "meat"
-                elif any(word in item_lower for word in ["apple", "banana", "lettuce", "tomato", "vegetable", "fruit"]):
-                    category = "produce"
-                elif any(word in item_lower for word in ["frozen", "ice cream"]):
-                    category = "frozen"
-                
-                purchase_date = processed_data.get("purchase_date", datetime.now())
-                expiration_date = ExpirationService.estimate_expiration_date(
-                    item["name"],
-                    category,
-                    purchase_date
-                )
-                
-                pantry_item = {
+            # Categorize the whole receipt in one batch
+            classifications = category_classifier.classify_many(
+                [item["name"] for item in processed_data["items"]],
+                resolved_items
+            )
+            categories = [c["category"] for c in classifications]
+            
+            # Estimate shelf life for the whole receipt in one pass
+            purchase_date = processed_data["purchase_date"]
+            expiration_dates = ExpirationService.estimate_many(
+                [
+                    {
+                        "name": resolved["name"] if resolved["confident"] else None,
+                        "category": category,
+                        "modifiers": resolved["modifiers"]
+                    }
+                    for resolved, category in zip(resolved_items, categories)
+                ],
+                purchase_date
+            )
+            
+            pantry_items = []
+            for item, resolved, classification, expiration_date in zip(
+                processed_data["items"], resolved_items, classifications, expiration_dates
+            ):
+                pantry_items.append({
                     "name": item["name"],
-                    "category": category,
+                    "canonical_id": item["canonical_id"],
+                    "canonical_name": item["canonical_name"],
+                    "category": classification["category"],
+                    "category_confidence": classification["confidence"],
                     "quantity": item.get("quantity", 1.0),
                     "unit": item.get("unit", "item"),
                     "purchase_date": purchase_date,
@@ -68,9 +113,10 @@ async def upload_receipt(
                     "protein": item.get("protein", 0),
                     "receipt_id": receipt_id,
                     "consumed": False
-                }
-                
-                firebase_service.create_pantry_item(current_user["uid"], pantry_item)
+                })
+            
+            # One batched write for the whole receipt
+            firebase_service.create_pantry_items(current_user["uid"], pantry_items)
         
         processed_data["receipt_id"] = receipt_id
         return processed_data
@@ -121,6 +167,7 @@ async def get_receipt(
 async def update_receipt(
     receipt_id: str,
     receipt_update: ReceiptUpdate,
+    background_tasks: BackgroundTasks,
     current_user: Dict[str, Any] = Depends(get_current_user)
 ):
     """Update a receipt"""
@@ -134,11 +181,23 @@ async def update_receipt(
         
         # Update
         update_data = receipt_update.dict(exclude_unset=True)
-        success = firebase_service.update_receipt(receipt_id, update_data)
+        if update_data.get("purchase_date"):
+            update_data["purchase_date"] = to_utc(update_data["purchase_date"], zone_of(current_user))
+        success = firebase_service.update_receipt(receipt_id, update_data, current_user["uid"], zone_of(current_user))
         
         if not success:
             raise HTTPException(status_code=500, detail="Failed to update receipt")
         
+        if "total_amount" in update_data or "purchase_date" in update_data:
+            background_tasks.add_task(
+                budget_alerts.receipt_changed,
+                current_user["uid"],
+                current_user.get("preferences", {}),
+                receipt_id,
+                receipt,
+                {**receipt, **update_data}
+            )
+        
         return {"message": "Receipt updated successfully"}
         
     except HTTPException:
@@ -162,7 +221,7 @@ async def delete_receipt(
             raise HTTPException(status_code=403, detail="Not authorized")
         
         # Delete
-        success = firebase_service.delete_receipt(receipt_id)
+        success = firebase_service.delete_receipt(receipt_id, current_user["uid"])
         
         if not success:
             raise HTTPException(status_code=500, detail="Failed to delete receipt")
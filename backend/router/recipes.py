@@ -0,0 +1,89 @@
+from fastapi import APIRouter, HTTPException, Depends
+from fastapi.responses import StreamingResponse
+from services.firebase_service import FirebaseService
+from services.recipe_matcher import RecipeMatcher
+from services.recipe_cache import RecipeSuggestionCache
+from services.recipe_scorer import RecipeScorer
+from services.sse import SSE_HEADERS, sse_stream
+from middleware.auth import get_current_user
+from typing import Dict, Any
+import asyncio
+
+router = APIRouter(prefix="/api/recipes", tags=["recipes"])
+firebase_service = FirebaseService()
+recipe_matcher = RecipeMatcher()
+recipe_cache = RecipeSuggestionCache()
+
+
+@router.get("/suggestions")
+async def get_recipe_suggestions(
+    current_user: Dict[str, Any] = Depends(get_current_user)
+):
+    """
+    Get recipe suggestions for the user's pantry, served from the similarity
+    cache when possible and ranked by urgency-weighted pantry overlap
+    """
+    try:
+        # Pantry is ordered by expiration date, so the soonest-expiring come first
+        pantry_items = await asyncio.to_thread(firebase_service.get_user_pantry, current_user["uid"])
+        ingredients = [item["name"] for item in pantry_items[:15]]
+        restrictions = current_user.get("preferences", {}).get("dietary_restrictions", [])
+
+        # A miss runs the blocking OpenAI call; keep it off the event loop
+        recipes = await asyncio.to_thread(
+            recipe_cache.get_or_compute,
+            ingredients,
+            restrictions,
+            recipe_matcher.find_recipes_for_ingredients
+        )
+        # Cached suggestions may come from a similar pantry; order them by this user's expiring items
+        if not isinstance(recipes, list):
+            return recipes
+        return RecipeScorer.rank(recipes, pantry_items, "ingredients_needed")
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/cache/stats")
+async def get_recipe_cache_stats(
+    current_user: Dict[str, Any] = Depends(get_current_user)
+):
+    """Get recipe suggestion cache hit rates"""
+    return recipe_cache.get_stats()
+
+
+@router.get("/suggestions/stream")
+async def stream_recipe_suggestions(
+    current_user: Dict[str, Any] = Depends(get_current_user)
+):
+    """Stream recipe suggestions for the user's pantry, one `recipe` event per recipe"""
+    try:
+        pantry_items = await asyncio.to_thread(firebase_service.get_user_pantry, current_user["uid"])
+        ingredients = [item["name"] for item in pantry_items[:15]]
+        restrictions = current_user.get("preferences", {}).get("dietary_restrictions", [])
+
+        return StreamingResponse(
+            sse_stream("recipe", recipe_matcher.stream_recipes_for_ingredients(ingredients, restrictions)),
+            media_type="text/event-stream",
+            headers=SSE_HEADERS
+        )
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/meal-plan/stream")
+async def stream_meal_plan(
+    current_user: Dict[str, Any] = Depends(get_current_user),
+    days: int = 3
+):
+    """Stream a meal plan for the user's pantry, one `day` event per day"""
+    try:
+        pantry_items = await asyncio.to_thread(firebase_service.get_user_pantry, current_user["uid"])
+
+        return StreamingResponse(
+            sse_stream("day", recipe_matcher.stream_meal_plan(pantry_items, days)),
+            media_type="text/event-stream",
+            headers=SSE_HEADERS
+        )
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
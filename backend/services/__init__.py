@@ -6,6 +6,13 @@ from .notification_service import NotificationService
 from .analytics_service import AnalyticsService
 from .delivery_analyzer import DeliveryAnalyzer
 from .recipe_matcher import RecipeMatcher
+from .recipe_scorer import RecipeScorer
+from .recipe_cache import RecipeSuggestionCache
+from .ingredient_normalizer import IngredientNormalizer
+from .shelf_life_matcher import ShelfLifeMatcher
+from .category_classifier import CategoryClassifier
+from .budget_alert_service import BudgetAlertService
+from .achievement_engine import AchievementEngine
 
 __all__ = [
     "FirebaseService",
@@ -16,4 +23,11 @@ __all__ = [
     "AnalyticsService",
     "DeliveryAnalyzer",
     "RecipeMatcher",
+    "RecipeScorer",
+    "RecipeSuggestionCache",
+    "IngredientNormalizer",
+    "ShelfLifeMatcher",
+    "CategoryClassifier",
+    "BudgetAlertService",
+    "AchievementEngine",
 ]
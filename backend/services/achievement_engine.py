@@ -0,0 +1,184 @@
+from services.firebase_service import FirebaseService
+from services.notification_service import NotificationService
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple
+from utils.dates import local_date, user_zone, utc_now
+
+
+# Each achievement unlocks when `metric` reaches `target`. Only the rules
+# whose metric an event can move are checked for that event.
+ACHIEVEMENTS: List[Dict[str, Any]] = [
+    {"id": "first_receipt", "name": "First Receipt", "metric": "receipts", "target": 1,
+     "description": "You scanned your first receipt."},
+    {"id": "receipts_25", "name": "Receipt Regular", "metric": "receipts", "target": 25,
+     "description": "25 receipts scanned. Your spending picture is getting sharp!"},
+    {"id": "consumed_50", "name": "Clean Plate", "metric": "consumed", "target": 50,
+     "description": "50 pantry items eaten before they went bad."},
+    {"id": "cooking_streak_7", "name": "Home Cook Week", "metric": "consume_streak", "target": 7,
+     "description": "You ate from your pantry 7 days in a row."},
+    {"id": "waste_free_7", "name": "Zero Waste Week", "metric": "waste_free_days", "target": 7,
+     "description": "7 days without letting anything expire."},
+    {"id": "waste_free_30", "name": "Zero Waste Month", "metric": "waste_free_days", "target": 30,
+     "description": "30 days without letting anything expire. Impressive!"},
+    {"id": "first_comparison", "name": "Smart Shopper", "metric": "comparisons", "target": 1,
+     "description": "You compared a delivery order with cooking at home."},
+    {"id": "savings_100", "name": "$100 Saved", "metric": "savings", "target": 100,
+     "description": "You've saved $100 by cooking instead of ordering delivery."},
+]
+
+# Metrics each event can move. The waste-free streak grows with time, so
+# every event re-checks it; item_expired resets it.
+EVENT_METRICS: Dict[str, Tuple[str, ...]] = {
+    "receipt_created": ("receipts", "waste_free_days"),
+    "item_consumed": ("consumed", "consume_streak", "waste_free_days"),
+    "item_expired": ("expired",),
+    "comparison_saved": ("comparisons", "savings", "waste_free_days"),
+}
+
+
+class AchievementEngine:
+    """
+    Incremental achievements driven by domain events.
+
+    Each user has one compact state document (`achievement_state/{uid}`)
+    with running counters, the last day something expired and the current
+    consumption streak. An event updates that state and checks only the
+    rules it can affect, in one transaction, so the cost per event is
+    constant no matter how much history the user has. Newly unlocked
+    achievements are enqueued as notifications for the outbox worker.
+
+    Events that carry an `event_id` (receipt, item or comparison id) are
+    de-duplicated against the last RECENT_EVENTS ids of the same event
+    type, so retried requests and re-scanned expired items count once and a
+    burst of one event type can't evict the ids of another.
+    """
+
+    RECENT_EVENTS = 50
+
+    def __init__(
+        self,
+        firebase_service: Optional[FirebaseService] = None,
+        notification_service: Optional[NotificationService] = None
+    ):
+        self.firebase_service = firebase_service or FirebaseService()
+        self.notification_service = notification_service or NotificationService()
+
+    @staticmethod
+    def today(timezone_name: Optional[str] = None) -> str:
+        """Current day (YYYYMMDD) in the user's timezone"""
+        return f"{local_date(utc_now(), user_zone(timezone_name)):%Y%m%d}"
+
+    @staticmethod
+    def days_between(start: str, end: str) -> int:
+        return (datetime.strptime(end, "%Y%m%d").date() - datetime.strptime(start, "%Y%m%d").date()).days
+
+    @classmethod
+    def metric(cls, state: Dict[str, Any], name: str, day: str) -> float:
+        """Current value of one metric from the user's state"""
+        if name == "savings":
+            return state.get("savings", 0.0)
+        if name == "consume_streak":
+            return state.get("consume_streak", {}).get("length", 0)
+        if name == "waste_free_days":
+            since = state.get("last_waste_day") or state.get("first_day") or day
+            return cls.days_between(since, day)
+        return state.get("counters", {}).get(name, 0)
+
+    @classmethod
+    def apply(
+        cls,
+        state: Dict[str, Any],
+        event: str,
+        payload: Dict[str, Any],
+        day: str
+    ) -> List[Dict[str, Any]]:
+        """Fold one event into `state` (in place) and return the achievements it unlocks"""
+        event_id = payload.get("event_id")
+        if event_id:
+            recent = state.setdefault("recent_events", {}).setdefault(event, [])
+            if event_id in recent:
+                return []
+            recent.append(event_id)
+            del recent[:-cls.RECENT_EVENTS]
+
+        state.setdefault("first_day", day)
+        counters = state.setdefault("counters", {})
+
+        if event == "receipt_created":
+            counters["receipts"] = counters.get("receipts", 0) + 1
+        elif event == "item_consumed":
+            counters["consumed"] = counters.get("consumed", 0) + 1
+            streak = state.get("consume_streak", {})
+            if streak.get("day") != day:
+                continued = streak.get("day") and cls.days_between(streak["day"], day) == 1
+                state["consume_streak"] = {
+                    "day": day,
+                    "length": streak.get("length", 0) + 1 if continued else 1
+                }
+        elif event == "item_expired":
+            counters["expired"] = counters.get("expired", 0) + 1
+            state["last_waste_day"] = day
+        elif event == "comparison_saved":
+            counters["comparisons"] = counters.get("comparisons", 0) + 1
+            # Only positive savings count toward the total
+            state["savings"] = round(state.get("savings", 0.0) + max(float(payload.get("savings") or 0), 0.0), 2)
+        else:
+            return []
+
+        metrics = EVENT_METRICS[event]
+        unlocked = state.setdefault("unlocked", {})
+        newly_unlocked = []
+        for achievement in ACHIEVEMENTS:
+            if achievement["metric"] not in metrics or achievement["id"] in unlocked:
+                continue
+            if cls.metric(state, achievement["metric"], day) >= achievement["target"]:
+                unlocked[achievement["id"]] = day
+                newly_unlocked.append(achievement)
+        return newly_unlocked
+
+    def record(
+        self,
+        user_id: str,
+        event: str,
+        payload: Optional[Dict[str, Any]] = None,
+        timezone_name: Optional[str] = None
+    ) -> List[str]:
+        """Record one event for a user; returns the ids of newly unlocked achievements"""
+        return self.record_many(user_id, [(event, payload or {})], timezone_name)
+
+    def record_many(
+        self,
+        user_id: str,
+        events: List[Tuple[str, Dict[str, Any]]],
+        timezone_name: Optional[str] = None
+    ) -> List[str]:
+        """Record several events for one user in a single state update"""
+        day = self.today(timezone_name)
+
+        def update(state: Dict[str, Any]) -> List[Dict[str, Any]]:
+            unlocked = []
+            for event, payload in events:
+                unlocked.extend(self.apply(state, event, payload, day))
+            return unlocked
+
+        unlocked = self.firebase_service.update_achievement_state(user_id, update) or []
+        if not unlocked:
+            return []
+
+        records = []
+        for achievement in unlocked:
+            notif_data = self.notification_service.create_achievement_notification(
+                achievement["name"],
+                achievement["description"]
+            )
+            records.append({
+                "user_id": user_id,
+                "dedup_key": f"achievement:{user_id}:{achievement['id']}",
+                "type": "achievement",
+                "title": notif_data["title"],
+                "body": notif_data["body"],
+                "data": {"achievement_id": achievement["id"]}
+            })
+        self.firebase_service.enqueue_notifications(records)
+        print(f"🏆 {user_id} unlocked: {[a['id'] for a in unlocked]}")
+        return [achievement["id"] for achievement in unlocked]
@@ -0,0 +1,67 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+from utils.dates import local_date, utc_now, zone_of
+
+
+class AnalyticsCache:
+    """
+    Per-user cache of analytics responses.
+
+    Entries are keyed by an ETag derived from the user id, the user's
+    `analytics_version` (incremented by every FirebaseService write to
+    receipts, pantry items and comparisons), the endpoint, its parameters,
+    the current hour and the user's local date (trend windows and
+    expirations move with the clock, and days roll over in the user's
+    timezone, not on UTC hours).
+    A write therefore changes the ETag and old entries simply age out of the
+    LRU; nothing has to be deleted. The version comes from the user document
+    already loaded by authentication, so a hit costs no Firestore reads.
+    """
+
+    def __init__(self, max_entries: int = 5000):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "not_modified": 0}
+
+    @staticmethod
+    def etag(user: Dict[str, Any], endpoint: str, params: Tuple = ()) -> str:
+        version = user.get("analytics_version", 0)
+        now = utc_now()
+        key = f"{user['uid']}:{version}:{endpoint}:{params!r}:{now:%Y%m%d%H}:{local_date(now, zone_of(user))}"
+        return f'"{hashlib.sha1(key.encode()).hexdigest()[:24]}"'
+
+    @staticmethod
+    def matches(if_none_match: Optional[str], etag: str) -> bool:
+        """If-None-Match check (weak comparison, `*` matches anything)"""
+        if not if_none_match:
+            return False
+        tags = [tag.strip() for tag in if_none_match.split(",")]
+        return "*" in tags or etag in tags or f"W/{etag}" in tags
+
+    def get(self, etag: str) -> Optional[Any]:
+        with self._lock:
+            value = self._entries.get(etag)
+            if value is None:
+                self.stats["misses"] += 1
+                return None
+            self._entries.move_to_end(etag)
+            self.stats["hits"] += 1
+            return value
+
+    def store(self, etag: str, value: Any):
+        with self._lock:
+            self._entries[etag] = value
+            self._entries.move_to_end(etag)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def not_modified(self):
+        with self._lock:
+            self.stats["not_modified"] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self.stats, "entries": len(self._entries)}
@@ -0,0 +1,197 @@
+import numpy as np
+from typing import Dict, List, Any, Optional, Tuple, Union
+from datetime import date, datetime
+from zoneinfo import ZoneInfo
+from utils.dates import GRANULARITIES, local_date, to_utc, utc_now
+
+SECONDS_PER_DAY = 86400
+EPOCH = date(1970, 1, 1)
+DEFAULT_ZONE = ZoneInfo("UTC")
+OFFSET_STEP = 7 * SECONDS_PER_DAY  # no timezone changes its offset twice within a week
+
+
+def to_timestamp(value: Any, zone: Optional[ZoneInfo] = None) -> float:
+    """POSIX timestamp of a Firestore datetime or ISO string (naive values are wall-clock times in `zone`); NaN if missing"""
+    value = to_utc(value, zone)
+    return value.timestamp() if value is not None else np.nan
+
+
+def to_float(value: Any) -> float:
+    try:
+        return float(value or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def utc_offset(timestamp: float, zone: ZoneInfo) -> float:
+    return datetime.fromtimestamp(timestamp, zone).utcoffset().total_seconds()
+
+
+def utc_offsets(timestamps: np.ndarray, zone: ZoneInfo) -> np.ndarray:
+    """
+    UTC offset of `zone` (seconds) at each of the (non-NaN) timestamps.
+
+    The offset is sampled every OFFSET_STEP seconds across the range, and
+    each change between two samples (a DST switch) is bisected down to the
+    second, so a few hundred lookups cover years of history and every
+    timestamp gets the offset in force at that instant.
+    """
+    if not len(timestamps):
+        return np.zeros(0)
+    first, last = int(np.floor(timestamps.min())), int(np.ceil(timestamps.max()))
+    samples = list(range(first, last + OFFSET_STEP, OFFSET_STEP))
+    offsets = [utc_offset(sample, zone) for sample in samples]
+    transitions, values = [], [offsets[0]]
+    for lo, hi, before, after in zip(samples, samples[1:], offsets, offsets[1:]):
+        if before == after:
+            continue
+        while hi - lo > 1:
+            mid = (lo + hi) // 2
+            if utc_offset(mid, zone) == before:
+                lo = mid
+            else:
+                hi = mid
+        transitions.append(hi)
+        values.append(after)
+    return np.array(values)[np.searchsorted(np.array(transitions, dtype=np.float64), timestamps, side="right")]
+
+
+def epoch_days(timestamps: np.ndarray, zone: ZoneInfo = DEFAULT_ZONE) -> np.ndarray:
+    """Epoch day of each timestamp's local date in `zone`, -1 where the timestamp is missing"""
+    days = np.full(len(timestamps), -1, dtype=np.int64)
+    valid = ~np.isnan(timestamps)
+    if valid.any():
+        local = timestamps[valid] + utc_offsets(timestamps[valid], zone)
+        days[valid] = np.floor(local / SECONDS_PER_DAY).astype(np.int64)
+    return days
+
+
+def today_epoch_day(zone: ZoneInfo = DEFAULT_ZONE) -> int:
+    return (local_date(utc_now(), zone) - EPOCH).days
+
+
+def daily_sums(days: np.ndarray, values: np.ndarray, first_day: int, count: int) -> np.ndarray:
+    """Sum of `values` per day over [first_day, first_day + count)"""
+    index = days - first_day
+    in_window = (index >= 0) & (index < count)
+    return np.bincount(index[in_window], weights=values[in_window], minlength=count)
+
+
+def day_keys(first_day: int, count: int) -> List[str]:
+    """YYYY-MM-DD for each day in the window"""
+    return np.datetime_as_string(np.arange(first_day, first_day + count).astype("datetime64[D]")).tolist()
+
+
+def timestamps(documents: List[Dict[str, Any]], field: str, zone: Optional[ZoneInfo] = None) -> np.ndarray:
+    """Timestamp column for `field` (NaN where missing); a column of aware datetimes (what Firestore returns) takes the fast path"""
+    values = [doc.get(field) for doc in documents]
+    try:
+        if all(value.tzinfo is not None for value in values):
+            return np.fromiter(map(datetime.timestamp, values), dtype=np.float64, count=len(values))
+    except AttributeError:
+        pass
+    return np.array(
+        [value.timestamp() if isinstance(value, datetime) and value.tzinfo is not None else to_timestamp(value, zone)
+         for value in values],
+        dtype=np.float64
+    )
+
+
+def amounts(documents: List[Dict[str, Any]], field: str) -> np.ndarray:
+    """Numeric column for `field` (0 where missing or invalid)"""
+    values = [doc.get(field) or 0 for doc in documents]
+    try:
+        return np.array(values, dtype=np.float64)
+    except (TypeError, ValueError):
+        return np.array([to_float(value) for value in values], dtype=np.float64)
+
+
+class ReceiptColumns:
+    """Receipts as arrays: purchase day (in the user's timezone) and total amount"""
+
+    def __init__(self, receipts: List[Dict[str, Any]], zone: Optional[ZoneInfo] = None):
+        self.zone = zone or DEFAULT_ZONE
+        self.purchase_day = epoch_days(timestamps(receipts, "purchase_date", self.zone), self.zone)
+        self.amount = amounts(receipts, "total_amount")
+
+    def __len__(self) -> int:
+        return len(self.amount)
+
+    @classmethod
+    def of(
+        cls,
+        receipts: Union["ReceiptColumns", List[Dict[str, Any]]],
+        zone: Optional[ZoneInfo] = None
+    ) -> "ReceiptColumns":
+        return receipts if isinstance(receipts, cls) else cls(receipts, zone)
+
+
+class PantryColumns:
+    """
+    Pantry items as arrays: expiration timestamp, consumed flag, consumed
+    day in the user's timezone (-1 if never consumed), calories, protein and
+    a category code into `categories`.
+    """
+
+    def __init__(self, items: List[Dict[str, Any]], zone: Optional[ZoneInfo] = None):
+        self.zone = zone or DEFAULT_ZONE
+        self.expiration = timestamps(items, "expiration_date", self.zone)
+        self.consumed = np.array([bool(item.get("consumed", False)) for item in items], dtype=bool)
+        self.consumed_day = epoch_days(timestamps(items, "consumed_date", self.zone), self.zone)
+        self.calories = amounts(items, "calories")
+        self.protein = amounts(items, "protein")
+        codes: Dict[str, int] = {}
+        self.category_code = np.array(
+            [codes.setdefault(item.get("category") or "other", len(codes)) for item in items],
+            dtype=np.int64
+        )
+        self.categories = list(codes)
+
+    def __len__(self) -> int:
+        return len(self.consumed)
+
+    @classmethod
+    def of(
+        cls,
+        items: Union["PantryColumns", List[Dict[str, Any]]],
+        zone: Optional[ZoneInfo] = None
+    ) -> "PantryColumns":
+        return items if isinstance(items, cls) else cls(items, zone)
+
+
+def window(zone: ZoneInfo, days: int) -> Tuple[int, int]:
+    """First epoch day and length of the last `days` days in `zone`, today included"""
+    days = max(days, 0)
+    return today_epoch_day(zone) - days + 1, days
+
+
+def period_starts(days: np.ndarray, granularity: str) -> np.ndarray:
+    """Epoch day on which the day / week (Monday) / month containing each epoch day starts"""
+    if granularity == "week":
+        # Epoch day 4 (1970-01-05) was a Monday
+        return days - (days - 4) % 7
+    if granularity == "month":
+        return days.astype("datetime64[D]").astype("datetime64[M]").astype("datetime64[D]").astype(np.int64)
+    return days
+
+
+def period_window(zone: ZoneInfo, days: int, granularity: str) -> np.ndarray:
+    """Start epoch days of the periods covering the last `days` days in `zone` (the first one whole)"""
+    today = today_epoch_day(zone)
+    return np.unique(period_starts(np.arange(today - max(days, 0) + 1, today + 1), granularity))
+
+
+def period_sums(days: np.ndarray, values: np.ndarray, periods: np.ndarray, granularity: str) -> np.ndarray:
+    """Sum of `values` per period, for the periods in `periods` (sorted start epoch days)"""
+    if not len(periods):
+        return np.zeros(0)
+    starts = period_starts(days, granularity)
+    index = np.searchsorted(periods, starts)
+    in_window = (days >= 0) & (index < len(periods))
+    in_window[in_window] = periods[index[in_window]] == starts[in_window]
+    return np.bincount(index[in_window], weights=values[in_window], minlength=len(periods))
+
+
+def period_keys(periods: np.ndarray) -> List[str]:
+    """YYYY-MM-DD start date of each period"""
+    return np.datetime_as_string(periods.astype("datetime64[D]")).tolist()
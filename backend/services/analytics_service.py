@@ -1,82 +1,135 @@
-from typing import Dict, List, Any
-from datetime import datetime, timedelta
-from collections import defaultdict
+from typing import Dict, List, Any, Optional, Union
+from datetime import datetime
+from zoneinfo import ZoneInfo
+import time
+import numpy as np
+from services.analytics_columns import (
+    GRANULARITIES,
+    ReceiptColumns,
+    PantryColumns,
+    amounts,
+    daily_sums,
+    day_keys,
+    period_keys,
+    period_sums,
+    period_window,
+    to_float,
+    today_epoch_day,
+    window,
+)
+
+Receipts = Union[ReceiptColumns, List[Dict[str, Any]]]
+PantryItems = Union[PantryColumns, List[Dict[str, Any]]]
+
+PERIOD_DAYS = {"day": 1, "week": 7, "month": 30}
 
 
 class AnalyticsService:
+    """
+    Analytics over a user's receipts, pantry and comparisons.
+
+    Documents are converted once into columns (see analytics_columns) and
+    every metric is a vectorized reduction over them, with day buckets as
+    epoch-day integers (days in the user's timezone) summed by np.bincount.
+    Each method accepts either the raw documents plus the user's zone or
+    prebuilt ReceiptColumns / PantryColumns, so a caller computing several
+    metrics (the dashboard) converts each dataset once.
+
+    Spending series over long horizons come from day/week/month rollups
+    (see FirebaseService.get_spend_rollups) at a granularity that keeps the
+    chart within MAX_POINTS points.
+    """
+
+    MAX_POINTS = 120
+    MAX_DAYS = 3650
+
+    @staticmethod
+    def choose_granularity(days: int, granularity: Optional[str] = None) -> str:
+        """The requested granularity (default: day), coarsened until the series fits in MAX_POINTS"""
+        index = GRANULARITIES.index(granularity) if granularity in GRANULARITIES else 0
+        while index < len(GRANULARITIES) - 1 and days / PERIOD_DAYS[GRANULARITIES[index]] > AnalyticsService.MAX_POINTS:
+            index += 1
+        return GRANULARITIES[index]
+
+    @staticmethod
+    def calculate_spending_trends(
+        receipts: Receipts,
+        days: int = 14,
+        granularity: str = "day",
+        zone: Optional[ZoneInfo] = None
+    ) -> Dict[str, Any]:
+        """Calculate spending trends over the last `days` days, one point per day, week or month"""
+        receipts = ReceiptColumns.of(receipts, zone)
+        periods = period_window(receipts.zone, days, granularity)
+        amounts_by_period = period_sums(receipts.purchase_day, receipts.amount, periods, granularity)
+        return AnalyticsService._spending_series(periods, amounts_by_period, days, granularity, receipts.zone)
+
     @staticmethod
-    def calculate_spending_trends(receipts: List[Dict[str, Any]], days: int = 14) -> Dict[str, Any]:
-        """Calculate spending trends over time"""
-        cutoff_date = datetime.now() - timedelta(days=days)
-        
-        daily_spending = defaultdict(float)
-        total_spent = 0.0
-        
-        for receipt in receipts:
-            purchase_date = receipt.get("purchase_date")
-            if isinstance(purchase_date, str):
-                purchase_date = datetime.fromisoformat(purchase_date.replace("Z", "+00:00"))
-            
-            if purchase_date and purchase_date >= cutoff_date:
-                date_key = purchase_date.strftime("%Y-%m-%d")
-                amount = float(receipt.get("total_amount", 0))
-                daily_spending[date_key] += amount
-                total_spent += amount
-
-        # Create data points for chart
-        data_points = []
-        current_date = datetime.now() - timedelta(days=days)
-        
-        for i in range(days):
-            date_key = current_date.strftime("%Y-%m-%d")
-            data_points.append({
-                "date": date_key,
-                "amount": round(daily_spending.get(date_key, 0), 2),
-                "label": current_date.strftime("%d")
-            })
-            current_date += timedelta(days=1)
-
-        average_daily = total_spent / days if days > 0 else 0
+    def spending_trends_from_rollups(
+        rollups: List[Dict[str, Any]],
+        days: int,
+        granularity: str,
+        zone: ZoneInfo
+    ) -> Dict[str, Any]:
+        """Spending trends from precomputed spend rollups ({period, amount}) of one granularity"""
+        periods = period_window(zone, days, granularity)
+        by_period = {rollup.get("period"): to_float(rollup.get("amount")) for rollup in rollups}
+        amounts_by_period = np.array([by_period.get(key, 0.0) for key in period_keys(periods)], dtype=np.float64)
+        return AnalyticsService._spending_series(periods, amounts_by_period, days, granularity, zone)
+
+    @staticmethod
+    def _spending_series(
+        periods: np.ndarray,
+        amounts_by_period: np.ndarray,
+        days: int,
+        granularity: str,
+        zone: ZoneInfo
+    ) -> Dict[str, Any]:
+        total_spent = float(amounts_by_period.sum())
+
+        data_points = [
+            {"date": key, "amount": round(float(amount), 2), "label": AnalyticsService._period_label(key, granularity)}
+            for key, amount in zip(period_keys(periods), amounts_by_period)
+        ]
+
+        # Coarse periods are whole, so the window may start before `days` ago
+        span = today_epoch_day(zone) - int(periods[0]) + 1 if len(periods) else 0
+        average_daily = total_spent / span if span > 0 else 0
 
         return {
             "total_spent": round(total_spent, 2),
             "average_daily": round(average_daily, 2),
             "data_points": data_points,
-            "days": days
+            "days": days,
+            "granularity": granularity
         }
 
     @staticmethod
-    def calculate_calorie_trends(receipts: List[Dict[str, Any]], pantry_consumed: List[Dict[str, Any]], days: int = 14) -> Dict[str, Any]:
-        """Calculate calorie consumption trends"""
-        cutoff_date = datetime.now() - timedelta(days=days)
-        
-        daily_calories = defaultdict(float)
-        total_calories = 0.0
-        
-        # Add calories from consumed pantry items
-        for item in pantry_consumed:
-            consumed_date = item.get("consumed_date")
-            if isinstance(consumed_date, str):
-                consumed_date = datetime.fromisoformat(consumed_date.replace("Z", "+00:00"))
-            
-            if consumed_date and consumed_date >= cutoff_date:
-                date_key = consumed_date.strftime("%Y-%m-%d")
-                calories = float(item.get("calories", 0))
-                daily_calories[date_key] += calories
-                total_calories += calories
-
-        # Create data points
-        data_points = []
-        current_date = datetime.now() - timedelta(days=days)
-        
-        for i in range(days):
-            date_key = current_date.strftime("%Y-%m-%d")
-            data_points.append({
-                "date": date_key,
-                "calories": round(daily_calories.get(date_key, 0), 0),
-                "label": current_date.strftime("%d")
-            })
-            current_date += timedelta(days=1)
+    def _period_label(key: str, granularity: str) -> str:
+        """Chart label: day of month, MM/DD of the week's Monday, or month name"""
+        if granularity == "month":
+            return datetime.strptime(key, "%Y-%m-%d").strftime("%b")
+        if granularity == "week":
+            return f"{key[5:7]}/{key[8:10]}"
+        return key[-2:]
+
+    @staticmethod
+    def calculate_calorie_trends(
+        receipts: Receipts,
+        pantry_consumed: PantryItems,
+        days: int = 14,
+        zone: Optional[ZoneInfo] = None
+    ) -> Dict[str, Any]:
+        """Calculate calorie consumption trends from consumed pantry items"""
+        pantry = PantryColumns.of(pantry_consumed, zone)
+        first_day, count = window(pantry.zone, days)
+        daily_calories = daily_sums(pantry.consumed_day, pantry.calories, first_day, count)
+        total_calories = float(daily_calories.sum())
+
+        data_points = [
+            {"date": date_key, "calories": round(float(calories), 0), "label": date_key[-2:]}
+            for date_key, calories in zip(day_keys(first_day, count), daily_calories)
+        ]
 
         average_daily = total_calories / days if days > 0 else 0
 
@@ -88,57 +141,43 @@ class AnalyticsService:
         }
 
     @staticmethod
-    def calculate_waste_stats(pantry_items: List[Dict[str, Any]]) -> Dict[str, Any]:
+    def calculate_waste_stats(pantry_items: PantryItems, zone: Optional[ZoneInfo] = None) -> Dict[str, Any]:
         """Calculate food waste statistics"""
-        total_items = len(pantry_items)
-        expired_items = []
-        total_waste_value = 0.0
-        
-        now = datetime.now()
-        
-        for item in pantry_items:
-            expiration_date = item.get("expiration_date")
-            if isinstance(expiration_date, str):
-                expiration_date = datetime.fromisoformat(expiration_date.replace("Z", "+00:00"))
-            
-            if expiration_date and expiration_date < now and not item.get("consumed", False):
-                expired_items.append(item)
-                # Estimate waste value (rough calculation)
-                total_waste_value += 5.0  # Average $5 per wasted item
-
-        waste_percentage = (len(expired_items) / total_items * 100) if total_items > 0 else 0
+        pantry = PantryColumns.of(pantry_items, zone)
+        total_items = len(pantry)
+
+        # NaN (no expiration date) compares False, so those items never count as expired
+        expired = (pantry.expiration < time.time()) & ~pantry.consumed
+        expired_count = int(expired.sum())
+        # Estimate waste value (rough calculation): average $5 per wasted item
+        total_waste_value = expired_count * 5.0
+
+        waste_percentage = (expired_count / total_items * 100) if total_items > 0 else 0
 
         return {
             "total_items": total_items,
-            "expired_items": len(expired_items),
+            "expired_items": expired_count,
             "waste_percentage": round(waste_percentage, 1),
             "estimated_waste_value": round(total_waste_value, 2),
-            "most_wasted_categories": AnalyticsService._get_waste_by_category(expired_items)
+            "most_wasted_categories": AnalyticsService._get_waste_by_category(pantry, expired)
         }
 
     @staticmethod
-    def _get_waste_by_category(expired_items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        """Group wasted items by category"""
-        category_counts = defaultdict(int)
-        
-        for item in expired_items:
-            category = item.get("category", "other")
-            category_counts[category] += 1
-
+    def _get_waste_by_category(pantry: PantryColumns, expired: np.ndarray) -> List[Dict[str, Any]]:
+        """Top 5 categories by number of expired items"""
+        counts = np.bincount(pantry.category_code[expired], minlength=len(pantry.categories))
+        order = np.argsort(-counts, kind="stable")
         return [
-            {"category": cat, "count": count}
-            for cat, count in sorted(category_counts.items(), key=lambda x: x[1], reverse=True)
-        ][:5]
+            {"category": str(pantry.categories[code]), "count": int(counts[code])}
+            for code in order[:5] if counts[code] > 0
+        ]
 
     @staticmethod
     def calculate_savings(comparisons: List[Dict[str, Any]]) -> Dict[str, Any]:
         """Calculate total savings from home cooking vs delivery"""
-        total_savings = 0.0
+        savings = amounts(comparisons, "savings")
+        total_savings = float(savings.sum())
         total_comparisons = len(comparisons)
-        
-        for comp in comparisons:
-            savings = float(comp.get("savings", 0))
-            total_savings += savings
 
         average_savings = total_savings / total_comparisons if total_comparisons > 0 else 0
 
@@ -150,32 +189,21 @@ class AnalyticsService:
         }
 
     @staticmethod
-    def get_today_summary(receipts: List[Dict[str, Any]], pantry_consumed: List[Dict[str, Any]], budget: float) -> Dict[str, Any]:
+    def get_today_summary(
+        receipts: Receipts,
+        pantry_consumed: PantryItems,
+        budget: float,
+        zone: Optional[ZoneInfo] = None
+    ) -> Dict[str, Any]:
         """Get today's summary statistics"""
-        today = datetime.now().date()
-        
-        today_spending = 0.0
-        today_calories = 0.0
-        today_protein = 0.0
-        
-        # Today's receipts
-        for receipt in receipts:
-            purchase_date = receipt.get("purchase_date")
-            if isinstance(purchase_date, str):
-                purchase_date = datetime.fromisoformat(purchase_date.replace("Z", "+00:00"))
-            
-            if purchase_date and purchase_date.date() == today:
-                today_spending += float(receipt.get("total_amount", 0))
-
-        # Today's consumption
-        for item in pantry_consumed:
-            consumed_date = item.get("consumed_date")
-            if isinstance(consumed_date, str):
-                consumed_date = datetime.fromisoformat(consumed_date.replace("Z", "+00:00"))
-            
-            if consumed_date and consumed_date.date() == today:
-                today_calories += float(item.get("calories", 0))
-                today_protein += float(item.get("protein", 0))
+        receipts = ReceiptColumns.of(receipts, zone)
+        pantry = PantryColumns.of(pantry_consumed, zone)
+        today = today_epoch_day(receipts.zone)
+
+        today_spending = float(receipts.amount[receipts.purchase_day == today].sum())
+        consumed_today = pantry.consumed_day == today
+        today_calories = float(pantry.calories[consumed_today].sum())
+        today_protein = float(pantry.protein[consumed_today].sum())
 
         remaining_budget = budget - today_spending
 
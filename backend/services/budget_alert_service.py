@@ -0,0 +1,76 @@
+from services.firebase_service import FirebaseService
+from services.notification_service import NotificationService
+from typing import Dict, Any, List, Optional
+from utils.dates import local_date, user_zone, utc_now
+
+
+class BudgetAlertService:
+    """
+    Budget alerts driven by receipt writes instead of polling.
+
+    Today's spend is the user's day spend rollup (`spend_rollups`, updated
+    by the receipt write itself, see FirebaseService.rollup_periods). When a
+    receipt upload or edit for today pushes it past 90% or 100% of
+    `preferences.daily_budget` for the first time, one budget notification
+    is enqueued; the outbox worker delivers it. Routers call
+    `receipt_changed` as a background task, so the request never waits on it.
+    """
+
+    THRESHOLDS = (90, 100)
+
+    def __init__(
+        self,
+        firebase_service: Optional[FirebaseService] = None,
+        notification_service: Optional[NotificationService] = None
+    ):
+        self.firebase_service = firebase_service or FirebaseService()
+        self.notification_service = notification_service or NotificationService()
+
+    def receipt_changed(
+        self,
+        user_id: str,
+        preferences: Dict[str, Any],
+        receipt_id: str,
+        before: Optional[Dict[str, Any]],
+        after: Optional[Dict[str, Any]]
+    ) -> List[int]:
+        """
+        Alert on new threshold crossings after a receipt write. `before` /
+        `after` are the receipt before and after the write (None when it was
+        created / deleted); the rollups already include the write. Returns
+        the thresholds that fired.
+        """
+        budget = float(preferences.get("daily_budget", 50.0) or 0)
+        # Deletes only lower the spend
+        if not after or budget <= 0:
+            return []
+
+        # Only today's spend can trigger an alert; back-dated receipts just update their rollups
+        zone = user_zone(preferences.get("timezone"))
+        today = local_date(utc_now(), zone).isoformat()
+        periods = after.get("spend_periods") or FirebaseService.rollup_periods(after.get("purchase_date"), zone)
+        if periods.get("day") != today:
+            return []
+
+        thresholds = {percent: budget * percent / 100 for percent in self.THRESHOLDS}
+        spent, crossed = self.firebase_service.claim_budget_alerts(user_id, today, thresholds)
+        if not crossed:
+            return []
+
+        # One upload can cross both thresholds; send only the highest
+        percent = max(crossed)
+        notif_data = self.notification_service.create_budget_notification(spent, budget)
+        self.firebase_service.enqueue_notifications([{
+            "user_id": user_id,
+            "dedup_key": f"budget:{user_id}:{today}:{percent}",
+            "type": "budget_alert",
+            "title": notif_data["title"],
+            "body": notif_data["body"],
+            "data": {
+                "threshold": percent,
+                "spent_today": spent,
+                "daily_budget": budget
+            }
+        }])
+        print(f"💰 Budget alert ({percent}%) for {user_id}: ${spent:.2f} of ${budget:.2f}")
+        return crossed
@@ -0,0 +1,209 @@
+import hashlib
+import re
+import threading
+import numpy as np
+from collections import defaultdict
+from typing import Dict, List, Any, Optional
+from models.ingredient import FoodCategory
+from services.ingredient_normalizer import IngredientNormalizer
+
+CATEGORIES = [category.value for category in FoodCategory]
+
+# Generic words that indicate a category without naming a catalog ingredient
+CATEGORY_KEYWORDS = {
+    "produce": ["fruit", "vegetable", "salad", "herb", "berry", "melon", "squash", "greens"],
+    "dairy": ["dairy", "creamer", "kefir", "ricotta", "brie", "feta", "gouda", "provolone"],
+    "meat": ["meat", "poultry", "seafood", "fillet", "roast", "ribs", "wings", "drumstick", "lamb", "veal", "crab", "lobster"],
+    "pantry": ["sauce", "spice", "seasoning", "canned", "dried", "syrup", "dressing", "noodle", "grain"],
+    "frozen": ["frozen"],
+    "beverages": ["drink", "beverage", "lemonade", "smoothie", "energy", "seltzer", "espresso", "latte"],
+    "snacks": ["snack", "bar", "jerky", "gummy", "gummies", "puffs"],
+    "other": ["towel", "tissue", "soap", "detergent", "shampoo", "battery", "bags", "foil", "wrap", "cleaner"]
+}
+
+
+class CategoryClassifier:
+    """
+    Maps receipt item names to FoodCategory values.
+
+    Each name is classified by (1) its canonical catalog entry, when the
+    normalizer's match is confident (covers the name), (2) a
+    precompiled token -> category index voting over its tokens, and
+    (3) optionally a hashed character n-gram linear model trained on the
+    catalog, for names none of the indexes recognize. The model path scores
+    a whole receipt with one sparse matrix product.
+
+    The instance is shared process-wide; `warm_up()` trains the model at
+    startup so no request pays for it.
+    """
+
+    NUM_FEATURES = 1 << 12
+    NGRAM = 3
+
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(CategoryClassifier, cls).__new__(cls)
+            cls._instance._build()
+        return cls._instance
+
+    def _build(self):
+        """Compile the token -> category index from the catalog and keyword lists"""
+        self.normalizer = IngredientNormalizer()
+        votes: Dict[str, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+
+        for entry in self.normalizer.entries.values():
+            for alias in [entry["name"]] + entry.get("aliases", []):
+                for token in self.normalizer.tokenize(alias):
+                    votes[token][entry["category"]] += 1.0
+
+        for category, keywords in CATEGORY_KEYWORDS.items():
+            for keyword in keywords:
+                for token in self.normalizer.tokenize(keyword):
+                    votes[token][category] += 2.0
+
+        # token -> (category, weight share) for the token's dominant category
+        self.token_index: Dict[str, tuple] = {}
+        for token, counts in votes.items():
+            category, count = max(counts.items(), key=lambda x: x[1])
+            self.token_index[token] = (category, count / sum(counts.values()))
+
+        self.weights: Optional[np.ndarray] = None
+        self._model_lock = threading.Lock()
+
+    # Hashed n-gram model
+
+    def _features(self, name: str) -> np.ndarray:
+        """Hashed character n-gram feature ids for a name"""
+        text = f" {' '.join(self.normalizer.tokenize(name))} "
+        grams = {text[i:i + self.NGRAM] for i in range(len(text) - self.NGRAM + 1)}
+        return np.array(
+            [int.from_bytes(hashlib.md5(gram.encode()).digest()[:4], "little") % self.NUM_FEATURES for gram in grams],
+            dtype=np.int64
+        )
+
+    def _design_matrix(self, names: List[str]):
+        """Sparse (CSR-style) feature rows for a batch of names"""
+        rows = [self._features(name) for name in names]
+        indptr = np.zeros(len(rows) + 1, dtype=np.int64)
+        indptr[1:] = np.cumsum([row.size for row in rows])
+        indices = np.concatenate(rows) if rows else np.zeros(0, dtype=np.int64)
+        return indptr, indices
+
+    def _predict_proba(self, names: List[str]) -> np.ndarray:
+        """Softmax class probabilities for a batch, one sparse matrix product"""
+        indptr, indices = self._design_matrix(names)
+        scores = np.zeros((len(names), len(CATEGORIES)), dtype=np.float32)
+        nonempty = np.diff(indptr) > 0
+        if indices.size:
+            sums = np.add.reduceat(self.weights[indices], indptr[:-1][nonempty], axis=0)
+            scores[nonempty] = sums
+        scores -= scores.max(axis=1, keepdims=True)
+        exp = np.exp(scores)
+        return exp / exp.sum(axis=1, keepdims=True)
+
+    def train(self, names: List[str], labels: List[str], epochs: int = 200, learning_rate: float = 0.5):
+        """Fit the hashed n-gram softmax model with full-batch gradient descent"""
+        X = np.zeros((len(names), self.NUM_FEATURES), dtype=np.float32)
+        for i, name in enumerate(names):
+            X[i, self._features(name)] = 1.0
+        y = np.zeros((len(names), len(CATEGORIES)), dtype=np.float32)
+        y[np.arange(len(names)), [CATEGORIES.index(label) for label in labels]] = 1.0
+
+        W = np.zeros((self.NUM_FEATURES, len(CATEGORIES)), dtype=np.float32)
+        for _ in range(epochs):
+            scores = X @ W
+            scores -= scores.max(axis=1, keepdims=True)
+            probs = np.exp(scores)
+            probs /= probs.sum(axis=1, keepdims=True)
+            W -= learning_rate * (X.T @ (probs - y)) / len(names)
+
+        self.weights = W
+
+    def _ensure_model(self):
+        """Train the model on catalog names/aliases unless it already is"""
+        if self.weights is not None:
+            return
+        with self._model_lock:
+            if self.weights is not None:
+                return
+            names, labels = [], []
+            for entry in self.normalizer.entries.values():
+                for alias in [entry["name"]] + entry.get("aliases", []):
+                    names.append(alias)
+                    labels.append(entry["category"])
+            self.train(names, labels)
+
+    def warm_up(self):
+        """Train the model now (called once at startup)"""
+        self._ensure_model()
+
+    # Classification
+
+    def _classify_tokens(self, tokens: List[str]) -> Optional[Dict[str, Any]]:
+        """
+        Vote over the precompiled token index; rightmost tokens weigh more.
+        Tokens the index doesn't know count against the confidence, so
+        "apple pie" is a weak produce vote rather than a certain one.
+        """
+        votes: Dict[str, float] = defaultdict(float)
+        unknown = 0.0
+        for position, token in enumerate(tokens):
+            weight = 1.0 + position / len(tokens)
+            hit = self.token_index.get(token)
+            if hit:
+                category, share = hit
+                votes[category] += share * weight
+            else:
+                unknown += weight
+
+        if not votes:
+            return None
+        category, score = max(votes.items(), key=lambda x: x[1])
+        return {"category": category, "confidence": round(0.5 + 0.4 * score / (sum(votes.values()) + unknown), 2)}
+
+    def classify_many(
+        self,
+        names: List[str],
+        resolved: Optional[List[Dict[str, Any]]] = None,
+        use_model: bool = True
+    ) -> List[Dict[str, Any]]:
+        """
+        Classify a whole receipt; returns [{category, confidence}] in input
+        order. With `use_model=False` names the indexes don't recognize
+        default to pantry instead of going through the n-gram model.
+        """
+        if resolved is None:
+            resolved = self.normalizer.resolve_many(names)
+
+        results: List[Optional[Dict[str, Any]]] = []
+        unmatched = []
+
+        for index, (name, entry) in enumerate(zip(names, resolved)):
+            if "frozen" in entry["modifiers"]:
+                results.append({"category": FoodCategory.FROZEN.value, "confidence": 0.95})
+            elif entry["category"] and entry["confident"]:
+                results.append({"category": entry["category"], "confidence": entry["confidence"]})
+            else:
+                result = self._classify_tokens(self.normalizer.tokenize(name))
+                results.append(result)
+                if result is None:
+                    unmatched.append(index)
+
+        if unmatched and use_model:
+            self._ensure_model()
+            probabilities = self._predict_proba([names[i] for i in unmatched])
+            best = probabilities.argmax(axis=1)
+            for index, label, probability in zip(unmatched, best, probabilities.max(axis=1)):
+                results[index] = {"category": CATEGORIES[label], "confidence": round(float(probability) * 0.8, 2)}
+
+        # Anything still unknown defaults to pantry with no confidence
+        return [
+            result or {"category": FoodCategory.PANTRY.value, "confidence": 0.0}
+            for result in results
+        ]
+
+    def classify(self, name: str, use_model: bool = True) -> Dict[str, Any]:
+        """Classify a single item name"""
+        return self.classify_many([name], use_model=use_model)[0]
@@ -1,5 +1,7 @@
 from datetime import datetime, timedelta
-from typing import Dict, Optional
+from typing import Dict, List, Any, Optional
+from services.shelf_life_matcher import ShelfLifeMatcher
+from utils.dates import to_utc, utc_now
 
 
 class ExpirationService:
@@ -15,48 +17,19 @@ class ExpirationService:
         "other": 30
     }
 
-    # Specific items with known expiration periods
-    SPECIFIC_ITEMS = {
-        "milk": 7,
-        "eggs": 21,
-        "chicken": 2,
-        "beef": 3,
-        "pork": 3,
-        "fish": 1,
-        "lettuce": 5,
-        "tomatoes": 7,
-        "bananas": 5,
-        "apples": 14,
-        "bread": 5,
-        "yogurt": 14,
-        "cheese": 30,
-        "butter": 60,
-        "spinach": 5,
-        "berries": 5,
-        "carrots": 21,
-        "potatoes": 60,
-        "onions": 30,
-        "garlic": 60
-    }
-
     @staticmethod
     def estimate_expiration_date(
-        item_name: str,
+        item_name: Optional[str],
         category: str,
-        purchase_date: Optional[datetime] = None
+        purchase_date: Optional[datetime] = None,
+        modifiers: Optional[List[str]] = None
     ) -> datetime:
-        """Estimate expiration date for an item"""
+        """Estimate expiration date for an item (no name: the category default)"""
         if purchase_date is None:
-            purchase_date = datetime.now()
+            purchase_date = utc_now()
 
-        # Check if item has specific expiration
-        item_lower = item_name.lower()
-        days = None
-        
-        for key, value in ExpirationService.SPECIFIC_ITEMS.items():
-            if key in item_lower:
-                days = value
-                break
+        # Longest match in the shelf-life table, adjusted for storage (frozen, canned...)
+        days = ShelfLifeMatcher().shelf_life_days(item_name, modifiers) if item_name else None
 
         # Fall back to category default
         if days is None:
@@ -65,9 +38,40 @@ class ExpirationService:
         return purchase_date + timedelta(days=days)
 
     @staticmethod
-    def get_urgency_level(expiration_date: datetime) -> str:
-        """Get urgency level for an item based on expiration date"""
-        now = datetime.now()
+    def estimate_many(
+        items: List[Dict[str, Any]],
+        purchase_date: Optional[datetime] = None
+    ) -> List[datetime]:
+        """
+        Estimate expiration dates for a batch of {name, category, modifiers}
+        items, e.g. a whole receipt. Items without a name get their
+        category's default.
+        """
+        if purchase_date is None:
+            purchase_date = utc_now()
+
+        matcher = ShelfLifeMatcher()
+        shelf_lives: Dict[tuple, Optional[int]] = {}
+        dates = []
+
+        for item in items:
+            modifiers = item.get("modifiers")
+            key = (item["name"], tuple(modifiers) if modifiers is not None else None)
+            if key not in shelf_lives:
+                shelf_lives[key] = matcher.shelf_life_days(item["name"], modifiers) if item["name"] else None
+
+            days = shelf_lives[key]
+            if days is None:
+                days = ExpirationService.EXPIRATION_DEFAULTS.get(item.get("category"), 30)
+            dates.append(purchase_date + timedelta(days=days))
+
+        return dates
+
+    @staticmethod
+    def get_urgency_level(expiration_date: datetime, now: Optional[datetime] = None) -> str:
+        """Get urgency level for an item based on expiration date (both UTC, see utils.dates)"""
+        now = now or utc_now()
+        expiration_date = to_utc(expiration_date)
         days_until_expiration = (expiration_date - now).days
 
         if days_until_expiration < 0:
@@ -94,9 +98,15 @@ class ExpirationService:
         return colors.get(urgency, "#6B7280")  # gray default
 
     @staticmethod
-    def should_send_notification(expiration_date: datetime, last_notified: Optional[datetime] = None) -> bool:
-        """Determine if a notification should be sent for an expiring item"""
-        now = datetime.now()
+    def should_send_notification(
+        expiration_date: datetime,
+        last_notified: Optional[datetime] = None,
+        now: Optional[datetime] = None
+    ) -> bool:
+        """Determine if a notification should be sent for an expiring item (all times UTC)"""
+        now = now or utc_now()
+        expiration_date = to_utc(expiration_date)
+        last_notified = to_utc(last_notified)
         days_until_expiration = (expiration_date - now).days
 
         # Send notification at 3 days, 1 day, and on expiration day
@@ -1,8 +1,15 @@
 import firebase_admin
 from firebase_admin import credentials, firestore, auth
-from typing import Optional, Dict, Any, List
+from google.cloud.firestore_v1.field_path import FieldPath
+from typing import Optional, Dict, Any, List, Iterator, Tuple, Callable
+import hashlib
 import os
-from datetime import datetime
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from services.notification_broker import get_broker
+from zoneinfo import ZoneInfo
+from utils.dates import local_date, period_start, user_zone, utc_now, zone_of
 
 
 class FirebaseService:
@@ -55,7 +62,9 @@ class FirebaseService:
         if not self.db:
             return False
         try:
-            user_data["created_at"] = datetime.now()
+            user_data["created_at"] = utc_now()
+            # The scheduler finds users by preferences.timezone; Firestore never matches a missing field
+            user_data.setdefault("preferences", {}).setdefault("timezone", "UTC")
             self.db.collection("users").document(uid).set(user_data)
             return True
         except Exception as e:
@@ -73,6 +82,96 @@ class FirebaseService:
             print(f"Error updating user: {e}")
             return False
 
+    def get_users(self, uids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Get many user documents with batched reads"""
+        if not self.db or not uids:
+            return {}
+        users = {}
+        try:
+            for start in range(0, len(uids), 500):
+                refs = [self.db.collection("users").document(uid) for uid in uids[start:start + 500]]
+                for user_doc in self.db.get_all(refs):
+                    if user_doc.exists:
+                        users[user_doc.id] = user_doc.to_dict()
+            return users
+        except Exception as e:
+            print(f"Error getting users: {e}")
+            return users
+
+    def get_user_ids_in_timezones(self, timezones: List[str]) -> List[str]:
+        """Get ids of users whose profile timezone is one of `timezones`"""
+        if not self.db or not timezones:
+            return []
+        user_ids = []
+        try:
+            # "in" filters take at most 30 values
+            for start in range(0, len(timezones), 30):
+                docs = (
+                    self.db.collection("users")
+                    .where("preferences.timezone", "in", timezones[start:start + 30])
+                    .select(["__name__"])  # ids only
+                    .stream()
+                )
+                user_ids.extend(doc.id for doc in docs)
+            return user_ids
+        except Exception as e:
+            print(f"Error getting users by timezone: {e}")
+            return user_ids
+
+    def backfill_user_timezones(self) -> Optional[int]:
+        """
+        Set preferences.timezone = "UTC" on users created before the field
+        existed, so the UTC bucket of the scheduler finds them. Returns how
+        many users were updated (None if it failed part way).
+        """
+        if not self.db:
+            return None
+        updated = 0
+        try:
+            users = self.db.collection("users").select(["preferences.timezone"]).stream()
+            batch, pending = self.db.batch(), 0
+            for user_doc in users:
+                if (user_doc.to_dict().get("preferences") or {}).get("timezone"):
+                    continue
+                batch.update(user_doc.reference, {"preferences.timezone": "UTC"})
+                pending += 1
+                if pending == 500:
+                    batch.commit()
+                    updated += pending
+                    batch, pending = self.db.batch(), 0
+            if pending:
+                batch.commit()
+                updated += pending
+            return updated
+        except Exception as e:
+            print(f"Error backfilling user timezones after {updated} users: {e}")
+            return None
+
+    # One-off migrations
+    def is_migration_done(self, name: str) -> bool:
+        if not self.db:
+            return False
+        try:
+            snapshot = self.db.collection("migrations").document(name).get()
+            return snapshot.exists and bool(snapshot.to_dict().get("completed"))
+        except Exception as e:
+            print(f"Error reading migration {name}: {e}")
+            return False
+
+    def mark_migration_done(self, name: str, result: Any = None) -> bool:
+        if not self.db:
+            return False
+        try:
+            self.db.collection("migrations").document(name).set({
+                "completed": True,
+                "completed_at": utc_now(),
+                "result": result
+            })
+            return True
+        except Exception as e:
+            print(f"Error recording migration {name}: {e}")
+            return False
+
     def verify_token(self, id_token: str) -> Optional[Dict[str, Any]]:
         """Verify Firebase ID token"""
         try:
@@ -82,17 +181,41 @@ class FirebaseService:
             print(f"Error verifying token: {e}")
             return None
 
+    # Analytics version
+    def _bump_analytics_version(self, batch, user_id: Optional[str]):
+        """
+        Add an increment of users/{uid}.analytics_version to a write batch.
+        The version is part of every analytics ETag, so any write that can
+        change the user's analytics invalidates their cached responses.
+        """
+        if user_id:
+            batch.set(
+                self.db.collection("users").document(user_id),
+                {"analytics_version": firestore.Increment(1)},
+                merge=True
+            )
+
+    def _owner(self, doc_ref) -> Optional[str]:
+        """user_id of a document, for writes whose caller didn't pass it"""
+        doc = doc_ref.get()
+        return doc.get("user_id") if doc.exists else None
+
     # Receipts
-    def create_receipt(self, user_id: str, receipt_data: Dict[str, Any]) -> Optional[str]:
-        """Create receipt document"""
+    def create_receipt(self, user_id: str, receipt_data: Dict[str, Any], zone: Optional[ZoneInfo] = None) -> Optional[str]:
+        """Create receipt document (and add its amount to the spend rollups of the user's local day, week and month)"""
         if not self.db:
             return None
         try:
             receipt_ref = self.db.collection("receipts").document()
             receipt_data["receipt_id"] = receipt_ref.id
             receipt_data["user_id"] = user_id
-            receipt_data["processed_at"] = datetime.now()
-            receipt_ref.set(receipt_data)
+            receipt_data["processed_at"] = utc_now()
+            receipt_data["spend_periods"] = self.rollup_periods(receipt_data.get("purchase_date"), zone)
+            batch = self.db.batch()
+            batch.set(receipt_ref, receipt_data)
+            self._write_spend_rollups(batch, user_id, self._rollup_deltas(None, receipt_data))
+            self._bump_analytics_version(batch, user_id)
+            batch.commit()
             return receipt_ref.id
         except Exception as e:
             print(f"Error creating receipt: {e}")
@@ -115,6 +238,15 @@ class FirebaseService:
             print(f"Error getting receipts: {e}")
             return []
 
+    def get_receipts_in_range(
+        self,
+        user_ids: List[str],
+        start: datetime,
+        end: datetime
+    ) -> List[Dict[str, Any]]:
+        """Get receipts of many users purchased within [start, end)"""
+        return self._query_users_in_range("receipts", "purchase_date", user_ids, start, end)
+
     def get_receipt(self, receipt_id: str) -> Optional[Dict[str, Any]]:
         """Get single receipt"""
         if not self.db:
@@ -128,28 +260,229 @@ class FirebaseService:
             print(f"Error getting receipt: {e}")
             return None
 
-    def update_receipt(self, receipt_id: str, receipt_data: Dict[str, Any]) -> bool:
-        """Update receipt"""
+    def update_receipt(
+        self,
+        receipt_id: str,
+        receipt_data: Dict[str, Any],
+        user_id: Optional[str] = None,
+        zone: Optional[ZoneInfo] = None
+    ) -> bool:
+        """Update receipt (and move its amount between spend rollups if needed)"""
         if not self.db:
             return False
-        try:
-            self.db.collection("receipts").document(receipt_id).update(receipt_data)
+        receipt_ref = self.db.collection("receipts").document(receipt_id)
+
+        @firestore.transactional
+        def apply(transaction) -> bool:
+            snapshot = receipt_ref.get(transaction=transaction)
+            if not snapshot.exists:
+                return False
+            before = snapshot.to_dict()
+            owner = user_id or before.get("user_id")
+            if "total_amount" in receipt_data or "purchase_date" in receipt_data:
+                after = {**before, **receipt_data}
+                receipt_data["spend_periods"] = self.rollup_periods(after.get("purchase_date"), zone)
+                self._write_spend_rollups(
+                    transaction, owner, self._rollup_deltas(before, {**after, "spend_periods": receipt_data["spend_periods"]})
+                )
+            transaction.update(receipt_ref, receipt_data)
+            self._bump_analytics_version(transaction, owner)
             return True
+
+        try:
+            return apply(self.db.transaction())
         except Exception as e:
             print(f"Error updating receipt: {e}")
             return False
 
-    def delete_receipt(self, receipt_id: str) -> bool:
-        """Delete receipt"""
+    def delete_receipt(self, receipt_id: str, user_id: Optional[str] = None) -> bool:
+        """Delete receipt (and take its amount out of the spend rollups)"""
         if not self.db:
             return False
-        try:
-            self.db.collection("receipts").document(receipt_id).delete()
+        receipt_ref = self.db.collection("receipts").document(receipt_id)
+
+        @firestore.transactional
+        def apply(transaction) -> bool:
+            snapshot = receipt_ref.get(transaction=transaction)
+            if not snapshot.exists:
+                return True
+            before = snapshot.to_dict()
+            owner = user_id or before.get("user_id")
+            transaction.delete(receipt_ref)
+            self._write_spend_rollups(transaction, owner, self._rollup_deltas(before, None))
+            self._bump_analytics_version(transaction, owner)
             return True
+
+        try:
+            return apply(self.db.transaction())
         except Exception as e:
             print(f"Error deleting receipt: {e}")
             return False
 
+    # Spend rollups (day / week / month totals per user)
+    #
+    # A receipt counts in the periods stamped on it (`spend_periods`), which
+    # are taken in the owner's timezone when it is written. Every write moves
+    # its amount from the stamped periods to the new ones in the same batch or
+    # transaction, so the rollups always equal the sum of stamped receipts.
+    # Receipts from before rollups existed have no stamp and count nowhere
+    # until migrate_spend_rollups (or an edit) stamps them.
+    @staticmethod
+    def rollup_periods(purchase_date: Any, zone: Optional[ZoneInfo] = None) -> Dict[str, str]:
+        """Start date of the day, week (Monday) and month containing a purchase, in `zone` (default UTC)"""
+        day = local_date(purchase_date, zone or user_zone(None))
+        if day is None:
+            return {}
+        return {granularity: period_start(day, granularity).isoformat() for granularity in ("day", "week", "month")}
+
+    @staticmethod
+    def _rollup_deltas(
+        before: Optional[Dict[str, Any]],
+        after: Optional[Dict[str, Any]]
+    ) -> Dict[Tuple[str, str], List[float]]:
+        """Net (amount, receipts) change per (granularity, period) when a receipt goes from `before` to `after`"""
+        deltas: Dict[Tuple[str, str], List[float]] = {}
+        for receipt, sign in ((before, -1), (after, 1)):
+            if not receipt:
+                continue
+            amount = float(receipt.get("total_amount", 0) or 0)
+            for granularity, period in (receipt.get("spend_periods") or {}).items():
+                delta = deltas.setdefault((granularity, period), [0.0, 0])
+                delta[0] += sign * amount
+                delta[1] += sign
+        # Unchanged periods (e.g. an edit within the same month) need no write
+        return {key: delta for key, delta in deltas.items() if delta[0] or delta[1]}
+
+    def _write_spend_rollups(self, writer, user_id: Optional[str], deltas: Dict[Tuple[str, str], List[float]]):
+        """Add rollup increments to a batch or transaction (one write per rollup document)"""
+        if not user_id:
+            return
+        for (granularity, period), (amount, receipts) in deltas.items():
+            writer.set(
+                self.db.collection("spend_rollups").document(f"{user_id}_{granularity}_{period}"),
+                {
+                    "user_id": user_id,
+                    "granularity": granularity,
+                    "period": period,
+                    "amount": firestore.Increment(amount),
+                    "receipts": firestore.Increment(receipts)
+                },
+                merge=True
+            )
+
+    def get_spend_rollups(self, user_id: str, granularity: str, start: str, end: str) -> List[Dict[str, Any]]:
+        """Rollups of one granularity with period start in [start, end] (YYYY-MM-DD)"""
+        if not self.db:
+            return []
+        try:
+            rollups = (
+                self.db.collection("spend_rollups")
+                .where("user_id", "==", user_id)
+                .where("granularity", "==", granularity)
+                .where("period", ">=", start)
+                .where("period", "<=", end)
+                .order_by("period")
+                .stream()
+            )
+            return [rollup.to_dict() for rollup in rollups]
+        except Exception as e:
+            print(f"Error getting spend rollups: {e}")
+            return []
+
+    def migrate_spend_rollups(self, batch_size: int = 80) -> Optional[int]:
+        """
+        Fold receipts written before rollups existed (no `spend_periods`)
+        into their owner's rollups. Each batch is one transaction that
+        re-reads the receipts, stamps the ones still unstamped and increments
+        their rollups, so it is safe alongside live receipt writes and can be
+        re-run after a failure: every receipt is counted exactly once. 80
+        receipts (up to 4 writes each) stay under the 500-write limit.
+        Returns the number of receipts folded in (None on error).
+        """
+        if not self.db:
+            return None
+        migrated = 0
+        try:
+            pending: List[Tuple[Any, Optional[str]]] = []
+            for receipt in self.db.collection("receipts").select(["spend_periods", "user_id"]).stream():
+                data = receipt.to_dict()
+                if "spend_periods" in data:
+                    continue
+                pending.append((receipt.reference, data.get("user_id")))
+                if len(pending) == batch_size:
+                    migrated += self._stamp_receipts(pending)
+                    pending = []
+            if pending:
+                migrated += self._stamp_receipts(pending)
+            return migrated
+        except Exception as e:
+            print(f"Error migrating spend rollups after {migrated} receipts: {e}")
+            return None
+
+    def _stamp_receipts(self, pending: List[Tuple[Any, Optional[str]]]) -> int:
+        """Stamp and count one batch of unstamped receipts in a transaction; returns how many it stamped"""
+        users = self.get_users(sorted({owner for _, owner in pending if owner}))
+        refs = [ref for ref, _ in pending]
+
+        @firestore.transactional
+        def apply(transaction) -> int:
+            by_owner: Dict[str, Dict[Tuple[str, str], List[float]]] = {}
+            stamped = 0
+            for snapshot in transaction.get_all(refs):
+                receipt = snapshot.to_dict() if snapshot.exists else None
+                # Deleted, or stamped by a receipt write since the scan
+                if receipt is None or "spend_periods" in receipt:
+                    continue
+                owner = receipt.get("user_id")
+                periods = self.rollup_periods(receipt.get("purchase_date"), zone_of(users.get(owner)))
+                transaction.update(snapshot.reference, {"spend_periods": periods})
+                stamped += 1
+                if not owner:
+                    continue
+                totals = by_owner.setdefault(owner, {})
+                for key, (amount, count) in self._rollup_deltas(None, {**receipt, "spend_periods": periods}).items():
+                    total = totals.setdefault(key, [0.0, 0])
+                    total[0] += amount
+                    total[1] += count
+            for owner, deltas in by_owner.items():
+                self._write_spend_rollups(transaction, owner, deltas)
+                self._bump_analytics_version(transaction, owner)
+            return stamped
+
+        return apply(self.db.transaction())
+
+    def claim_budget_alerts(self, user_id: str, day: str, thresholds: Dict[int, float]) -> Tuple[float, List[int]]:
+        """
+        Spend on `day` (YYYY-MM-DD, the user's local day) from the day
+        rollup, with the thresholds (percent -> amount) it crosses for the
+        first time. Claimed thresholds are recorded on the rollup in the same
+        transaction, so each one fires once per day however many receipt
+        writes race past it.
+        """
+        if not self.db:
+            return 0.0, []
+        ref = self.db.collection("spend_rollups").document(f"{user_id}_day_{day}")
+
+        @firestore.transactional
+        def apply(transaction) -> Tuple[float, List[int]]:
+            snapshot = ref.get(transaction=transaction)
+            rollup = snapshot.to_dict() if snapshot.exists else {}
+            spent = round(float(rollup.get("amount", 0) or 0), 2)
+            alerted = rollup.get("alerted", [])
+            crossed = [
+                percent for percent, limit in sorted(thresholds.items())
+                if spent >= limit and percent not in alerted
+            ]
+            if crossed:
+                transaction.set(ref, {"alerted": alerted + crossed}, merge=True)
+            return spent, crossed
+
+        try:
+            return apply(self.db.transaction())
+        except Exception as e:
+            print(f"Error claiming budget alerts: {e}")
+            return 0.0, []
+
     # Pantry Items
     def create_pantry_item(self, user_id: str, item_data: Dict[str, Any]) -> Optional[str]:
         """Create pantry item"""
@@ -159,12 +492,37 @@ class FirebaseService:
             item_ref = self.db.collection("pantry_items").document()
             item_data["item_id"] = item_ref.id
             item_data["user_id"] = user_id
-            item_ref.set(item_data)
+            batch = self.db.batch()
+            batch.set(item_ref, item_data)
+            self._bump_analytics_version(batch, user_id)
+            batch.commit()
             return item_ref.id
         except Exception as e:
             print(f"Error creating pantry item: {e}")
             return None
 
+    def create_pantry_items(self, user_id: str, items: List[Dict[str, Any]]) -> List[str]:
+        """Create many pantry items with batched writes"""
+        if not self.db or not items:
+            return []
+        item_ids = []
+        try:
+            # 499 items + 1 analytics version write per batch
+            for start in range(0, len(items), 499):
+                batch = self.db.batch()
+                for item_data in items[start:start + 499]:
+                    item_ref = self.db.collection("pantry_items").document()
+                    item_data["item_id"] = item_ref.id
+                    item_data["user_id"] = user_id
+                    batch.set(item_ref, item_data)
+                    item_ids.append(item_ref.id)
+                self._bump_analytics_version(batch, user_id)
+                batch.commit()
+            return item_ids
+        except Exception as e:
+            print(f"Error creating pantry items: {e}")
+            return item_ids[:start]
+
     def get_user_pantry(self, user_id: str, category: Optional[str] = None) -> List[Dict[str, Any]]:
         """Get user's pantry items"""
         if not self.db:
@@ -199,28 +557,133 @@ class FirebaseService:
             print(f"Error getting expiring items: {e}")
             return []
 
-    def update_pantry_item(self, item_id: str, item_data: Dict[str, Any]) -> bool:
+    def stream_expiring_items(
+        self,
+        window_start: datetime,
+        window_end: datetime,
+        page_size: int = 1000,
+        user_ids: Optional[List[str]] = None,
+        concurrency: int = 4
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Stream unconsumed items expiring within a window, page by page (all
+        users, or only `user_ids`). A user_ids run needs one "in" query per 30
+        users; up to `concurrency` of them are read at a time.
+        """
+        if not self.db:
+            return
+        query = (
+            self.db.collection("pantry_items")
+            .where("consumed", "==", False)
+            .where("expiration_date", ">=", window_start)
+            .where("expiration_date", "<=", window_end)
+        )
+
+        def pages(base) -> Iterator[List[Any]]:
+            base = base.order_by("expiration_date").limit(page_size)
+            last_doc = None
+            while True:
+                docs = list((base.start_after(last_doc) if last_doc else base).stream())
+                yield docs
+                if len(docs) < page_size:
+                    break
+                last_doc = docs[-1]
+
+        try:
+            if user_ids is None:
+                for docs in pages(query):
+                    for doc in docs:
+                        yield doc.to_dict()
+                return
+
+            # "in" filters take at most 30 values
+            chunks = [
+                query.where("user_id", "in", user_ids[start:start + 30])
+                for start in range(0, len(user_ids), 30)
+            ]
+            workers = max(concurrency, 1)
+
+            def read_chunk(chunk) -> List[Dict[str, Any]]:
+                return [doc.to_dict() for docs in pages(chunk) for doc in docs]
+
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="expiring-items") as executor:
+                # Keep at most `workers` chunks in flight and hand results over in order
+                in_flight = deque()
+                for chunk in chunks:
+                    in_flight.append(executor.submit(read_chunk, chunk))
+                    if len(in_flight) >= workers:
+                        yield from in_flight.popleft().result()
+                while in_flight:
+                    yield from in_flight.popleft().result()
+        except Exception as e:
+            print(f"Error streaming expiring items: {e}")
+
+    def get_consumed_items_in_range(
+        self,
+        user_ids: List[str],
+        start: datetime,
+        end: datetime
+    ) -> List[Dict[str, Any]]:
+        """Get pantry items of many users consumed within [start, end)"""
+        return self._query_users_in_range("pantry_items", "consumed_date", user_ids, start, end)
+
+    def update_pantry_item(self, item_id: str, item_data: Dict[str, Any], user_id: Optional[str] = None) -> bool:
         """Update pantry item"""
         if not self.db:
             return False
         try:
-            self.db.collection("pantry_items").document(item_id).update(item_data)
+            item_ref = self.db.collection("pantry_items").document(item_id)
+            batch = self.db.batch()
+            batch.update(item_ref, item_data)
+            self._bump_analytics_version(batch, user_id or self._owner(item_ref))
+            batch.commit()
             return True
         except Exception as e:
             print(f"Error updating pantry item: {e}")
             return False
 
-    def delete_pantry_item(self, item_id: str) -> bool:
+    def delete_pantry_item(self, item_id: str, user_id: Optional[str] = None) -> bool:
         """Delete pantry item"""
         if not self.db:
             return False
         try:
-            self.db.collection("pantry_items").document(item_id).delete()
+            item_ref = self.db.collection("pantry_items").document(item_id)
+            batch = self.db.batch()
+            batch.delete(item_ref)
+            self._bump_analytics_version(batch, user_id or self._owner(item_ref))
+            batch.commit()
             return True
         except Exception as e:
             print(f"Error deleting pantry item: {e}")
             return False
 
+    def _query_users_in_range(
+        self,
+        collection: str,
+        field: str,
+        user_ids: List[str],
+        start: datetime,
+        end: datetime
+    ) -> List[Dict[str, Any]]:
+        """Documents of many users with `field` in [start, end), using chunked "in" queries"""
+        if not self.db or not user_ids:
+            return []
+        docs = []
+        try:
+            # "in" filters take at most 30 values
+            for offset in range(0, len(user_ids), 30):
+                query = (
+                    self.db.collection(collection)
+                    .where("user_id", "in", user_ids[offset:offset + 30])
+                    .where(field, ">=", start)
+                    .where(field, "<", end)
+                )
+                docs.extend(doc.to_dict() for doc in query.stream())
+            return docs
+        except Exception as e:
+            print(f"Error querying {collection} by {field}: {e}")
+            return docs
+
     # Comparisons
     def create_comparison(self, user_id: str, comparison_data: Dict[str, Any]) -> Optional[str]:
         """Create comparison"""
@@ -230,8 +693,11 @@ class FirebaseService:
             comp_ref = self.db.collection("comparisons").document()
             comparison_data["comparison_id"] = comp_ref.id
             comparison_data["user_id"] = user_id
-            comparison_data["created_at"] = datetime.now()
-            comp_ref.set(comparison_data)
+            comparison_data["created_at"] = utc_now()
+            batch = self.db.batch()
+            batch.set(comp_ref, comparison_data)
+            self._bump_analytics_version(batch, user_id)
+            batch.commit()
             return comp_ref.id
         except Exception as e:
             print(f"Error creating comparison: {e}")
@@ -263,14 +729,185 @@ class FirebaseService:
             notif_ref = self.db.collection("notifications").document()
             notification_data["notification_id"] = notif_ref.id
             notification_data["user_id"] = user_id
-            notification_data["sent_at"] = datetime.now()
+            notification_data["sent_at"] = utc_now()
             notification_data["read"] = False
-            notif_ref.set(notification_data)
+            batch = self.db.batch()
+            batch.set(notif_ref, notification_data)
+            self._count_unread(batch, {user_id: 1})
+            batch.commit()
+            get_broker().publish(user_id, "notification", notification_data)
             return notif_ref.id
         except Exception as e:
             print(f"Error creating notification: {e}")
             return None
 
+    # Notification outbox
+    def enqueue_notifications(self, notifications: List[Dict[str, Any]]) -> int:
+        """
+        Write notification records and their outbox entries together (each with
+        a user_id). The notification and its outbox entry share an id and are
+        committed in the same batch; records with a `dedup_key` get a
+        deterministic id and are skipped if already enqueued, so re-runs don't
+        notify twice.
+        """
+        if not self.db or not notifications:
+            return 0
+        enqueued = 0
+        try:
+            # Up to 3 writes per notification (record, outbox entry, unread counter), 500 writes per batch
+            for start in range(0, len(notifications), 160):
+                chunk = notifications[start:start + 160]
+                refs = [
+                    self.db.collection("notification_outbox").document(
+                        hashlib.sha1(n["dedup_key"].encode()).hexdigest()[:20] if n.get("dedup_key") else None
+                    )
+                    for n in chunk
+                ]
+                dedup_refs = [ref for ref, n in zip(refs, chunk) if n.get("dedup_key")]
+                existing = {doc.id for doc in self.db.get_all(dedup_refs) if doc.exists} if dedup_refs else set()
+
+                batch = self.db.batch()
+                now = datetime.now(timezone.utc)
+                records = []
+                for outbox_ref, notification_data in zip(refs, chunk):
+                    if outbox_ref.id in existing:
+                        continue
+                    record = {k: v for k, v in notification_data.items() if k != "dedup_key"}
+                    record["notification_id"] = outbox_ref.id
+                    record["sent_at"] = utc_now()
+                    record["read"] = False
+                    batch.set(self.db.collection("notifications").document(outbox_ref.id), record)
+                    batch.set(outbox_ref, {
+                        "outbox_id": outbox_ref.id,
+                        "notification_id": outbox_ref.id,
+                        "user_id": record["user_id"],
+                        "type": record.get("type"),
+                        "title": record.get("title"),
+                        "body": record.get("body"),
+                        "data": record.get("data", {}),
+                        "status": "pending",
+                        "attempts": 0,
+                        "next_attempt_at": now,
+                        "created_at": now
+                    })
+                    records.append(record)
+                unread: Dict[str, int] = {}
+                for record in records:
+                    unread[record["user_id"]] = unread.get(record["user_id"], 0) + 1
+                self._count_unread(batch, unread)
+                batch.commit()
+                for record in records:
+                    get_broker().publish(record["user_id"], "notification", record)
+                enqueued += len(records)
+            return enqueued
+        except Exception as e:
+            print(f"Error enqueueing notifications: {e}")
+            return enqueued
+
+    def claim_outbox(self, limit: int, lease_seconds: float, holder: str) -> List[Dict[str, Any]]:
+        """
+        Claim up to `limit` outbox entries that are due, in one transaction.
+        Claimed entries are leased by pushing next_attempt_at forward, so an
+        entry whose worker dies becomes due again when the lease runs out.
+        """
+        if not self.db:
+            return []
+        query = (
+            self.db.collection("notification_outbox")
+            .where("status", "in", ["pending", "sending"])
+            .where("next_attempt_at", "<=", datetime.now(timezone.utc))
+            .order_by("next_attempt_at")
+            .limit(limit)
+        )
+
+        @firestore.transactional
+        def claim(transaction) -> List[Dict[str, Any]]:
+            lease_until = datetime.now(timezone.utc) + timedelta(seconds=lease_seconds)
+            entries = []
+            for doc in transaction.get(query):
+                transaction.update(doc.reference, {
+                    "status": "sending",
+                    "next_attempt_at": lease_until,
+                    "claimed_by": holder
+                })
+                entries.append(doc.to_dict())
+            return entries
+
+        try:
+            return claim(self.db.transaction())
+        except Exception as e:
+            print(f"Error claiming outbox entries: {e}")
+            return []
+
+    def update_outbox(self, updates: Dict[str, Dict[str, Any]]) -> bool:
+        """Record delivery results (outbox_id -> fields) with batched writes"""
+        if not self.db or not updates:
+            return False
+        try:
+            outbox_ids = list(updates)
+            for start in range(0, len(outbox_ids), 500):
+                batch = self.db.batch()
+                for outbox_id in outbox_ids[start:start + 500]:
+                    batch.update(self.db.collection("notification_outbox").document(outbox_id), updates[outbox_id])
+                batch.commit()
+            return True
+        except Exception as e:
+            print(f"Error updating outbox entries: {e}")
+            return False
+
+    def get_due_receipt_checks(self, limit: int) -> List[Dict[str, Any]]:
+        """Sent outbox entries whose push receipts are due to be checked, oldest first"""
+        if not self.db:
+            return []
+        try:
+            docs = (
+                self.db.collection("notification_outbox")
+                .where("receipt_check_at", "<=", datetime.now(timezone.utc))
+                .order_by("receipt_check_at")
+                .limit(limit)
+                .stream()
+            )
+            return [doc.to_dict() for doc in docs]
+        except Exception as e:
+            print(f"Error getting due receipt checks: {e}")
+            return []
+
+    def update_receipt_checks(self, pending: Dict[str, Dict[str, str]], retry_at: datetime) -> bool:
+        """
+        Record a receipt check (outbox_id -> tickets still without a receipt,
+        ticket id -> token). Entries with tickets left are checked again at
+        `retry_at`; the rest leave the receipt queue.
+        """
+        return self.update_outbox({
+            outbox_id: {"ticket_tokens": tickets, "receipt_check_at": retry_at} if tickets else {
+                "ticket_tokens": firestore.DELETE_FIELD,
+                "receipt_check_at": firestore.DELETE_FIELD
+            }
+            for outbox_id, tickets in pending.items()
+        })
+
+    def delete_completed_outbox(self, before: datetime, limit: int = 400) -> int:
+        """Delete up to `limit` outbox entries that finished before `before`"""
+        if not self.db:
+            return 0
+        try:
+            docs = list(
+                self.db.collection("notification_outbox")
+                .where("status", "in", ["sent", "skipped", "failed"])
+                .where("completed_at", "<", before)
+                .limit(limit)
+                .stream()
+            )
+            for start in range(0, len(docs), 500):
+                batch = self.db.batch()
+                for doc in docs[start:start + 500]:
+                    batch.delete(doc.reference)
+                batch.commit()
+            return len(docs)
+        except Exception as e:
+            print(f"Error deleting completed outbox entries: {e}")
+            return 0
+
     def get_user_notifications(self, user_id: str, unread_only: bool = False) -> List[Dict[str, Any]]:
         """Get user notifications"""
         if not self.db:
@@ -287,42 +924,371 @@ class FirebaseService:
             print(f"Error getting notifications: {e}")
             return []
 
-    def mark_notification_read(self, notification_id: str) -> bool:
-        """Mark notification as read"""
+    def mark_notification_read(self, notification_id: str, user_id: Optional[str] = None) -> Optional[bool]:
+        """
+        Mark notification as read (and decrement the unread counter if it was
+        unread). Returns True if it went from unread to read, False if it was
+        already read, and None if it doesn't exist, isn't the user's, or the
+        write failed.
+        """
         if not self.db:
-            return False
-        try:
-            self.db.collection("notifications").document(notification_id).update({"read": True})
+            return None
+        notif_ref = self.db.collection("notifications").document(notification_id)
+
+        @firestore.transactional
+        def mark(transaction) -> Optional[bool]:
+            snapshot = notif_ref.get(transaction=transaction)
+            if not snapshot.exists:
+                return None
+            notification = snapshot.to_dict()
+            if user_id is not None and notification.get("user_id") != user_id:
+                return None
+            if notification.get("read"):
+                return False
+            transaction.update(notif_ref, {"read": True})
+            self._count_unread(transaction, {notification["user_id"]: -1})
             return True
+
+        try:
+            return mark(self.db.transaction())
         except Exception as e:
             print(f"Error marking notification read: {e}")
-            return False
+            return None
+
+    def mark_notifications_read(self, user_id: str, notification_ids: List[str]) -> List[str]:
+        """
+        Mark many of a user's notifications as read; returns the ids that
+        changed. Each chunk is read and updated in one transaction, so the
+        counter is decremented only for notifications that really went from
+        unread to read, even with concurrent calls.
+        """
+        if not self.db or not notification_ids:
+            return []
+
+        @firestore.transactional
+        def mark(transaction, refs) -> List[str]:
+            changed = []
+            for notif_doc in transaction.get_all(refs):
+                notification = notif_doc.to_dict() if notif_doc.exists else None
+                if notification and notification.get("user_id") == user_id and not notification.get("read"):
+                    transaction.update(notif_doc.reference, {"read": True})
+                    changed.append(notif_doc.id)
+            if changed:
+                self._count_unread(transaction, {user_id: -len(changed)})
+            return changed
+
+        marked = []
+        try:
+            # 499 updates + 1 counter write per transaction
+            for start in range(0, len(notification_ids), 499):
+                refs = [
+                    self.db.collection("notifications").document(notification_id)
+                    for notification_id in notification_ids[start:start + 499]
+                ]
+                marked.extend(mark(self.db.transaction(), refs))
+            return marked
+        except Exception as e:
+            print(f"Error marking notifications read: {e}")
+            return marked
+
+    def mark_all_notifications_read(self, user_id: str) -> List[str]:
+        """Mark every unread notification of a user as read, a page per transaction; returns their ids"""
+        if not self.db:
+            return []
+        query = (
+            self.db.collection("notifications")
+            .where("user_id", "==", user_id)
+            .where("read", "==", False)
+            .limit(499)
+        )
+
+        @firestore.transactional
+        def mark_page(transaction) -> List[str]:
+            docs = list(transaction.get(query))
+            for doc in docs:
+                transaction.update(doc.reference, {"read": True})
+            if docs:
+                self._count_unread(transaction, {user_id: -len(docs)})
+            return [doc.id for doc in docs]
+
+        marked = []
+        try:
+            while True:
+                page = mark_page(self.db.transaction())
+                if not page:
+                    break
+                marked.extend(page)
+            return marked
+        except Exception as e:
+            print(f"Error marking all notifications read: {e}")
+            return marked
+
+    def get_unread_count(self, user_id: str) -> int:
+        """Unread notification count from the maintained counter document"""
+        if not self.db:
+            return 0
+        counter_ref = self.db.collection("notification_counters").document(user_id)
+        unread_query = (
+            self.db.collection("notifications")
+            .where("user_id", "==", user_id)
+            .where("read", "==", False)
+            .count()
+        )
+
+        # Notifications from before the counter existed: count once and seed it. The count and
+        # the write share a transaction with the counter read, so concurrent increments aren't lost.
+        @firestore.transactional
+        def seed(transaction) -> int:
+            snapshot = counter_ref.get(transaction=transaction)
+            if snapshot.exists and snapshot.to_dict().get("seeded"):
+                return max(0, snapshot.to_dict().get("unread", 0))
+            unread = int(unread_query.get(transaction=transaction)[0][0].value)
+            transaction.set(counter_ref, {"user_id": user_id, "unread": unread, "seeded": True, "updated_at": utc_now()})
+            return unread
+
+        try:
+            counter_doc = counter_ref.get()
+            if counter_doc.exists and counter_doc.to_dict().get("seeded"):
+                return max(0, counter_doc.to_dict().get("unread", 0))
+            return seed(self.db.transaction())
+        except Exception as e:
+            print(f"Error getting unread count: {e}")
+            return 0
+
+    def delete_read_notifications(self, before: datetime, limit: int = 400, archive: bool = False) -> int:
+        """Delete (or move to notifications_archive) up to `limit` read notifications sent before `before`"""
+        if not self.db:
+            return 0
+        try:
+            docs = list(
+                self.db.collection("notifications")
+                .where("read", "==", True)
+                .where("sent_at", "<", before)
+                .limit(limit)
+                .stream()
+            )
+            # Archiving takes 2 writes per document, 500 writes per batch
+            step = 250 if archive else 500
+            for start in range(0, len(docs), step):
+                batch = self.db.batch()
+                for doc in docs[start:start + step]:
+                    if archive:
+                        batch.set(self.db.collection("notifications_archive").document(doc.id), doc.to_dict())
+                    batch.delete(doc.reference)
+                batch.commit()
+            return len(docs)
+        except Exception as e:
+            print(f"Error deleting read notifications: {e}")
+            return 0
+
+    def _count_unread(self, writer, deltas: Dict[str, int]):
+        """Add unread counter increments to a batch or transaction"""
+        for uid, delta in deltas.items():
+            if delta:
+                writer.set(
+                    self.db.collection("notification_counters").document(uid),
+                    {"user_id": uid, "unread": firestore.Increment(delta), "updated_at": utc_now()},
+                    merge=True
+                )
 
     # Push tokens
-    def save_push_token(self, user_id: str, token: str) -> bool:
-        """Save Expo push token for user"""
+    MAX_PUSH_DEVICES = 10
+
+    @staticmethod
+    def _push_devices(token_data: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+        """Devices of a push_tokens document, including a pre-multi-device `token` field"""
+        devices = dict(token_data.get("devices") or {})
+        legacy_token = token_data.get("token")
+        if legacy_token and all(device.get("token") != legacy_token for device in devices.values()):
+            devices[hashlib.sha1(legacy_token.encode()).hexdigest()[:16]] = {
+                "token": legacy_token,
+                "last_seen": token_data.get("updated_at")
+            }
+        return devices
+
+    @staticmethod
+    def _device_tokens(devices: Dict[str, Dict[str, Any]]) -> List[str]:
+        """Tokens of a user's devices, most recently seen first"""
+        ordered = sorted(
+            devices.values(),
+            key=lambda device: device.get("last_seen") or datetime.min.replace(tzinfo=timezone.utc),
+            reverse=True
+        )
+        return [device["token"] for device in ordered if device.get("token")]
+
+    def save_push_token(
+        self,
+        user_id: str,
+        token: str,
+        device_id: Optional[str] = None,
+        platform: Optional[str] = None,
+        device_name: Optional[str] = None
+    ) -> bool:
+        """Register a device's Expo push token for user (one entry per device)"""
         if not self.db:
             return False
-        try:
-            self.db.collection("push_tokens").document(user_id).set({
-                "user_id": user_id,
+        device_id = device_id or hashlib.sha1(token.encode()).hexdigest()[:16]
+        token_ref = self.db.collection("push_tokens").document(user_id)
+
+        @firestore.transactional
+        def register(transaction):
+            snapshot = token_ref.get(transaction=transaction)
+            devices = self._push_devices(snapshot.to_dict() or {}) if snapshot.exists else {}
+            # A token belongs to one device; drop it from any other entry (e.g. after a reinstall)
+            devices = {d: device for d, device in devices.items() if device.get("token") != token}
+            now = datetime.now(timezone.utc)
+            devices[device_id] = {
                 "token": token,
-                "updated_at": datetime.now()
+                "platform": platform,
+                "device_name": device_name,
+                "last_seen": now
+            }
+            # Keep the most recently seen devices
+            if len(devices) > self.MAX_PUSH_DEVICES:
+                keep = sorted(devices, key=lambda d: devices[d]["last_seen"] or now, reverse=True)
+                devices = {d: devices[d] for d in keep[:self.MAX_PUSH_DEVICES]}
+            transaction.set(token_ref, {
+                "user_id": user_id,
+                "devices": devices,
+                "updated_at": now
             })
+
+        try:
+            register(self.db.transaction())
             return True
         except Exception as e:
             print(f"Error saving push token: {e}")
             return False
 
     def get_push_token(self, user_id: str) -> Optional[str]:
-        """Get Expo push token for user"""
+        """Get the user's most recently seen Expo push token"""
+        tokens = self.get_push_tokens([user_id]).get(user_id)
+        return tokens[0] if tokens else None
+
+    def get_push_tokens(self, user_ids: List[str]) -> Dict[str, List[str]]:
+        """Get Expo push tokens of every device for many users with batched reads"""
+        if not self.db or not user_ids:
+            return {}
+        tokens = {}
+        try:
+            for start in range(0, len(user_ids), 500):
+                refs = [self.db.collection("push_tokens").document(uid) for uid in user_ids[start:start + 500]]
+                for token_doc in self.db.get_all(refs):
+                    if token_doc.exists:
+                        device_tokens = self._device_tokens(self._push_devices(token_doc.to_dict()))
+                        if device_tokens:
+                            tokens[token_doc.id] = device_tokens
+            return tokens
+        except Exception as e:
+            print(f"Error getting push tokens: {e}")
+            return tokens
+
+    def remove_push_tokens(self, dead_tokens: List[Tuple[str, str]]) -> int:
+        """Remove (user_id, token) pairs Expo reported as unregistered, with batched reads and per-device deletes"""
+        if not self.db or not dead_tokens:
+            return 0
+        dead: Dict[str, set] = {}
+        for user_id, token in dead_tokens:
+            dead.setdefault(user_id, set()).add(token)
+        user_ids = list(dead)
+        removed = 0
+        try:
+            for start in range(0, len(user_ids), 500):
+                refs = [self.db.collection("push_tokens").document(uid) for uid in user_ids[start:start + 500]]
+                batch = self.db.batch()
+                for token_doc in self.db.get_all(refs):
+                    if not token_doc.exists:
+                        continue
+                    token_data = token_doc.to_dict()
+                    gone = [
+                        device_id
+                        for device_id, device in self._push_devices(token_data).items()
+                        if device.get("token") in dead[token_doc.id]
+                    ]
+                    if not gone:
+                        continue
+                    # Delete only the dead devices' entries, so a device registered meanwhile is kept
+                    fields = {
+                        FieldPath("devices", device_id).to_api_repr(): firestore.DELETE_FIELD
+                        for device_id in gone
+                    }
+                    if token_data.get("token") in dead[token_doc.id]:
+                        fields["token"] = firestore.DELETE_FIELD
+                    batch.update(token_doc.reference, fields)
+                    removed += len(gone)
+                batch.commit()
+            return removed
+        except Exception as e:
+            print(f"Error removing push tokens: {e}")
+            return removed
+
+    # Notification state (last-notified index)
+    def get_notification_states(self, user_ids: List[str]) -> Dict[str, Dict[str, datetime]]:
+        """Get per-item last-notified timestamps for many users with batched reads"""
+        if not self.db or not user_ids:
+            return {}
+        states = {}
+        try:
+            for start in range(0, len(user_ids), 500):
+                refs = [self.db.collection("notification_state").document(uid) for uid in user_ids[start:start + 500]]
+                for state_doc in self.db.get_all(refs):
+                    if state_doc.exists:
+                        states[state_doc.id] = state_doc.to_dict().get("items", {})
+            return states
+        except Exception as e:
+            print(f"Error getting notification states: {e}")
+            return states
+
+    def update_notification_states(
+        self,
+        notified: Dict[str, Dict[str, datetime]],
+        pruned: Optional[Dict[str, List[str]]] = None
+    ) -> bool:
+        """Record last-notified timestamps per item and drop stale entries, with batched writes"""
         if not self.db:
-            return None
+            return False
+        pruned = pruned or {}
         try:
-            token_doc = self.db.collection("push_tokens").document(user_id).get()
-            if token_doc.exists:
-                return token_doc.to_dict().get("token")
+            user_ids = list(set(notified) | set(pruned))
+            for start in range(0, len(user_ids), 500):
+                batch = self.db.batch()
+                for uid in user_ids[start:start + 500]:
+                    items: Dict[str, Any] = dict(notified.get(uid, {}))
+                    for item_id in pruned.get(uid, []):
+                        items[item_id] = firestore.DELETE_FIELD
+                    batch.set(
+                        self.db.collection("notification_state").document(uid),
+                        {"user_id": uid, "items": items, "updated_at": utc_now()},
+                        merge=True
+                    )
+                batch.commit()
+            return True
+        except Exception as e:
+            print(f"Error updating notification states: {e}")
+            return False
+
+    # Achievements
+    def update_achievement_state(self, user_id: str, update: Callable[[Dict[str, Any]], Any]) -> Any:
+        """
+        Read-modify-write the user's achievement state in a transaction.
+        `update` mutates the state in place and its return value is passed
+        back; it may run more than once if the transaction is retried.
+        """
+        if not self.db:
             return None
+        ref = self.db.collection("achievement_state").document(user_id)
+
+        @firestore.transactional
+        def apply(transaction) -> Any:
+            snapshot = ref.get(transaction=transaction)
+            state = snapshot.to_dict() if snapshot.exists else {"user_id": user_id}
+            result = update(state)
+            state["updated_at"] = datetime.now(timezone.utc)
+            transaction.set(ref, state)
+            return result
+
+        try:
+            return apply(self.db.transaction())
         except Exception as e:
-            print(f"Error getting push token: {e}")
+            print(f"Error updating achievement state: {e}")
             return None
@@ -0,0 +1,165 @@
+import json
+import os
+import re
+import difflib
+from functools import lru_cache
+from typing import Dict, List, Any, Optional, Tuple
+
+DATA_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "ingredients.json")
+
+_TOKEN_RE = re.compile(r"[a-z0-9%]+")
+_QUANTITY_RE = re.compile(r"^\d+(\.\d+)?(%|oz|lb|lbs|ct|pk|g|kg|ml|l|gal|qt)?$")
+
+
+class IngredientNormalizer:
+    """
+    Resolves raw ingredient strings (e.g. receipt lines like "GV 2% MLK GAL")
+    to canonical ingredient ids from the catalog in data/ingredients.json.
+
+    Resolution: tokenize -> expand abbreviations -> drop brand/unit/size
+    tokens -> longest alias n-gram lookup -> fuzzy token correction. Results
+    are LRU-cached, so each distinct raw string is only matched once.
+
+    A match that covers only part of the name ("apple" in "apple pie") is
+    returned with lower confidence and `confident: False`; callers keep
+    the raw name and only rely on the canonical entry (its category, its
+    shelf life) for confident matches.
+    """
+
+    # Full coverage, fuzzy-corrected full coverage, or all but one of 3+ tokens
+    CONFIDENT_MATCH = 0.85
+
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(IngredientNormalizer, cls).__new__(cls)
+            cls._instance._load(DATA_PATH)
+        return cls._instance
+
+    def _load(self, path: str):
+        """Load the catalog and build the alias and token indexes"""
+        with open(path) as f:
+            data = json.load(f)
+
+        self.abbreviations: Dict[str, List[str]] = {
+            abbr: expansion.split() for abbr, expansion in data.get("abbreviations", {}).items()
+        }
+        self.stop_tokens = set(data.get("stop_tokens", []))
+        self.modifier_tokens: Dict[str, str] = {
+            token: modifier
+            for modifier, tokens in data.get("modifiers", {}).items()
+            for token in tokens
+        }
+
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        # alias token tuple -> ingredient id
+        self.alias_index: Dict[Tuple[str, ...], str] = {}
+        # token -> ingredient ids with an alias containing it
+        self.token_index: Dict[str, set] = {}
+
+        for entry in data.get("ingredients", []):
+            self.entries[entry["id"]] = entry
+            for alias in [entry["name"]] + entry.get("aliases", []):
+                tokens = tuple(self.tokenize(alias))
+                if tokens:
+                    self.alias_index.setdefault(tokens, entry["id"])
+                    for token in tokens:
+                        self.token_index.setdefault(token, set()).add(entry["id"])
+
+        self.max_alias_length = max((len(tokens) for tokens in self.alias_index), default=1)
+        self._vocabulary = list(self.token_index)
+        self.resolve_cached = lru_cache(maxsize=4096)(self._resolve)
+
+    @staticmethod
+    def _singular(token: str) -> str:
+        if len(token) > 3 and token.endswith("ies"):
+            return token[:-3] + "y"
+        if len(token) > 3 and token.endswith("oes"):
+            return token[:-2]
+        if len(token) > 3 and token.endswith("s") and not token.endswith(("ss", "us")):
+            return token[:-1]
+        return token
+
+    def tokenize(self, text: str) -> List[str]:
+        """Lowercase, expand abbreviations and drop brand/unit/quantity tokens"""
+        tokens = []
+        for raw in _TOKEN_RE.findall(text.lower()):
+            for token in self.abbreviations.get(raw, [raw]):
+                if token in self.stop_tokens or _QUANTITY_RE.match(token):
+                    continue
+                tokens.append(self._singular(token))
+        return tokens
+
+    def _match(self, tokens: List[str]) -> Optional[Tuple[str, int]]:
+        """Longest alias n-gram in the tokens; ties go to the rightmost (head noun)"""
+        for length in range(min(len(tokens), self.max_alias_length), 0, -1):
+            for start in range(len(tokens) - length, -1, -1):
+                ingredient_id = self.alias_index.get(tuple(tokens[start:start + length]))
+                if ingredient_id:
+                    return ingredient_id, length
+        return None
+
+    def _correct(self, token: str) -> str:
+        """Fuzzy-correct a token that is not in the catalog vocabulary"""
+        if token in self.token_index or len(token) < 4:
+            return token
+        matches = difflib.get_close_matches(token, self._vocabulary, n=1, cutoff=0.8)
+        return matches[0] if matches else token
+
+    def _resolve(self, raw_name: str) -> Dict[str, Any]:
+        expanded = [
+            token
+            for raw in _TOKEN_RE.findall(raw_name.lower())
+            for token in self.abbreviations.get(raw, [raw])
+        ]
+        modifiers = sorted({self.modifier_tokens[t] for t in expanded if t in self.modifier_tokens})
+        tokens = self.tokenize(raw_name)
+
+        confidence_scale = 1.0
+        match = self._match(tokens)
+        if match is None:
+            corrected = [self._correct(token) for token in tokens]
+            if corrected != tokens:
+                match = self._match(corrected)
+                confidence_scale = 0.85
+
+        if match is None:
+            return {
+                "id": None,
+                "name": " ".join(tokens) or raw_name.strip().lower(),
+                "category": None,
+                "modifiers": modifiers,
+                "confidence": 0.0,
+                "coverage": 0.0,
+                "confident": False
+            }
+
+        ingredient_id, matched_length = match
+        entry = self.entries[ingredient_id]
+        coverage = matched_length / len(tokens)
+        confidence = round(confidence_scale * (0.6 + 0.4 * coverage), 2)
+        return {
+            "id": ingredient_id,
+            "name": entry["name"],
+            "category": entry["category"],
+            "modifiers": modifiers,
+            "confidence": confidence,
+            "coverage": round(coverage, 2),
+            "confident": confidence >= self.CONFIDENT_MATCH
+        }
+
+    def resolve(self, raw_name: str) -> Dict[str, Any]:
+        """Resolve a raw name to {id, name, category, modifiers, confidence, coverage, confident}"""
+        # Copy so callers can't mutate the cached result
+        result = self.resolve_cached(raw_name or "")
+        return {**result, "modifiers": list(result["modifiers"])}
+
+    def resolve_many(self, raw_names: List[str]) -> List[Dict[str, Any]]:
+        """Resolve a batch of raw names (e.g. every line of a receipt)"""
+        return [self.resolve(name) for name in raw_names]
+
+    def canonical_key(self, raw_name: str) -> str:
+        """Stable key for an ingredient: its canonical id, or the cleaned name if unknown"""
+        resolved = self.resolve_cached(raw_name or "")
+        return resolved["id"] or resolved["name"]
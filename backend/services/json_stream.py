@@ -0,0 +1,90 @@
+import json
+from typing import List, Any
+
+
+class JSONArrayStreamParser:
+    """
+    Incremental parser for a streamed top-level JSON array.
+
+    Feed it text chunks as they arrive from the model and it returns each
+    array element as soon as its closing bracket has been received. Text
+    before the opening '[' (e.g. a ```json fence) is ignored.
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        self._started = False
+        self._finished = False
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._element_start = None
+
+    @property
+    def finished(self) -> bool:
+        return self._finished
+
+    def feed(self, chunk: str) -> List[Any]:
+        """Consume a chunk of text and return the elements completed by it"""
+        completed = []
+        offset = len(self._buffer)
+        self._buffer += chunk
+
+        for index in range(offset, len(self._buffer)):
+            if self._finished:
+                break
+
+            char = self._buffer[index]
+
+            if not self._started:
+                if char == "[":
+                    self._started = True
+                continue
+
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                continue
+
+            if char == '"':
+                self._in_string = True
+                if self._depth == 0 and self._element_start is None:
+                    self._element_start = index
+            elif char in "{[":
+                if self._depth == 0:
+                    self._element_start = index
+                self._depth += 1
+            elif char in "}]":
+                if self._depth == 0:
+                    # Closing bracket of the top-level array
+                    self._emit_scalar(index, completed)
+                    self._finished = True
+                    continue
+                self._depth -= 1
+                if self._depth == 0:
+                    completed.append(json.loads(self._buffer[self._element_start:index + 1]))
+                    self._element_start = None
+            elif char == "," and self._depth == 0:
+                self._emit_scalar(index, completed)
+            elif self._depth == 0 and self._element_start is None and not char.isspace():
+                self._element_start = index
+
+        # Drop everything already consumed so the buffer stays small
+        cut = self._element_start if self._element_start is not None else len(self._buffer)
+        self._buffer = self._buffer[cut:]
+        if self._element_start is not None:
+            self._element_start = 0
+
+        return completed
+
+    def _emit_scalar(self, end: int, completed: List[Any]):
+        """Emit a pending top-level scalar (string/number/literal) ending at `end`"""
+        if self._element_start is not None:
+            text = self._buffer[self._element_start:end].strip()
+            if text:
+                completed.append(json.loads(text))
+            self._element_start = None
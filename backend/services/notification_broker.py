@@ -0,0 +1,122 @@
+import asyncio
+import os
+from typing import Dict, Any, Optional, Set, Tuple
+
+
+class Subscription:
+    """One connected client's event queue, bound to the event loop it was created on"""
+
+    def __init__(self, user_id: str, max_pending: int = 100):
+        self.user_id = user_id
+        self.loop = asyncio.get_running_loop()
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_pending)
+
+    def deliver(self, event: str, data: Dict[str, Any]):
+        """Queue an event; safe to call from any thread"""
+        def put():
+            try:
+                self.queue.put_nowait((event, data))
+            except asyncio.QueueFull:
+                # A client this far behind will resync from the list endpoint
+                pass
+        self.loop.call_soon_threadsafe(put)
+
+    async def get(self) -> Tuple[str, Dict[str, Any]]:
+        return await self.queue.get()
+
+
+class NotificationBroker:
+    """
+    In-process pub/sub for notification events (`notification`, `read`).
+
+    FirebaseService publishes when notifications are created and the router
+    publishes when they are read; /api/notifications/stream subscribes.
+    Publishing only reaches clients connected to this worker, which is
+    enough for a single process.
+    """
+
+    def __init__(self):
+        self.subscribers: Dict[str, Set[Subscription]] = {}
+
+    def subscribe(self, user_id: str) -> Subscription:
+        subscription = Subscription(user_id)
+        self.subscribers.setdefault(user_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        subscribers = self.subscribers.get(subscription.user_id)
+        if subscribers is not None:
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self.subscribers[subscription.user_id]
+
+    def publish(self, user_id: str, event: str, data: Dict[str, Any]):
+        for subscription in list(self.subscribers.get(user_id, ())):
+            subscription.deliver(event, data)
+
+
+class FirestoreNotificationBroker(NotificationBroker):
+    """
+    Broker that works across workers: each subscription listens to the
+    user's unread notifications with a Firestore snapshot listener, so a
+    notification written by any worker or job reaches every connected
+    client. Local publishes are ignored because the write itself is the
+    publication.
+    """
+
+    def __init__(self):
+        super().__init__()
+        from services.firebase_service import FirebaseService
+        self.db = FirebaseService().db
+        self.watches: Dict[Subscription, Any] = {}
+
+    def subscribe(self, user_id: str) -> Subscription:
+        subscription = super().subscribe(user_id)
+        initial = [True]
+
+        def on_snapshot(snapshots, changes, read_time):
+            # The first snapshot is the current unread set, not new events
+            if initial[0]:
+                initial[0] = False
+                return
+            for change in changes:
+                if change.type.name == "ADDED":
+                    subscription.deliver("notification", change.document.to_dict())
+                elif change.type.name == "REMOVED":
+                    # Left the unread set: read (or deleted)
+                    subscription.deliver("read", {"notification_ids": [change.document.id]})
+
+        query = (
+            self.db.collection("notifications")
+            .where("user_id", "==", user_id)
+            .where("read", "==", False)
+        )
+        self.watches[subscription] = query.on_snapshot(on_snapshot)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        watch = self.watches.pop(subscription, None)
+        if watch is not None:
+            watch.unsubscribe()
+        super().unsubscribe(subscription)
+
+    def publish(self, user_id: str, event: str, data: Dict[str, Any]):
+        pass
+
+
+_broker: Optional[NotificationBroker] = None
+
+
+def get_broker() -> NotificationBroker:
+    """Firestore listeners in production, in-process otherwise (override with NOTIFICATION_BROKER)"""
+    global _broker
+    if _broker is None:
+        backend = os.getenv("NOTIFICATION_BROKER")
+        if backend is None:
+            backend = "firestore" if os.getenv("ENVIRONMENT") == "production" else "memory"
+        from services.firebase_service import FirebaseService
+        if backend == "firestore" and FirebaseService().db is not None:
+            _broker = FirestoreNotificationBroker()
+        else:
+            _broker = NotificationBroker()
+    return _broker
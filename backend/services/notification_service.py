@@ -1,102 +1,240 @@
 import httpx
+import asyncio
 import os
-from typing import List, Dict, Any, Optional
-from datetime import datetime
+from typing import List, Dict, Any, Optional, Tuple
+from datetime import datetime, timedelta, timezone
 
 
 class NotificationService:
-    EXPO_PUSH_URL = "https://exp.host/--/api/v2/push/send"
+    EXPO_PUSH_URL = os.getenv("EXPO_PUSH_URL", "https://exp.host/--/api/v2/push/send")
+    EXPO_RECEIPTS_URL = os.getenv("EXPO_RECEIPTS_URL", "https://exp.host/--/api/v2/push/getReceipts")
+    EXPO_CHUNK_SIZE = 100  # Expo's limit of messages per send request
+    EXPO_RECEIPT_CHUNK_SIZE = 1000  # Expo's limit of ticket ids per receipts request
+    RECEIPT_DELAY_SECONDS = 15 * 60  # Expo recommends waiting before fetching receipts
+    RECEIPT_EXPIRY_SECONDS = 24 * 3600  # Expo keeps receipts for a day
+
+    # One pooled HTTP/2 client shared by every instance, opened at startup and closed at shutdown
+    _client: Optional[httpx.AsyncClient] = None
 
     def __init__(self):
         self.access_token = os.getenv("EXPO_PUSH_ACCESS_TOKEN")
 
+    @classmethod
+    def build_client(cls, **overrides) -> httpx.AsyncClient:
+        """Create the pooled Expo client; limits and timeouts are tunable through the environment"""
+        headers = {
+            "Accept": "application/json",
+            "Accept-Encoding": "gzip, deflate",
+            "Content-Type": "application/json"
+        }
+        access_token = os.getenv("EXPO_PUSH_ACCESS_TOKEN")
+        if access_token:
+            headers["Authorization"] = f"Bearer {access_token}"
+
+        options = {
+            "http2": os.getenv("EXPO_HTTP2", "true").lower() == "true",
+            "headers": headers,
+            "limits": httpx.Limits(
+                max_connections=int(os.getenv("EXPO_MAX_CONNECTIONS", "20")),
+                max_keepalive_connections=int(os.getenv("EXPO_MAX_KEEPALIVE_CONNECTIONS", "10")),
+                keepalive_expiry=float(os.getenv("EXPO_KEEPALIVE_EXPIRY", "60"))
+            ),
+            "timeout": httpx.Timeout(
+                float(os.getenv("EXPO_TIMEOUT", "10")),
+                connect=float(os.getenv("EXPO_CONNECT_TIMEOUT", "5"))
+            )
+        }
+        options.update(overrides)
+        return httpx.AsyncClient(**options)
+
+    @classmethod
+    async def startup(cls, client: Optional[httpx.AsyncClient] = None):
+        """Open the shared client (called from the app's startup event)"""
+        if cls._client is None:
+            cls._client = client or cls.build_client()
+
+    @classmethod
+    async def shutdown(cls):
+        """Close the shared client and its pooled connections"""
+        if cls._client is not None:
+            await cls._client.aclose()
+            cls._client = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        # Scripts and jobs running outside the app get the client on first use
+        if NotificationService._client is None:
+            NotificationService._client = self.build_client()
+        return NotificationService._client
+
     async def send_push_notification(
         self,
         expo_push_token: str,
         title: str,
         body: str,
-        data: Optional[Dict[str, Any]] = None
+        data: Optional[Dict[str, Any]] = None,
+        user_id: Optional[str] = None
     ) -> bool:
         """Send push notification via Expo"""
-        try:
-            message = {
-                "to": expo_push_token,
-                "sound": "default",
-                "title": title,
-                "body": body,
-                "data": data or {}
-            }
-
-            headers = {
-                "Accept": "application/json",
-                "Content-Type": "application/json"
-            }
-
-            if self.access_token:
-                headers["Authorization"] = f"Bearer {self.access_token}"
-
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    self.EXPO_PUSH_URL,
-                    json=message,
-                    headers=headers,
-                    timeout=10.0
-                )
-
-                if response.status_code == 200:
-                    result = response.json()
-                    if result.get("data", {}).get("status") == "ok":
-                        return True
-                    print(f"Push notification error: {result}")
-                    return False
-                else:
-                    print(f"Push notification failed: {response.status_code}")
-                    return False
-
-        except Exception as e:
-            print(f"Error sending push notification: {e}")
+        ticket = (await self.send_batch_with_tickets([{
+            "token": expo_push_token,
+            "user_id": user_id,
+            "title": title,
+            "body": body,
+            "data": data
+        }]))[0]
+        if ticket.get("status") != "ok":
+            print(f"Push notification error: {ticket}")
             return False
+        return True
 
     async def send_batch_notifications(
         self,
         notifications: List[Dict[str, Any]]
     ) -> List[bool]:
-        """Send multiple push notifications"""
-        messages = []
-        for notif in notifications:
-            messages.append({
-                "to": notif["token"],
-                "sound": "default",
-                "title": notif["title"],
-                "body": notif["body"],
-                "data": notif.get("data", {})
-            })
-
-        try:
-            headers = {
-                "Accept": "application/json",
-                "Content-Type": "application/json"
-            }
+        """Send multiple push notifications; one success flag per notification"""
+        tickets = await self.send_batch_with_tickets(notifications)
+        return [ticket.get("status") == "ok" for ticket in tickets]
+
+    async def send_batch_with_tickets(
+        self,
+        notifications: List[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        """
+        Send push notifications ({token, title, body, data, user_id?}) and
+        return Expo's push ticket for each one, in input order.
+
+        Messages go out in chunks of EXPO_CHUNK_SIZE, sent concurrently; a
+        failed request only fails the tickets of its own chunk. Tokens Expo
+        reports as DeviceNotRegistered are removed; the outbox worker keeps
+        ok tickets on their entries for the receipt check.
+        """
+        semaphore = asyncio.Semaphore(int(os.getenv("EXPO_CONCURRENCY", "4")))
+
+        async def send_chunk(chunk: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+            messages = [
+                {
+                    "to": notif["token"],
+                    "sound": "default",
+                    "title": notif["title"],
+                    "body": notif["body"],
+                    "data": notif.get("data") or {}
+                }
+                for notif in chunk
+            ]
+            async with semaphore:
+                try:
+                    response = await self.client.post(self.EXPO_PUSH_URL, json=messages, timeout=30.0)
+                    if response.status_code == 200:
+                        tickets = response.json().get("data", [])
+                        if len(tickets) == len(chunk):
+                            return tickets
+                        error = f"Expected {len(chunk)} tickets, got {len(tickets)}"
+                    else:
+                        error = f"HTTP {response.status_code}: {response.text[:200]}"
+                except Exception as e:
+                    error = str(e)
+            print(f"Error sending batch notifications: {error}")
+            return [{"status": "error", "message": error}] * len(chunk)
+
+        chunks = await asyncio.gather(*(
+            send_chunk(notifications[start:start + self.EXPO_CHUNK_SIZE])
+            for start in range(0, len(notifications), self.EXPO_CHUNK_SIZE)
+        ))
+        tickets = [ticket for chunk in chunks for ticket in chunk]
 
-            if self.access_token:
-                headers["Authorization"] = f"Bearer {self.access_token}"
+        dead_tokens = [
+            (notif.get("user_id"), notif["token"])
+            for notif, ticket in zip(notifications, tickets)
+            if self.is_device_not_registered(ticket)
+        ]
 
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    self.EXPO_PUSH_URL,
-                    json=messages,
-                    headers=headers,
-                    timeout=30.0
-                )
+        await self.prune_tokens(dead_tokens)
+        return tickets
 
-                if response.status_code == 200:
-                    results = response.json()
-                    return [r.get("status") == "ok" for r in results.get("data", [])]
+    async def check_receipts(self, batch_size: int = 500) -> Dict[str, int]:
+        """
+        Fetch Expo push receipts for the tickets kept on sent outbox entries
+        and remove tokens whose receipt says DeviceNotRegistered. Tickets are
+        persisted, so any worker can run the check; those without a receipt
+        yet are checked again after RECEIPT_DELAY_SECONDS until they expire.
+        """
+        from services.firebase_service import FirebaseService
+        firebase_service = FirebaseService()
+        stats = {"checked": 0, "ok": 0, "errors": 0, "expired": 0, "tokens_removed": 0}
+        dead_tokens = []
 
-        except Exception as e:
-            print(f"Error sending batch notifications: {e}")
+        while True:
+            entries = await asyncio.to_thread(firebase_service.get_due_receipt_checks, batch_size)
+            if not entries:
+                break
+            now = datetime.now(timezone.utc)
+            # outbox_id -> {ticket_id: token} still without a receipt
+            pending: Dict[str, Dict[str, str]] = {}
+            owners: Dict[str, Tuple[str, Optional[str]]] = {}
+            for entry in entries:
+                tickets = dict(entry.get("ticket_tokens") or {})
+                completed_at = entry.get("completed_at")
+                # Receipts are gone after a day; don't keep asking for them
+                if completed_at and (now - completed_at).total_seconds() > self.RECEIPT_EXPIRY_SECONDS:
+                    stats["expired"] += len(tickets)
+                    tickets = {}
+                pending[entry["outbox_id"]] = tickets
+                for ticket_id in tickets:
+                    owners[ticket_id] = (entry["outbox_id"], entry.get("user_id"))
 
-        return [False] * len(notifications)
+            ticket_ids = list(owners)
+            for start in range(0, len(ticket_ids), self.EXPO_RECEIPT_CHUNK_SIZE):
+                ids = ticket_ids[start:start + self.EXPO_RECEIPT_CHUNK_SIZE]
+                try:
+                    response = await self.client.post(self.EXPO_RECEIPTS_URL, json={"ids": ids}, timeout=30.0)
+                    if response.status_code != 200:
+                        print(f"Push receipts request failed: {response.status_code}")
+                        continue
+                    receipts = response.json().get("data", {})
+                except Exception as e:
+                    print(f"Error fetching push receipts: {e}")
+                    continue
+
+                for ticket_id in ids:
+                    receipt = receipts.get(ticket_id)
+                    if receipt is None:
+                        # Not ready yet; try again on a later check
+                        continue
+                    outbox_id, user_id = owners[ticket_id]
+                    token = pending[outbox_id].pop(ticket_id)
+                    stats["checked"] += 1
+                    if receipt.get("status") == "ok":
+                        stats["ok"] += 1
+                        continue
+                    stats["errors"] += 1
+                    if self.is_device_not_registered(receipt):
+                        dead_tokens.append((user_id, token))
+                    else:
+                        print(f"Push receipt error: {receipt}")
+
+            retry_at = now + timedelta(seconds=self.RECEIPT_DELAY_SECONDS)
+            saved = await asyncio.to_thread(firebase_service.update_receipt_checks, pending, retry_at)
+            # Every entry is now either out of the queue or due later; stop if that couldn't be recorded
+            if not saved or len(entries) < batch_size:
+                break
+
+        stats["tokens_removed"] = await self.prune_tokens(dead_tokens)
+        return stats
+
+    async def prune_tokens(self, dead_tokens: List[Tuple[Optional[str], str]]) -> int:
+        """Remove push tokens Expo reported as DeviceNotRegistered"""
+        dead_tokens = [(user_id, token) for user_id, token in set(dead_tokens) if user_id]
+        if not dead_tokens:
+            return 0
+        from services.firebase_service import FirebaseService
+        removed = await asyncio.to_thread(FirebaseService().remove_push_tokens, dead_tokens)
+        print(f"🧹 Removed {removed} unregistered push tokens")
+        return removed
+
+    @staticmethod
+    def is_device_not_registered(ticket: Dict[str, Any]) -> bool:
+        return (ticket.get("details") or {}).get("error") == "DeviceNotRegistered"
 
     def create_expiration_notification(self, item_name: str, days_until: int) -> Dict[str, str]:
         """Create expiration notification message"""
@@ -112,6 +250,39 @@ class NotificationService:
 
         return {"title": title, "body": body}
 
+    def create_expiration_digest_notification(self, items: List[Dict[str, Any]]) -> Dict[str, str]:
+        """Create one summary message for all of a user's expiring items ({name, days_until})"""
+        if len(items) == 1:
+            return self.create_expiration_notification(items[0]["name"], items[0]["days_until"])
+
+        # Most urgent first
+        items = sorted(items, key=lambda x: x["days_until"])
+        expiring_today = [item["name"] for item in items if item["days_until"] <= 0]
+        expiring_soon = [item["name"] for item in items if item["days_until"] > 0]
+
+        if expiring_today:
+            title = f"⏰ {len(items)} Items Expiring Soon - {len(expiring_today)} Today!"
+        elif items[0]["days_until"] == 1:
+            title = f"⚠️ {len(items)} Items Expiring Soon"
+        else:
+            title = f"📅 {len(items)} Items Expiring in the Next Few Days"
+
+        parts = []
+        if expiring_today:
+            parts.append(f"{self._summarize_names(expiring_today)} {'expires' if len(expiring_today) == 1 else 'expire'} today.")
+        if expiring_soon:
+            parts.append(f"{self._summarize_names(expiring_soon)} will expire soon.")
+        parts.append("Check out recipe suggestions!")
+
+        return {"title": title, "body": " ".join(parts)}
+
+    @staticmethod
+    def _summarize_names(names: List[str], limit: int = 3) -> str:
+        """'a, b, c and 2 more' style list"""
+        if len(names) <= limit:
+            return " and ".join([", ".join(names[:-1]), names[-1]]) if len(names) > 1 else names[0]
+        return f"{', '.join(names[:limit])} and {len(names) - limit} more"
+
     def create_budget_notification(self, spent: float, budget: float) -> Dict[str, str]:
         """Create budget warning notification"""
         percentage = (spent / budget) * 100
@@ -128,6 +299,28 @@ class NotificationService:
 
         return {"title": title, "body": body}
 
+    def create_daily_summary_notification(
+        self,
+        spent: float,
+        budget: float,
+        calories: float,
+        calorie_goal: float
+    ) -> Dict[str, str]:
+        """Create end-of-day summary message for spending and nutrition"""
+        parts = []
+        if budget > 0 and spent > budget:
+            parts.append(f"You spent ${spent:.2f}, ${spent - budget:.2f} over your ${budget:.2f} budget.")
+        else:
+            parts.append(f"You spent ${spent:.2f} of your ${budget:.2f} budget.")
+
+        if calories > 0:
+            parts.append(f"You logged {calories:.0f} of {calorie_goal:.0f} calories.")
+
+        return {
+            "title": "📊 Your Daily Summary",
+            "body": " ".join(parts)
+        }
+
     def create_achievement_notification(self, achievement: str, description: str) -> Dict[str, str]:
         """Create achievement notification"""
         return {
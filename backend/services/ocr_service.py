@@ -3,6 +3,7 @@ from openai import OpenAI
 import os
 from typing import Dict, List, Any, Optional
 from datetime import datetime
+from utils.dates import utc_now
 import json
 
 
@@ -63,14 +64,14 @@ class OCRService:
 
             receipt_data = json.loads(content)
             
-            # Ensure purchase_date is datetime
+            # Ensure purchase_date is datetime (a naive one is the receipt's local time)
             if "purchase_date" in receipt_data and isinstance(receipt_data["purchase_date"], str):
                 try:
                     receipt_data["purchase_date"] = datetime.fromisoformat(receipt_data["purchase_date"].replace("Z", "+00:00"))
                 except:
-                    receipt_data["purchase_date"] = datetime.now()
+                    receipt_data["purchase_date"] = utc_now()
             else:
-                receipt_data["purchase_date"] = datetime.now()
+                receipt_data["purchase_date"] = utc_now()
 
             return receipt_data
 
@@ -81,7 +82,7 @@ class OCRService:
     def enhance_with_nutrition(self, items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """Add nutrition information to receipt items"""
         try:
-            items_text = ", ".join([item["name"] for item in items])
+            items_text = ", ".join([item.get("canonical_name") or item["name"] for item in items])
             
             response = self.client.chat.completions.create(
                 model="gpt-4o",
@@ -0,0 +1,235 @@
+import hashlib
+import threading
+import time
+import numpy as np
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Any, Optional, Callable, FrozenSet, Tuple
+from services.ingredient_normalizer import IngredientNormalizer
+
+
+class RecipeSuggestionCache:
+    """
+    Approximate cache for recipe suggestions keyed by ingredient-set similarity.
+
+    Each request is fingerprinted with a MinHash signature of its canonical
+    ingredient set. Signatures are banded into an LSH index so candidate
+    entries are found in O(bands) regardless of cache size; candidates are
+    then verified with exact Jaccard similarity. Dietary restrictions must
+    match exactly. Stale entries are served immediately and refreshed in the
+    background (stale-while-revalidate).
+    """
+
+    NUM_PERMUTATIONS = 64
+    BANDS = 16  # 4 rows per band -> ~50% Jaccard LSH candidate threshold
+    _PRIME = (1 << 61) - 1
+
+    def __init__(
+        self,
+        similarity_threshold: float = 0.8,
+        fresh_ttl: float = 3600,
+        stale_ttl: float = 24 * 3600,
+        max_entries: int = 10000
+    ):
+        self.similarity_threshold = similarity_threshold
+        self.fresh_ttl = fresh_ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+
+        rng = np.random.default_rng(1)
+        self._a = rng.integers(1, 1 << 32, self.NUM_PERMUTATIONS, dtype=np.uint64)
+        self._b = rng.integers(0, 1 << 32, self.NUM_PERMUTATIONS, dtype=np.uint64)
+
+        self._entries: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+        self._buckets: Dict[Tuple[str, int, bytes], set] = {}
+        self._next_id = 0
+        self._refreshing: set = set()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="recipe-cache")
+
+        self.stats = {"hits": 0, "approximate_hits": 0, "stale_hits": 0, "misses": 0, "refreshes": 0}
+
+    @staticmethod
+    def canonicalize(ingredients: List[str]) -> FrozenSet[str]:
+        """Canonical ingredient id set used for fingerprinting"""
+        normalizer = IngredientNormalizer()
+        return frozenset(normalizer.canonical_key(name) for name in ingredients if name.strip())
+
+    @staticmethod
+    def restrictions_key(dietary_restrictions: List[str]) -> str:
+        return "|".join(sorted(r.strip().lower() for r in dietary_restrictions))
+
+    def signature(self, ingredient_set: FrozenSet[str]) -> np.ndarray:
+        """MinHash signature of an ingredient set"""
+        if not ingredient_set:
+            return np.zeros(self.NUM_PERMUTATIONS, dtype=np.uint64)
+
+        hashes = np.array(
+            [int.from_bytes(hashlib.blake2b(name.encode(), digest_size=4).digest(), "big") for name in ingredient_set],
+            dtype=np.uint64
+        )
+        # (a * x + b) mod p for every permutation/token pair - 32-bit operands keep it within uint64
+        permuted = (np.outer(hashes, self._a) + self._b) % self._PRIME
+        return permuted.min(axis=0)
+
+    def _band_keys(self, restrictions: str, signature: np.ndarray) -> List[Tuple[str, int, bytes]]:
+        rows = self.NUM_PERMUTATIONS // self.BANDS
+        return [
+            (restrictions, band, signature[band * rows:(band + 1) * rows].tobytes())
+            for band in range(self.BANDS)
+        ]
+
+    @staticmethod
+    def jaccard(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+        if not a and not b:
+            return 1.0
+        return len(a & b) / len(a | b)
+
+    def _find(self, ingredient_set: FrozenSet[str], restrictions: str, signature: np.ndarray) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            candidates = set()
+            for key in self._band_keys(restrictions, signature):
+                candidates.update(self._buckets.get(key, ()))
+
+            best, best_similarity = None, 0.0
+            now = time.time()
+            for entry_id in candidates:
+                entry = self._entries[entry_id]
+                if now - entry["created_at"] > self.stale_ttl:
+                    continue
+                similarity = self.jaccard(ingredient_set, entry["ingredients"])
+                if similarity >= self.similarity_threshold and similarity > best_similarity:
+                    best, best_similarity = entry, similarity
+
+            if best is not None:
+                self._entries.move_to_end(best["id"])
+                return {**best, "similarity": best_similarity}
+            return None
+
+    def _insert(
+        self,
+        ingredient_set: FrozenSet[str],
+        restrictions: str,
+        signature: np.ndarray,
+        value: Any,
+        request: Tuple[List[str], List[str]]
+    ):
+        """Add an entry; `request` is the (ingredients, restrictions) it was computed from, reused on refresh"""
+        band_keys = self._band_keys(restrictions, signature)
+
+        with self._lock:
+            # Replace an entry for the identical request instead of duplicating it
+            for entry_id in list(self._buckets.get(band_keys[0], ())):
+                entry = self._entries[entry_id]
+                if entry["ingredients"] == ingredient_set and entry["restrictions"] == restrictions:
+                    self._remove(entry_id)
+
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = {
+                "id": entry_id,
+                "ingredients": ingredient_set,
+                "restrictions": restrictions,
+                "band_keys": band_keys,
+                "value": value,
+                "request": request,
+                "created_at": time.time()
+            }
+            for key in band_keys:
+                self._buckets.setdefault(key, set()).add(entry_id)
+
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def _remove(self, entry_id: int):
+        """Remove an entry and its LSH bucket memberships (caller holds the lock)"""
+        entry = self._entries.pop(entry_id)
+        for key in entry["band_keys"]:
+            bucket = self._buckets.get(key)
+            if bucket is not None:
+                bucket.discard(entry_id)
+                if not bucket:
+                    del self._buckets[key]
+
+    def get_or_compute(
+        self,
+        ingredients: List[str],
+        dietary_restrictions: List[str],
+        compute: Callable[[List[str], List[str]], Any]
+    ) -> Any:
+        """Serve a cached suggestion for a similar request, or compute and cache it"""
+        ingredient_set = self.canonicalize(ingredients)
+        restrictions = self.restrictions_key(dietary_restrictions)
+        signature = self.signature(ingredient_set)
+
+        entry = self._find(ingredient_set, restrictions, signature)
+        if entry is None:
+            self._count("misses")
+            value = compute(ingredients, dietary_restrictions)
+            if value:
+                # Don't cache failures (empty results)
+                self._insert(ingredient_set, restrictions, signature, value, (list(ingredients), list(dietary_restrictions)))
+            return value
+
+        self._count("hits")
+        if entry["similarity"] < 1.0:
+            self._count("approximate_hits")
+
+        if time.time() - entry["created_at"] > self.fresh_ttl:
+            self._count("stale_hits")
+            self._schedule_refresh(entry, compute)
+
+        return entry["value"]
+
+    def _count(self, stat: str):
+        with self._lock:
+            self.stats[stat] += 1
+
+    def _schedule_refresh(self, entry: Dict[str, Any], compute: Callable):
+        """
+        Recompute a stale entry in the background, at most once at a time per
+        entry. The entry is recomputed from its own request, not from the
+        (possibly only similar) request that found it stale.
+        """
+        entry_id = entry["id"]
+        ingredients, dietary_restrictions = entry["request"]
+        with self._lock:
+            if entry_id in self._refreshing:
+                return
+            self._refreshing.add(entry_id)
+
+        def refresh():
+            try:
+                value = compute(ingredients, dietary_restrictions)
+                if value:
+                    with self._lock:
+                        if entry_id in self._entries:
+                            self._remove(entry_id)
+                    self._insert(
+                        entry["ingredients"],
+                        entry["restrictions"],
+                        self.signature(entry["ingredients"]),
+                        value,
+                        entry["request"]
+                    )
+                    self._count("refreshes")
+            except Exception as e:
+                print(f"Recipe cache refresh error: {e}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(entry_id)
+
+        self._executor.submit(refresh)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Cache hit-rate statistics"""
+        with self._lock:
+            stats = dict(self.stats)
+            entries = len(self._entries)
+        lookups = stats["hits"] + stats["misses"]
+        return {
+            **stats,
+            "lookups": lookups,
+            "hit_rate": round(stats["hits"] / lookups, 3) if lookups else 0.0,
+            "entries": entries
+        }
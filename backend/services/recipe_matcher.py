@@ -1,7 +1,8 @@
 from openai import OpenAI
 import os
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterator
 import json
+from services.json_stream import JSONArrayStreamParser
 
 
 class RecipeMatcher:
@@ -11,24 +12,9 @@ class RecipeMatcher:
     def find_recipes_for_ingredients(self, ingredients: List[str], dietary_restrictions: List[str] = []) -> List[Dict[str, Any]]:
         """Find recipe suggestions based on available ingredients"""
         try:
-            ingredients_text = ", ".join(ingredients)
-            restrictions_text = ", ".join(dietary_restrictions) if dietary_restrictions else "none"
-
             response = self.client.chat.completions.create(
                 model="gpt-4o",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": """You are a recipe expert. Suggest 3 recipes using available ingredients.
-                        Return JSON array: [{name, ingredients_needed: [from list], additional_ingredients: [to buy], 
-                        prep_time, calories, difficulty, instructions: [brief steps]}]
-                        Prioritize using ingredients that will expire soon."""
-                    },
-                    {
-                        "role": "user",
-                        "content": f"Suggest recipes using: {ingredients_text}. Dietary restrictions: {restrictions_text}. Return ONLY valid JSON array."
-                    }
-                ],
+                messages=self._recipe_messages(ingredients, dietary_restrictions),
                 max_tokens=1500
             )
 
@@ -50,31 +36,9 @@ class RecipeMatcher:
     def generate_meal_plan(self, pantry_items: List[Dict[str, Any]], days: int = 3) -> List[Dict[str, Any]]:
         """Generate a meal plan based on pantry items"""
         try:
-            # Extract ingredient names, prioritizing expiring items
-            sorted_items = sorted(pantry_items, key=lambda x: x.get("expiration_date", "9999-12-31"))
-            ingredients = [item["name"] for item in sorted_items[:15]]  # Top 15 expiring
-            
-            ingredients_text = ", ".join(ingredients)
-
             response = self.client.chat.completions.create(
                 model="gpt-4o",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": f"""You are a meal planning expert. Create a {days}-day meal plan using available ingredients.
-                        Return JSON array of days: [{{
-                            day, 
-                            breakfast: {{name, ingredients, calories}}, 
-                            lunch: {{name, ingredients, calories}}, 
-                            dinner: {{name, ingredients, calories}}
-                        }}]
-                        Use expiring ingredients first."""
-                    },
-                    {
-                        "role": "user",
-                        "content": f"Create {days}-day meal plan with: {ingredients_text}. Return ONLY valid JSON."
-                    }
-                ],
+                messages=self._meal_plan_messages(pantry_items, days),
                 max_tokens=2000
             )
 
@@ -93,6 +57,89 @@ class RecipeMatcher:
             print(f"Meal plan generation error: {e}")
             return []
 
+    def stream_recipes_for_ingredients(self, ingredients: List[str], dietary_restrictions: List[str] = []) -> Iterator[Dict[str, Any]]:
+        """Stream recipe suggestions, yielding each recipe as soon as it is complete"""
+        yield from self._stream_json_array(
+            self._recipe_messages(ingredients, dietary_restrictions),
+            max_tokens=1500
+        )
+
+    def stream_meal_plan(self, pantry_items: List[Dict[str, Any]], days: int = 3) -> Iterator[Dict[str, Any]]:
+        """Stream a meal plan, yielding each day as soon as it is complete"""
+        yield from self._stream_json_array(
+            self._meal_plan_messages(pantry_items, days),
+            max_tokens=2000
+        )
+
+    def _stream_json_array(self, messages: List[Dict[str, Any]], max_tokens: int) -> Iterator[Dict[str, Any]]:
+        """Run a streaming completion and incrementally parse its JSON array output"""
+        parser = JSONArrayStreamParser()
+        stream = self.client.chat.completions.create(
+            model="gpt-4o",
+            messages=messages,
+            max_tokens=max_tokens,
+            stream=True
+        )
+
+        try:
+            for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    yield from parser.feed(delta)
+                if parser.finished:
+                    break
+        finally:
+            stream.close()
+
+    @staticmethod
+    def _recipe_messages(ingredients: List[str], dietary_restrictions: List[str]) -> List[Dict[str, Any]]:
+        """Build the chat messages for a recipe suggestion request"""
+        ingredients_text = ", ".join(ingredients)
+        restrictions_text = ", ".join(dietary_restrictions) if dietary_restrictions else "none"
+
+        return [
+            {
+                "role": "system",
+                "content": """You are a recipe expert. Suggest 3 recipes using available ingredients.
+                Return JSON array: [{name, ingredients_needed: [from list], additional_ingredients: [to buy], 
+                prep_time, calories, difficulty, instructions: [brief steps]}]
+                Prioritize using ingredients that will expire soon."""
+            },
+            {
+                "role": "user",
+                "content": f"Suggest recipes using: {ingredients_text}. Dietary restrictions: {restrictions_text}. Return ONLY valid JSON array."
+            }
+        ]
+
+    @staticmethod
+    def _meal_plan_messages(pantry_items: List[Dict[str, Any]], days: int) -> List[Dict[str, Any]]:
+        """Build the chat messages for a meal plan request"""
+        # Extract ingredient names, prioritizing expiring items
+        sorted_items = sorted(pantry_items, key=lambda x: str(x.get("expiration_date", "9999-12-31")))
+        ingredients = [item["name"] for item in sorted_items[:15]]  # Top 15 expiring
+        
+        ingredients_text = ", ".join(ingredients)
+
+        return [
+            {
+                "role": "system",
+                "content": f"""You are a meal planning expert. Create a {days}-day meal plan using available ingredients.
+                Return JSON array of days: [{{
+                    day, 
+                    breakfast: {{name, ingredients, calories}}, 
+                    lunch: {{name, ingredients, calories}}, 
+                    dinner: {{name, ingredients, calories}}
+                }}]
+                Use expiring ingredients first."""
+            },
+            {
+                "role": "user",
+                "content": f"Create {days}-day meal plan with: {ingredients_text}. Return ONLY valid JSON."
+            }
+        ]
+
     def suggest_shopping_list(self, desired_meals: List[str], pantry_items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """Generate shopping list for desired meals"""
         try:
@@ -0,0 +1,179 @@
+import numpy as np
+from typing import Dict, List, Any, Optional
+from datetime import datetime
+from services.expiration_service import ExpirationService
+from services.ingredient_normalizer import IngredientNormalizer
+
+
+class RecipeScorer:
+    """
+    Scores a recipe corpus against a pantry with sparse NumPy matrix operations.
+
+    The suggestions route uses `rank` to order (possibly cached) suggestions
+    for the requesting user's pantry, so recipes that use their soonest-
+    expiring items come first.
+    """
+
+    # Weight of a pantry ingredient by urgency level - use expiring items first
+    URGENCY_WEIGHTS = {
+        "expired": 0.0,
+        "expires_today": 4.0,
+        "urgent": 3.0,
+        "warning": 2.0,
+        "good": 1.0
+    }
+
+    def __init__(self, recipes: Optional[List[Dict[str, Any]]] = None):
+        self.normalizer = IngredientNormalizer()
+        self.ingredient_ids: Dict[str, int] = {}
+        self.recipes: List[Dict[str, Any]] = []
+
+        # Recipe x ingredient incidence matrix in CSR form (row = recipe)
+        self._indptr = np.zeros(1, dtype=np.int64)
+        self._indices = np.zeros(0, dtype=np.int32)
+        self._sizes = np.zeros(0, dtype=np.float32)
+
+        if recipes:
+            self.load_recipes(recipes)
+
+    def canonicalize(self, name: str) -> str:
+        """Canonical ingredient id used as the vocabulary key"""
+        return self.normalizer.canonical_key(name)
+
+    def ingredient_id(self, name: str, create: bool = False) -> Optional[int]:
+        """Get the integer id for an ingredient, optionally adding it to the vocabulary"""
+        key = self.canonicalize(name)
+        ingredient_id = self.ingredient_ids.get(key)
+        if ingredient_id is None and create:
+            ingredient_id = len(self.ingredient_ids)
+            self.ingredient_ids[key] = ingredient_id
+        return ingredient_id
+
+    def load_recipes(self, recipes: List[Dict[str, Any]]):
+        """Encode recipes ({name, ingredients: [names], ...}) into the sparse matrix"""
+        indptr = [0]
+        indices: List[int] = []
+        kept = []
+
+        for recipe in recipes:
+            ids = {self.ingredient_id(name, create=True) for name in recipe.get("ingredients", [])}
+            if not ids:
+                # Empty rows would break reduceat and can never match anyway
+                continue
+            indices.extend(sorted(ids))
+            indptr.append(len(indices))
+            kept.append(recipe)
+
+        self.recipes = kept
+        self._indptr = np.asarray(indptr, dtype=np.int64)
+        self._indices = np.asarray(indices, dtype=np.int32)
+        self._sizes = np.diff(self._indptr).astype(np.float32)
+
+    def pantry_vector(self, pantry_items: List[Dict[str, Any]]) -> np.ndarray:
+        """Build an urgency-weighted vector over the ingredient vocabulary"""
+        vector = np.zeros(len(self.ingredient_ids), dtype=np.float32)
+
+        for item in pantry_items:
+            ingredient_id = self.ingredient_id(item.get("name", ""))
+            if ingredient_id is None:
+                continue
+
+            exp_date = item.get("expiration_date")
+            if isinstance(exp_date, str):
+                exp_date = datetime.fromisoformat(exp_date.replace("Z", "+00:00"))
+
+            if exp_date:
+                weight = self.URGENCY_WEIGHTS[ExpirationService.get_urgency_level(exp_date)]
+            else:
+                weight = self.URGENCY_WEIGHTS["good"]
+
+            vector[ingredient_id] = max(vector[ingredient_id], weight)
+
+        return vector
+
+    def score(self, pantry_vector: np.ndarray) -> np.ndarray:
+        """Score every recipe: urgency-weighted matches scaled by pantry coverage"""
+        if not self.recipes:
+            return np.zeros(0, dtype=np.float32)
+
+        starts = self._indptr[:-1]
+        gathered = pantry_vector[self._indices]
+        weighted = np.add.reduceat(gathered, starts)
+        matched = np.add.reduceat((gathered > 0).astype(np.float32), starts)
+
+        return weighted * (matched / self._sizes)
+
+    def top_k_indices(self, pantry_vector: np.ndarray, k: int = 10) -> np.ndarray:
+        """Indices of the k best-scoring recipes, best first (zero scores excluded)"""
+        return self._select_top_k(self.score(pantry_vector), k)
+
+    @staticmethod
+    def _select_top_k(scores: np.ndarray, k: int) -> np.ndarray:
+        """
+        Partial sort of a score array - O(n) selection plus O(k log k)
+        ordering. Ties are broken by recipe order, including at the k-th
+        place, so the result doesn't depend on the selection algorithm.
+        """
+        if scores.size == 0 or k <= 0:
+            return np.zeros(0, dtype=np.int64)
+
+        k = min(k, scores.size)
+        kth = np.partition(-scores, k - 1)[k - 1]
+        candidates = np.flatnonzero((scores >= -kth) & (scores > 0))
+        return candidates[np.lexsort((candidates, -scores[candidates]))][:k]
+
+    def top_k(self, pantry_items: List[Dict[str, Any]], k: int = 10) -> List[Dict[str, Any]]:
+        """Get the k best recipes for a pantry with score and matched ingredients"""
+        vector = self.pantry_vector(pantry_items)
+        scores = self.score(vector)
+        names = {
+            ingredient_id: self.normalizer.entries.get(key, {}).get("name", key)
+            for key, ingredient_id in self.ingredient_ids.items()
+        }
+
+        results = []
+        for index in self._select_top_k(scores, k):
+            row = self._indices[self._indptr[index]:self._indptr[index + 1]]
+            matched = [names[int(i)] for i in row if vector[i] > 0]
+            results.append({
+                **self.recipes[index],
+                "score": round(float(scores[index]), 3),
+                "matched_ingredients": matched,
+                "missing_count": int(row.size - len(matched))
+            })
+
+        return results
+
+    @classmethod
+    def rank(
+        cls,
+        recipes: List[Dict[str, Any]],
+        pantry_items: List[Dict[str, Any]],
+        ingredients_key: str = "ingredients"
+    ) -> List[Dict[str, Any]]:
+        """
+        Order candidate recipes for a pantry, best first, adding score,
+        matched_ingredients and missing_count. Recipes that use nothing from
+        the pantry are kept, last, in their original order.
+        """
+        scorer = cls([
+            {"index": index, "ingredients": recipe.get(ingredients_key) or []}
+            for index, recipe in enumerate(recipes)
+        ])
+        ranked = scorer.top_k(pantry_items, k=len(recipes))
+        scored = {entry["index"] for entry in ranked}
+
+        results = [
+            {
+                **recipes[entry["index"]],
+                "score": entry["score"],
+                "matched_ingredients": entry["matched_ingredients"],
+                "missing_count": entry["missing_count"]
+            }
+            for entry in ranked
+        ]
+        for index, recipe in enumerate(recipes):
+            if index not in scored:
+                ingredients = recipe.get(ingredients_key) or []
+                results.append({**recipe, "score": 0.0, "matched_ingredients": [], "missing_count": len(ingredients)})
+        return results
@@ -0,0 +1,88 @@
+import json
+import os
+from typing import Dict, List, Any, Optional, Tuple
+from services.ingredient_normalizer import IngredientNormalizer
+
+DATA_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "shelf_life.json")
+
+_TERMINAL = "$"
+
+
+class ShelfLifeMatcher:
+    """
+    Compiled multi-pattern matcher over the shelf-life table in data/shelf_life.json.
+
+    Patterns are normalized with the ingredient tokenizer and compiled into a
+    token trie, so a name is matched in a single pass over its tokens. The
+    longest matching pattern wins ("chicken broth" beats "chicken"); ties go
+    to the rightmost match, which is usually the head noun.
+    """
+
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(ShelfLifeMatcher, cls).__new__(cls)
+            cls._instance._load(DATA_PATH)
+        return cls._instance
+
+    def _load(self, path: str):
+        """Load the shelf-life table and compile it into a token trie"""
+        with open(path) as f:
+            data = json.load(f)
+
+        self.normalizer = IngredientNormalizer()
+        self.storage_defaults: Dict[str, int] = data.get("storage_defaults", {})
+        self.trie: Dict[str, Any] = {}
+
+        for entry in data.get("items", []):
+            tokens = self.normalizer.tokenize(entry["name"])
+            if not tokens:
+                continue
+            node = self.trie
+            for token in tokens:
+                node = node.setdefault(token, {})
+            node[_TERMINAL] = {**entry, "tokens": tokens}
+
+    def match(self, tokens: List[str]) -> Optional[Dict[str, Any]]:
+        """Longest pattern contained in the token sequence"""
+        best: Optional[Tuple[int, int, Dict[str, Any]]] = None
+
+        for start in range(len(tokens)):
+            node = self.trie
+            for end in range(start, len(tokens)):
+                node = node.get(tokens[end])
+                if node is None:
+                    break
+                entry = node.get(_TERMINAL)
+                if entry is not None:
+                    length = end - start + 1
+                    # Longer wins; on equal length the later (rightmost) start wins
+                    if best is None or length >= best[0]:
+                        best = (length, start, entry)
+
+        return best[2] if best else None
+
+    def shelf_life_days(self, name: str, modifiers: Optional[List[str]] = None) -> Optional[int]:
+        """Shelf life in days for a name, adjusted for storage modifiers, or None if unknown"""
+        tokens = self.normalizer.tokenize(name)
+        entry = self.match(tokens)
+        if entry is None:
+            return None
+
+        if modifiers is None:
+            modifiers = self.normalizer.resolve(name)["modifiers"]
+
+        days = entry["days"]
+        for modifier in modifiers:
+            if modifier in entry["tokens"]:
+                # Already part of the pattern itself, e.g. "frozen pizza"
+                continue
+            if modifier in entry:
+                days = entry[modifier]
+            elif modifier in ("frozen", "canned", "dried") and modifier in self.storage_defaults:
+                days = max(days, self.storage_defaults[modifier])
+            elif modifier == "cooked" and "cooked" in self.storage_defaults:
+                days = min(days, self.storage_defaults["cooked"])
+
+        return days
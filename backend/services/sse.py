@@ -0,0 +1,25 @@
+import json
+from typing import Dict, Any, Iterator
+
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "X-Accel-Buffering": "no"  # Disable proxy buffering so events flush immediately
+}
+
+
+def format_sse(event: str, data: Any) -> str:
+    """Format a Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+def sse_stream(event: str, items: Iterator[Dict[str, Any]]) -> Iterator[str]:
+    """Wrap a generator of objects as an SSE stream terminated by a `done` event"""
+    count = 0
+    try:
+        for item in items:
+            count += 1
+            yield format_sse(event, item)
+        yield format_sse("done", {"count": count})
+    except Exception as e:
+        print(f"SSE stream error ({event}): {e}")
+        yield format_sse("error", {"detail": str(e)})
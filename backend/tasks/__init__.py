@@ -1,3 +1,7 @@
 from .scheduled_tasks import NotificationScheduler
+from .expiration_pipeline import ExpirationPipeline
+from .daily_summary_pipeline import DailySummaryPipeline
+from .outbox_worker import OutboxWorker
+from .retention_job import NotificationRetentionJob
 
-__all__ = ["NotificationScheduler"]
+__all__ = ["NotificationScheduler", "ExpirationPipeline", "DailySummaryPipeline", "OutboxWorker", "NotificationRetentionJob"]
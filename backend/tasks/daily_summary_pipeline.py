@@ -0,0 +1,146 @@
+from services.firebase_service import FirebaseService
+from services.notification_service import NotificationService
+from utils.dates import day_bounds, local_date, to_utc, utc_now, zone_of
+from datetime import datetime
+from zoneinfo import ZoneInfo
+from typing import Dict, List, Any, Optional, Tuple
+from collections import defaultdict
+import asyncio
+import os
+import time
+
+
+class DailySummaryPipeline:
+    """
+    Batch pipeline behind NotificationScheduler.send_daily_summaries.
+
+    1. Load the users' profiles (budget, calorie goal, timezone) with batched reads
+    2. For groups of USER_GROUP_SIZE users, read only today's receipts (by
+       `purchase_date`) and today's consumed items (by `consumed_date`) with
+       chunked `user_id in` range queries, run concurrently
+    3. Aggregate spend and nutrition per user over their local day (naive
+       dates are read in the user's timezone, see utils.dates)
+    4. Write the notification records and their pending outbox entries in
+       batched writes; the OutboxWorker sends the pushes
+
+    Users with no receipts and nothing consumed today are skipped.
+    """
+
+    USER_GROUP_SIZE = 300
+
+    def __init__(
+        self,
+        firebase_service: Optional[FirebaseService] = None,
+        notification_service: Optional[NotificationService] = None,
+        concurrency: Optional[int] = None
+    ):
+        self.firebase_service = firebase_service or FirebaseService()
+        self.notification_service = notification_service or NotificationService()
+        self.concurrency = concurrency or int(os.getenv("DAILY_SUMMARY_CONCURRENCY", "4"))
+
+    @staticmethod
+    def local_day(user: Dict[str, Any], now: datetime) -> Tuple[datetime, datetime]:
+        """UTC bounds of the user's current local day"""
+        zone = zone_of(user)
+        return day_bounds(local_date(now, zone), zone)
+
+    def aggregate(
+        self,
+        users: Dict[str, Dict[str, Any]],
+        now: datetime
+    ) -> Dict[str, Dict[str, float]]:
+        """Today's spend and nutrition for one group of users"""
+        zones: Dict[str, ZoneInfo] = {uid: zone_of(user) for uid, user in users.items()}
+        days = {uid: self.local_day(user, now) for uid, user in users.items()}
+        user_ids = list(users)
+        # One window covering every user's local day; each document is then checked against its own user's day
+        window_start = min(start for start, _ in days.values())
+        window_end = max(end for _, end in days.values())
+
+        totals: Dict[str, Dict[str, float]] = defaultdict(
+            lambda: {"spent": 0.0, "calories": 0.0, "protein": 0.0, "receipts": 0, "consumed": 0}
+        )
+
+        for receipt in self.firebase_service.get_receipts_in_range(user_ids, window_start, window_end):
+            uid = receipt.get("user_id")
+            purchase_date = to_utc(receipt.get("purchase_date"), zones.get(uid))
+            if uid in days and purchase_date and days[uid][0] <= purchase_date < days[uid][1]:
+                totals[uid]["spent"] += float(receipt.get("total_amount", 0) or 0)
+                totals[uid]["receipts"] += 1
+
+        for item in self.firebase_service.get_consumed_items_in_range(user_ids, window_start, window_end):
+            uid = item.get("user_id")
+            consumed_date = to_utc(item.get("consumed_date"), zones.get(uid))
+            if uid in days and consumed_date and days[uid][0] <= consumed_date < days[uid][1]:
+                totals[uid]["calories"] += float(item.get("calories", 0) or 0)
+                totals[uid]["protein"] += float(item.get("protein", 0) or 0)
+                totals[uid]["consumed"] += 1
+
+        return dict(totals)
+
+    def build_notification(self, user: Dict[str, Any], totals: Dict[str, float]) -> Dict[str, Any]:
+        """Notification record for one user's day"""
+        preferences = user.get("preferences", {})
+        budget = float(preferences.get("daily_budget", 50.0))
+        calorie_goal = float(preferences.get("daily_calorie_goal", 2000))
+        notif_data = self.notification_service.create_daily_summary_notification(
+            totals["spent"],
+            budget,
+            totals["calories"],
+            calorie_goal
+        )
+        return {
+            "type": "daily_summary",
+            "title": notif_data["title"],
+            "body": notif_data["body"],
+            "data": {
+                "spent_today": round(totals["spent"], 2),
+                "remaining_budget": round(budget - totals["spent"], 2),
+                "calories_today": round(totals["calories"], 0),
+                "protein_today": round(totals["protein"], 1)
+            }
+        }
+
+    async def run(self, user_ids: List[str]) -> Dict[str, Any]:
+        """Enqueue today's summary for `user_ids` and return run statistics"""
+        started = time.perf_counter()
+        now = utc_now()
+
+        users = await asyncio.to_thread(self.firebase_service.get_users, user_ids)
+        semaphore = asyncio.Semaphore(self.concurrency)
+        uids = list(users)
+
+        async def aggregate_group(group: List[str]) -> Dict[str, Dict[str, float]]:
+            async with semaphore:
+                return await asyncio.to_thread(self.aggregate, {uid: users[uid] for uid in group}, now)
+
+        groups = await asyncio.gather(*(
+            aggregate_group(uids[start:start + self.USER_GROUP_SIZE])
+            for start in range(0, len(uids), self.USER_GROUP_SIZE)
+        ))
+        totals = {uid: user_totals for group in groups for uid, user_totals in group.items()}
+        aggregated = time.perf_counter()
+
+        records = []
+        for uid, user_totals in totals.items():
+            day_start, _ = self.local_day(users[uid], now)
+            records.append({
+                "user_id": uid,
+                "dedup_key": f"daily_summary:{uid}:{day_start:%Y%m%d%H%M}",
+                **self.build_notification(users[uid], user_totals)
+            })
+
+        # Delivery happens in the outbox worker; this only writes records and pending outbox entries
+        enqueued = await asyncio.to_thread(self.firebase_service.enqueue_notifications, records)
+
+        elapsed = time.perf_counter() - started
+        stats = {
+            "users": len(user_ids),
+            "users_with_activity": len(totals),
+            "notifications_enqueued": enqueued,
+            "aggregate_seconds": round(aggregated - started, 2),
+            "elapsed_seconds": round(elapsed, 2),
+            "users_per_second": round(len(user_ids) / elapsed, 1) if elapsed else 0.0
+        }
+        print(f"✅ Daily summaries complete: {stats}")
+        return stats
@@ -0,0 +1,238 @@
+from services.firebase_service import FirebaseService
+from services.notification_service import NotificationService
+from services.expiration_service import ExpirationService
+from services.achievement_engine import AchievementEngine
+from utils.dates import to_utc, utc_now
+from datetime import datetime, timedelta
+from typing import Dict, List, Any, Optional, Tuple
+from collections import defaultdict
+import asyncio
+import hashlib
+import os
+import time
+
+
+class ExpirationPipeline:
+    """
+    Batch pipeline behind NotificationScheduler.check_expiring_items.
+
+    1. Stream one cross-user window query on `expiration_date` (or chunked
+       `user_id in` queries, read concurrently, when the run is limited to a
+       timezone bucket)
+    2. Group the items that are due a notification by user
+    3. Partition users into shards by a stable hash of the user id
+    4. Process shards concurrently: one batched write per shard of the
+       notification records and their pending outbox entries (pushes are
+       sent by the OutboxWorker)
+
+    In digest mode (the default) each user gets a single push and a single
+    notification record per run covering all of their expiring items.
+
+    A per-user last-notified index (`notification_state/{user_id}`) is read in
+    bulk for each shard and updated after enqueueing, so overlapping or
+    re-triggered runs skip items notified within the last 12 hours.
+
+    Unconsumed items the window shows as already expired are reported to the
+    AchievementEngine as `item_expired` events (it ignores repeats).
+    """
+
+    DIGEST_ITEM_LIMIT = 20  # items stored in a digest's data payload
+    STATE_RETENTION_DAYS = 7  # last-notified entries older than this are pruned
+
+    def __init__(
+        self,
+        firebase_service: Optional[FirebaseService] = None,
+        notification_service: Optional[NotificationService] = None,
+        shards: Optional[int] = None,
+        concurrency: Optional[int] = None,
+        digest: Optional[bool] = None,
+        lookahead_days: int = 3
+    ):
+        self.firebase_service = firebase_service or FirebaseService()
+        self.notification_service = notification_service or NotificationService()
+        self.shards = shards or int(os.getenv("EXPIRATION_SHARDS", "16"))
+        self.concurrency = concurrency or int(os.getenv("EXPIRATION_CONCURRENCY", "4"))
+        self.digest = digest if digest is not None else os.getenv("EXPIRATION_DIGEST", "true").lower() == "true"
+        self.lookahead_days = lookahead_days
+        self.achievement_engine = AchievementEngine(self.firebase_service, self.notification_service)
+
+    @staticmethod
+    def shard_of(user_id: str, shards: int) -> int:
+        """Stable shard assignment (Python's hash() is salted per process)"""
+        return int.from_bytes(hashlib.md5(user_id.encode()).digest()[:4], "little") % shards
+
+    def collect_due_items(
+        self,
+        now: datetime,
+        user_ids: Optional[List[str]] = None
+    ) -> Tuple[Dict[str, List[Dict[str, Any]]], Dict[str, List[str]]]:
+        """Stream the expiration window; group items due a notification, and already expired item ids, by user"""
+        by_user: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        expired: Dict[str, List[str]] = defaultdict(list)
+
+        # Start a day back so "expires today" items are still inside the window
+        window_start = now - timedelta(days=1)
+        window_end = now + timedelta(days=self.lookahead_days + 1)
+
+        items = self.firebase_service.stream_expiring_items(
+            window_start, window_end, user_ids=user_ids, concurrency=self.concurrency
+        )
+        for item in items:
+            expiration_date = to_utc(item.get("expiration_date"))
+            if not expiration_date or not item.get("user_id"):
+                continue
+            if expiration_date < now and item.get("item_id"):
+                expired[item["user_id"]].append(item["item_id"])
+            if not ExpirationService.should_send_notification(expiration_date, now=now):
+                continue
+
+            # Keep only what the notification needs to bound memory on large runs
+            by_user[item["user_id"]].append({
+                "item_id": item.get("item_id"),
+                "name": item.get("name", "An item"),
+                "expiration_date": expiration_date,
+                "days_until": (expiration_date - now).days
+            })
+
+        return by_user, expired
+
+    async def run(self, user_ids: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Run one expiration check over all users (or only `user_ids`) and return run statistics"""
+        started = time.perf_counter()
+        now = utc_now()
+
+        by_user, expired = await asyncio.to_thread(self.collect_due_items, now, user_ids)
+
+        shards: List[Dict[str, List[Dict[str, Any]]]] = [dict() for _ in range(self.shards)]
+        for user_id, items in by_user.items():
+            shards[self.shard_of(user_id, self.shards)][user_id] = items
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def run_shard(shard: Dict[str, List[Dict[str, Any]]]) -> Dict[str, int]:
+            async with semaphore:
+                return await self.process_shard(shard)
+
+        results = await asyncio.gather(*(run_shard(shard) for shard in shards if shard))
+
+        # Waste days are the user's local days, like the events recorded from the app
+        users = await asyncio.to_thread(self.firebase_service.get_users, list(expired)) if expired else {}
+
+        async def record_expired(user_id: str, item_ids: List[str]):
+            async with semaphore:
+                await asyncio.to_thread(
+                    self.achievement_engine.record_many,
+                    user_id,
+                    [("item_expired", {"event_id": item_id}) for item_id in item_ids],
+                    (users.get(user_id, {}).get("preferences") or {}).get("timezone")
+                )
+
+        await asyncio.gather(*(record_expired(user_id, item_ids) for user_id, item_ids in expired.items()))
+
+        stats = {
+            "users": len(by_user),
+            "items": sum(len(items) for items in by_user.values()),
+            "skipped_recently_notified": sum(r["skipped_recently_notified"] for r in results),
+            "notifications_enqueued": sum(r["notifications_enqueued"] for r in results),
+            "expired_items": sum(len(item_ids) for item_ids in expired.values()),
+            "shards": self.shards,
+            "elapsed_seconds": round(time.perf_counter() - started, 2)
+        }
+        print(f"✅ Expiration check complete: {stats}")
+        return stats
+
+    async def process_shard(self, shard: Dict[str, List[Dict[str, Any]]]) -> Dict[str, int]:
+        """Notify every user in one shard"""
+        user_ids = list(shard)
+        now = utc_now()
+        states = await asyncio.to_thread(self.firebase_service.get_notification_states, user_ids)
+
+        # Skip items already notified within the anti-spam window (overlapping or re-triggered runs)
+        due: Dict[str, List[Dict[str, Any]]] = {}
+        skipped = 0
+        for user_id in user_ids:
+            last_notified = states.get(user_id, {})
+            items = [
+                item for item in shard[user_id]
+                if ExpirationService.should_send_notification(
+                    item["expiration_date"],
+                    last_notified.get(item["item_id"]),
+                    now
+                )
+            ]
+            skipped += len(shard[user_id]) - len(items)
+            if items:
+                due[user_id] = items
+
+        records = []
+        for user_id, items in due.items():
+            for notification in self.build_notifications(items):
+                records.append({
+                    "user_id": user_id,
+                    # A retried run within the same hour reuses the outbox entry instead of notifying twice
+                    "dedup_key": f"expiration:{user_id}:{now:%Y%m%d%H}:{notification['data'].get('item_id', 'digest')}",
+                    **notification
+                })
+
+        # Delivery happens in the outbox worker; this only writes records and pending outbox entries
+        enqueued = await asyncio.to_thread(self.firebase_service.enqueue_notifications, records)
+
+        # Update the last-notified index and drop entries too old to matter again
+        notified = {
+            user_id: {item["item_id"]: now for item in items if item["item_id"]}
+            for user_id, items in due.items()
+        }
+        pruned = {
+            user_id: [
+                item_id for item_id, notified_at in state.items()
+                if (now - (to_utc(notified_at) or now)).days > self.STATE_RETENTION_DAYS
+            ]
+            for user_id, state in states.items()
+        }
+        await asyncio.to_thread(
+            self.firebase_service.update_notification_states,
+            notified,
+            {user_id: item_ids for user_id, item_ids in pruned.items() if item_ids}
+        )
+
+        return {
+            "skipped_recently_notified": skipped,
+            "notifications_enqueued": enqueued
+        }
+
+    def build_notifications(self, items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Notification records for one user's due items: a single digest, or one per item"""
+        if self.digest and len(items) > 1:
+            items = sorted(items, key=lambda x: x["days_until"])
+            notif_data = self.notification_service.create_expiration_digest_notification(items)
+            return [{
+                "type": "expiration",
+                "title": notif_data["title"],
+                "body": notif_data["body"],
+                "data": {
+                    "digest": True,
+                    "item_count": len(items),
+                    "items": [
+                        {"item_id": item["item_id"], "item_name": item["name"], "days_until": item["days_until"]}
+                        for item in items[:self.DIGEST_ITEM_LIMIT]
+                    ]
+                }
+            }]
+
+        notifications = []
+        for item in items:
+            notif_data = self.notification_service.create_expiration_notification(
+                item["name"],
+                item["days_until"]
+            )
+            notifications.append({
+                "type": "expiration",
+                "title": notif_data["title"],
+                "body": notif_data["body"],
+                "data": {
+                    "item_name": item["name"],
+                    "item_id": item["item_id"],
+                    "days_until": item["days_until"]
+                }
+            })
+        return notifications
@@ -0,0 +1,271 @@
+from abc import ABC, abstractmethod
+from services.firebase_service import FirebaseService
+from firebase_admin import firestore
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, Optional, Callable, Awaitable
+import asyncio
+import os
+import socket
+import sqlite3
+import time
+import uuid
+
+
+class JobLock(ABC):
+    """
+    Lease-based lock for one run of a scheduled job.
+
+    A run is identified by a key (job name + scheduled fire time). The holder
+    keeps its lease alive with `renew`; if it dies the lease expires and a
+    standby worker can acquire the key and take over. `complete` marks the
+    run as done so standbys stop waiting.
+
+    `shared` says whether the lock excludes workers on other machines.
+    """
+
+    shared = False
+
+    def __init__(self):
+        self.holder = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+    @abstractmethod
+    def acquire(self, key: str, ttl: float) -> bool:
+        """Take (or re-take) the lease on `key` unless another holder has a live one or the run is complete"""
+
+    @abstractmethod
+    def renew(self, key: str, ttl: float) -> bool:
+        """Extend our lease; False if it was lost"""
+
+    @abstractmethod
+    def complete(self, key: str):
+        """Mark the run as done"""
+
+    @abstractmethod
+    def release(self, key: str):
+        """Expire our lease so a standby can take over"""
+
+    @abstractmethod
+    def is_completed(self, key: str) -> bool:
+        """Whether some worker completed the run"""
+
+
+class FirestoreJobLock(JobLock):
+    """Job lock backed by `job_locks/{key}` documents updated in transactions (production)"""
+
+    shared = True
+
+    def __init__(self):
+        super().__init__()
+        self.db = FirebaseService().db
+
+    def _ref(self, key: str):
+        return self.db.collection("job_locks").document(key)
+
+    def acquire(self, key: str, ttl: float) -> bool:
+        holder = self.holder
+
+        @firestore.transactional
+        def try_acquire(transaction, ref) -> bool:
+            now = datetime.now(timezone.utc)
+            snapshot = ref.get(transaction=transaction)
+            if snapshot.exists:
+                lock = snapshot.to_dict()
+                if lock.get("completed"):
+                    return False
+                if lock.get("holder") != holder and lock.get("expires_at") and lock["expires_at"] > now:
+                    return False
+            transaction.set(ref, {
+                "holder": holder,
+                "expires_at": now + timedelta(seconds=ttl),
+                "completed": False,
+                "acquired_at": now
+            })
+            return True
+
+        try:
+            return try_acquire(self.db.transaction(), self._ref(key))
+        except Exception as e:
+            print(f"Error acquiring job lock {key}: {e}")
+            return False
+
+    def renew(self, key: str, ttl: float) -> bool:
+        holder = self.holder
+
+        @firestore.transactional
+        def try_renew(transaction, ref) -> bool:
+            snapshot = ref.get(transaction=transaction)
+            if not snapshot.exists or snapshot.to_dict().get("holder") != holder:
+                return False
+            transaction.update(ref, {"expires_at": datetime.now(timezone.utc) + timedelta(seconds=ttl)})
+            return True
+
+        try:
+            return try_renew(self.db.transaction(), self._ref(key))
+        except Exception as e:
+            print(f"Error renewing job lock {key}: {e}")
+            return False
+
+    def complete(self, key: str):
+        try:
+            self._ref(key).update({"completed": True, "completed_at": datetime.now(timezone.utc)})
+        except Exception as e:
+            print(f"Error completing job lock {key}: {e}")
+
+    def release(self, key: str):
+        try:
+            self._ref(key).update({"expires_at": datetime.now(timezone.utc)})
+        except Exception as e:
+            print(f"Error releasing job lock {key}: {e}")
+
+    def is_completed(self, key: str) -> bool:
+        try:
+            snapshot = self._ref(key).get()
+            return snapshot.exists and bool(snapshot.to_dict().get("completed"))
+        except Exception as e:
+            print(f"Error reading job lock {key}: {e}")
+            return False
+
+
+class SQLiteJobLock(JobLock):
+    """
+    Job lock backed by a local SQLite file, for several workers on one
+    machine (development). It does not exclude workers on other machines.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        super().__init__()
+        self.path = path or os.getenv("JOB_LOCK_PATH", ".job_locks.sqlite3")
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS job_locks ("
+                "key TEXT PRIMARY KEY, holder TEXT, expires_at REAL, completed INTEGER DEFAULT 0)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        # isolation_level=None so BEGIN IMMEDIATE takes the write lock explicitly
+        return sqlite3.connect(self.path, timeout=10, isolation_level=None)
+
+    def acquire(self, key: str, ttl: float) -> bool:
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            now = time.time()
+            row = conn.execute("SELECT holder, expires_at, completed FROM job_locks WHERE key = ?", (key,)).fetchone()
+            if row and (row[2] or (row[0] != self.holder and row[1] > now)):
+                conn.execute("ROLLBACK")
+                return False
+            conn.execute(
+                "INSERT OR REPLACE INTO job_locks (key, holder, expires_at, completed) VALUES (?, ?, ?, 0)",
+                (key, self.holder, now + ttl)
+            )
+            # Old completed runs are only kept as a record
+            conn.execute("DELETE FROM job_locks WHERE completed = 1 AND expires_at < ?", (now - 7 * 86400,))
+            conn.execute("COMMIT")
+            return True
+        except Exception as e:
+            print(f"Error acquiring job lock {key}: {e}")
+            return False
+        finally:
+            conn.close()
+
+    def renew(self, key: str, ttl: float) -> bool:
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE job_locks SET expires_at = ? WHERE key = ? AND holder = ?",
+                (time.time() + ttl, key, self.holder)
+            )
+            return cursor.rowcount == 1
+
+    def complete(self, key: str):
+        with self._connect() as conn:
+            conn.execute("UPDATE job_locks SET completed = 1 WHERE key = ? AND holder = ?", (key, self.holder))
+
+    def release(self, key: str):
+        with self._connect() as conn:
+            conn.execute("UPDATE job_locks SET expires_at = 0 WHERE key = ? AND holder = ?", (key, self.holder))
+
+    def is_completed(self, key: str) -> bool:
+        with self._connect() as conn:
+            row = conn.execute("SELECT completed FROM job_locks WHERE key = ?", (key,)).fetchone()
+            return bool(row and row[0])
+
+
+def create_job_lock() -> JobLock:
+    """Firestore leases (shared by every pod) unless JOB_LOCK_BACKEND=sqlite or Firestore is unavailable"""
+    backend = os.getenv("JOB_LOCK_BACKEND", "firestore")
+    if backend == "firestore":
+        if FirebaseService().db is not None:
+            return FirestoreJobLock()
+        print("⚠️ Firestore is unavailable, so scheduled jobs are locked with a local SQLite file")
+    return SQLiteJobLock()
+
+
+def check_job_lock(lock: JobLock) -> bool:
+    """
+    Whether the scheduler may run with `lock`. A lock that isn't shared
+    across machines only keeps the workers of one machine apart, so with
+    several pods every job would fire once per pod. In production that is
+    refused unless JOB_LOCK_BACKEND=sqlite was chosen explicitly (a single
+    machine); elsewhere it is only a warning.
+    """
+    if lock.shared:
+        return True
+    if os.getenv("ENVIRONMENT") == "production" and os.getenv("JOB_LOCK_BACKEND") != "sqlite":
+        print(
+            "🛑 Job lock is not shared across machines; not starting the scheduler. "
+            "Fix the Firestore connection, or set JOB_LOCK_BACKEND=sqlite for a single-machine deployment."
+        )
+        return False
+    print(
+        f"⚠️ {type(lock).__name__} only excludes workers on this machine. With several machines, "
+        "use JOB_LOCK_BACKEND=firestore or set RUN_SCHEDULER=false on all but one."
+    )
+    return True
+
+
+async def run_exclusive(
+    lock: JobLock,
+    job_name: str,
+    job: Callable[[], Awaitable[Any]],
+    ttl: float = 60,
+    standby_timeout: float = 3600,
+    fire_time: Optional[datetime] = None
+) -> Optional[Any]:
+    """
+    Run `job` on exactly one worker for this fire time.
+
+    Every worker calls this when the job fires. The one that acquires the
+    lease runs the job and renews the lease in the background; the others
+    stand by until the run is marked complete, or take over if the lease
+    expires because the leader died.
+    """
+    fire_time = fire_time or datetime.now(timezone.utc)
+    # Round to the nearest minute so workers with slightly skewed clocks agree on the key
+    slot = (fire_time + timedelta(seconds=30)).replace(second=0, microsecond=0)
+    key = f"{job_name}-{slot.strftime('%Y%m%d%H%M')}"
+
+    deadline = time.monotonic() + standby_timeout
+    while not await asyncio.to_thread(lock.acquire, key, ttl):
+        if await asyncio.to_thread(lock.is_completed, key) or time.monotonic() > deadline:
+            return None
+        await asyncio.sleep(ttl / 2)
+
+    async def heartbeat():
+        while True:
+            await asyncio.sleep(ttl / 3)
+            if not await asyncio.to_thread(lock.renew, key, ttl):
+                print(f"⚠️ Lost lease for {key}")
+                return
+
+    print(f"🔒 {lock.holder} running {key}")
+    renewer = asyncio.create_task(heartbeat())
+    try:
+        result = await job()
+        await asyncio.to_thread(lock.complete, key)
+        return result
+    except Exception:
+        # Let a standby retry this run
+        await asyncio.to_thread(lock.release, key)
+        raise
+    finally:
+        renewer.cancel()
@@ -0,0 +1,168 @@
+from services.firebase_service import FirebaseService
+from services.notification_service import NotificationService
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Any, Optional
+import asyncio
+import os
+import random
+import socket
+import time
+
+
+class OutboxWorker:
+    """
+    Delivers notifications queued in `notification_outbox`.
+
+    Producers (the scheduled pipelines) write the notification record and a
+    pending outbox entry in one batch and return. The worker claims due
+    entries under a lease, resolves push tokens in bulk, sends them in
+    chunked Expo batches and records each result:
+
+    - ok ticket for any of the user's devices -> `sent` (never sent again);
+      its tickets are kept on the entry for the push receipt check
+    - no push token -> `skipped` (the record is still in the user's history)
+    - DeviceNotRegistered on every device -> `failed`
+    - any other error -> back to `pending` with exponential backoff, until
+      `max_attempts` is reached
+
+    A worker that dies mid-batch leaves its entries `sending`; they become
+    due again when the lease expires. Delivery is at-least-once: only a crash
+    between Expo accepting a batch and the results being written can resend.
+    """
+
+    LEASE_SECONDS = 120
+    BACKOFF_SECONDS = 30
+    MAX_BACKOFF_SECONDS = 3600
+
+    def __init__(
+        self,
+        firebase_service: Optional[FirebaseService] = None,
+        notification_service: Optional[NotificationService] = None,
+        batch_size: Optional[int] = None,
+        max_attempts: Optional[int] = None,
+        time_budget: float = 50
+    ):
+        self.firebase_service = firebase_service or FirebaseService()
+        self.notification_service = notification_service or NotificationService()
+        self.batch_size = batch_size or int(os.getenv("OUTBOX_BATCH_SIZE", "500"))
+        self.max_attempts = max_attempts or int(os.getenv("OUTBOX_MAX_ATTEMPTS", "6"))
+        self.time_budget = time_budget
+        self.holder = f"{socket.gethostname()}:{os.getpid()}"
+
+    def backoff(self, attempts: int) -> float:
+        """Seconds before retry number `attempts`, with jitter so retries don't arrive in lockstep"""
+        delay = min(self.BACKOFF_SECONDS * 2 ** (attempts - 1), self.MAX_BACKOFF_SECONDS)
+        return delay * random.uniform(0.8, 1.2)
+
+    async def run(self) -> Dict[str, Any]:
+        """Drain due outbox entries until none are left or the time budget is spent"""
+        started = time.perf_counter()
+        stats = {"claimed": 0, "sent": 0, "retrying": 0, "failed": 0, "skipped_no_token": 0, "batches": 0}
+        latencies: List[float] = []
+
+        while time.perf_counter() - started < self.time_budget:
+            entries = await asyncio.to_thread(
+                self.firebase_service.claim_outbox,
+                self.batch_size,
+                self.LEASE_SECONDS,
+                self.holder
+            )
+            if not entries:
+                break
+            batch_started = time.perf_counter()
+            batch_stats = await self.deliver(entries)
+            latencies.append(time.perf_counter() - batch_started)
+            stats["batches"] += 1
+            stats["claimed"] += len(entries)
+            for key, value in batch_stats.items():
+                stats[key] += value
+            if len(entries) < self.batch_size:
+                break
+
+        elapsed = time.perf_counter() - started
+        latencies.sort()
+        stats["elapsed_seconds"] = round(elapsed, 2)
+        stats["sent_per_second"] = round(stats["sent"] / elapsed, 1) if elapsed else 0.0
+        stats["batch_p50_ms"] = round(latencies[len(latencies) // 2] * 1000, 1) if latencies else 0.0
+        stats["batch_p95_ms"] = round(latencies[int(len(latencies) * 0.95)] * 1000, 1) if latencies else 0.0
+        if stats["claimed"]:
+            print(f"📬 Outbox delivery: {stats}")
+        return stats
+
+    async def deliver(self, entries: List[Dict[str, Any]]) -> Dict[str, int]:
+        """Send one claimed batch and record the outcome of every entry"""
+        tokens = await asyncio.to_thread(
+            self.firebase_service.get_push_tokens,
+            list({entry["user_id"] for entry in entries})
+        )
+
+        # One message per device of each user
+        sendable = [entry for entry in entries if entry["user_id"] in tokens]
+        messages = []
+        owners = []
+        for index, entry in enumerate(sendable):
+            for token in tokens[entry["user_id"]]:
+                messages.append({
+                    "token": token,
+                    "user_id": entry["user_id"],
+                    "title": entry["title"],
+                    "body": entry["body"],
+                    "data": {
+                        "type": entry.get("type"),
+                        "notification_id": entry["notification_id"],
+                        **(entry.get("data") or {})
+                    }
+                })
+                owners.append(index)
+        tickets = await self.notification_service.send_batch_with_tickets(messages)
+
+        entry_tickets: List[List[Dict[str, Any]]] = [[] for _ in sendable]
+        for index, message, ticket in zip(owners, messages, tickets):
+            entry_tickets[index].append({**ticket, "token": message["token"]})
+
+        now = datetime.now(timezone.utc)
+        stats = {"sent": 0, "retrying": 0, "failed": 0, "skipped_no_token": 0}
+        updates: Dict[str, Dict[str, Any]] = {}
+
+        for entry in entries:
+            if entry["user_id"] not in tokens:
+                updates[entry["outbox_id"]] = {"status": "skipped", "completed_at": now}
+                stats["skipped_no_token"] += 1
+
+        for entry, device_tickets in zip(sendable, entry_tickets):
+            attempts = entry.get("attempts", 0) + 1
+            ok = [ticket for ticket in device_tickets if ticket.get("status") == "ok"]
+            errors = [ticket for ticket in device_tickets if ticket.get("status") != "ok"]
+            # Delivered to at least one device counts as sent; retrying would duplicate it on the others
+            if ok:
+                updates[entry["outbox_id"]] = {
+                    "status": "sent",
+                    "attempts": attempts,
+                    "ticket_ids": [ticket.get("id") for ticket in ok],
+                    # Tickets stay on the entry until their receipts are checked, by whichever worker gets there
+                    "ticket_tokens": {ticket["id"]: ticket["token"] for ticket in ok if ticket.get("id")},
+                    "receipt_check_at": now + timedelta(seconds=self.notification_service.RECEIPT_DELAY_SECONDS),
+                    "completed_at": now
+                }
+                stats["sent"] += 1
+            elif attempts >= self.max_attempts or all(
+                self.notification_service.is_device_not_registered(ticket) for ticket in errors
+            ):
+                updates[entry["outbox_id"]] = {
+                    "status": "failed",
+                    "attempts": attempts,
+                    "last_error": errors[0].get("message"),
+                    "completed_at": now
+                }
+                stats["failed"] += 1
+            else:
+                updates[entry["outbox_id"]] = {
+                    "status": "pending",
+                    "attempts": attempts,
+                    "last_error": errors[0].get("message"),
+                    "next_attempt_at": now + timedelta(seconds=self.backoff(attempts))
+                }
+                stats["retrying"] += 1
+
+        await asyncio.to_thread(self.firebase_service.update_outbox, updates)
+        return stats
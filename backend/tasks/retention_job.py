@@ -0,0 +1,88 @@
+from services.firebase_service import FirebaseService
+from utils.dates import utc_now
+from datetime import timedelta
+from typing import Dict, Any, Optional
+import asyncio
+import os
+import time
+
+
+class NotificationRetentionJob:
+    """
+    Keeps the notification collections small so the per-user list query
+    (`user_id` + `sent_at`) works on a small index.
+
+    - Read notifications older than NOTIFICATION_RETENTION_DAYS are deleted,
+      or moved to `notifications_archive` when NOTIFICATION_ARCHIVE is set.
+      Unread notifications are never removed, so unread counters stay exact.
+    - Outbox entries that finished (sent / skipped / failed) more than
+      OUTBOX_RETENTION_DAYS ago are deleted.
+
+    Deletes run in batches with a pause between them so compaction doesn't
+    compete with user traffic for write capacity.
+    """
+
+    def __init__(
+        self,
+        firebase_service: Optional[FirebaseService] = None,
+        retention_days: Optional[int] = None,
+        outbox_retention_days: Optional[int] = None,
+        archive: Optional[bool] = None,
+        batch_size: int = 400,
+        pause_seconds: float = 0.5,
+        time_budget: float = 600
+    ):
+        self.firebase_service = firebase_service or FirebaseService()
+        self.retention_days = retention_days or int(os.getenv("NOTIFICATION_RETENTION_DAYS", "30"))
+        self.outbox_retention_days = outbox_retention_days or int(os.getenv("OUTBOX_RETENTION_DAYS", "7"))
+        self.archive = archive if archive is not None else os.getenv("NOTIFICATION_ARCHIVE", "false").lower() == "true"
+        self.batch_size = batch_size
+        self.pause_seconds = pause_seconds
+        self.time_budget = time_budget
+
+    async def _drain(self, delete_batch, deadline: float) -> Dict[str, int]:
+        """Call `delete_batch` until it removes less than a full batch or time runs out"""
+        removed = 0
+        batches = 0
+        while time.perf_counter() < deadline:
+            count = await asyncio.to_thread(delete_batch)
+            removed += count
+            batches += 1
+            if count < self.batch_size:
+                break
+            await asyncio.sleep(self.pause_seconds)
+        return {"removed": removed, "batches": batches}
+
+    async def run(self) -> Dict[str, Any]:
+        """Run one compaction pass and return how many documents were removed"""
+        started = time.perf_counter()
+        deadline = started + self.time_budget
+
+        # Timestamps are stored in UTC (see utils.dates)
+        now = utc_now()
+        notification_cutoff = now - timedelta(days=self.retention_days)
+        outbox_cutoff = now - timedelta(days=self.outbox_retention_days)
+
+        notifications = await self._drain(
+            lambda: self.firebase_service.delete_read_notifications(
+                notification_cutoff, self.batch_size, self.archive
+            ),
+            deadline
+        )
+        outbox = await self._drain(
+            lambda: self.firebase_service.delete_completed_outbox(outbox_cutoff, self.batch_size),
+            deadline
+        )
+
+        stats = {
+            "notifications_removed": notifications["removed"],
+            "notifications_archived": notifications["removed"] if self.archive else 0,
+            "outbox_removed": outbox["removed"],
+            "batches": notifications["batches"] + outbox["batches"],
+            "retention_days": self.retention_days,
+            "outbox_retention_days": self.outbox_retention_days,
+            "timed_out": time.perf_counter() >= deadline,
+            "elapsed_seconds": round(time.perf_counter() - started, 2)
+        }
+        print(f"🧹 Notification retention complete: {stats}")
+        return stats
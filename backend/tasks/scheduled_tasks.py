@@ -2,9 +2,20 @@ from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from services.firebase_service import FirebaseService
 from services.notification_service import NotificationService
 from services.expiration_service import ExpirationService
+from tasks.expiration_pipeline import ExpirationPipeline
+from tasks.daily_summary_pipeline import DailySummaryPipeline
+from tasks.outbox_worker import OutboxWorker
+from tasks.retention_job import NotificationRetentionJob
+from tasks.job_lock import create_job_lock, check_job_lock, run_exclusive
+from tasks.timezone_buckets import timezones_at_local_hours
 from datetime import datetime, timedelta
+from typing import Dict, List, Optional
 import asyncio
 
+# Local times (in each user's profile timezone) at which jobs run
+EXPIRATION_LOCAL_HOURS = (8, 18)
+DAILY_SUMMARY_LOCAL_HOURS = (20,)
+
 
 class NotificationScheduler:
     def __init__(self):
@@ -12,98 +23,160 @@ class NotificationScheduler:
         self.firebase_service = FirebaseService()
         self.notification_service = NotificationService()
         self.expiration_service = ExpirationService()
+        self.expiration_pipeline = ExpirationPipeline(self.firebase_service, self.notification_service)
+        self.daily_summary_pipeline = DailySummaryPipeline(self.firebase_service, self.notification_service)
+        self.outbox_worker = OutboxWorker(self.firebase_service, self.notification_service)
+        self.retention_job = NotificationRetentionJob(self.firebase_service)
+        self.job_lock = create_job_lock()
+
+    def _exclusive(self, job_name: str, job):
+        """Wrap a job so that only one worker runs each firing of it"""
+        async def run():
+            await run_exclusive(self.job_lock, job_name, job)
+        return run
+
+    def _once(self, name: str, job):
+        """Wrap a one-off migration: run on one worker, and not again once it has completed"""
+        async def run():
+            if await asyncio.to_thread(self.firebase_service.is_migration_done, name):
+                return
+            result = await job()
+            if result is not None:
+                await asyncio.to_thread(self.firebase_service.mark_migration_done, name, result)
+        return self._exclusive(f"migration_{name}", run)
+
+    def _at_local_hours(self, local_hours, job):
+        """Wrap a per-user job so each hourly firing only processes users whose local hour matches"""
+        async def run():
+            timezones = timezones_at_local_hours(local_hours)
+            user_ids = await asyncio.to_thread(self.firebase_service.get_user_ids_in_timezones, timezones)
+            if user_ids:
+                await job(user_ids)
+        return run
 
     def start(self):
         """Start the scheduler"""
-        # Run expiration check twice daily (morning and evening)
+        if not check_job_lock(self.job_lock):
+            return
+        # Users created before preferences.timezone existed are given "UTC" once, before the first bucket runs
+        self.scheduler.add_job(self._once("user_timezones", self.backfill_user_timezones), 'date')
+        # Receipts from before spend rollups existed are folded in once, offline, not on a user's request
+        self.scheduler.add_job(self._once("spend_rollups", self.migrate_spend_rollups), 'date')
+        
+        # Jobs fire every hour and process the timezone buckets whose local time matches,
+        # so users are notified at their own 8 AM / 6 PM / 8 PM and load is spread over the day
         self.scheduler.add_job(
-            self.check_expiring_items,
+            self._exclusive(
+                "check_expiring_items",
+                self._at_local_hours(EXPIRATION_LOCAL_HOURS, self.check_expiring_items)
+            ),
             'cron',
-            hour='8,18',
             minute=0
         )
         
-        # Run daily summary at 8 PM
         self.scheduler.add_job(
-            self.send_daily_summaries,
+            self._exclusive(
+                "send_daily_summaries",
+                self._at_local_hours(DAILY_SUMMARY_LOCAL_HOURS, self.send_daily_summaries)
+            ),
             'cron',
-            hour=20,
             minute=0
         )
         
+        # Every worker drains the outbox; claims are transactional, so entries aren't sent twice
+        self.scheduler.add_job(
+            self.deliver_notifications,
+            'interval',
+            seconds=30
+        )
+        
+        # Compact old notifications and outbox entries once a day, off-peak
+        self.scheduler.add_job(
+            self._exclusive("notification_retention", self.compact_notifications),
+            'cron',
+            hour=3,
+            minute=30
+        )
+        
+        # Push tickets are kept on their outbox entries, so one worker checks receipts for all of them
+        self.scheduler.add_job(
+            self._exclusive("push_receipts", self.check_push_receipts),
+            'interval',
+            minutes=15
+        )
+        
         self.scheduler.start()
         print("📅 Notification scheduler started")
 
     def stop(self):
         """Stop the scheduler"""
-        self.scheduler.shutdown()
+        if self.scheduler.running:
+            self.scheduler.shutdown()
 
-    async def check_expiring_items(self):
-        """Check all users for expiring items and send notifications"""
+    async def check_expiring_items(self, user_ids: Optional[List[str]] = None):
+        """Check users (all, or only `user_ids`) for expiring items and send notifications"""
         print("🔍 Checking for expiring items...")
         
         try:
-            # This is a simplified version - in production, you'd want to batch process users
-            # For now, this would need to iterate through users
-            # You might want to add a method to get all users or use Cloud Functions
-            pass
+            await self.expiration_pipeline.run(user_ids)
         except Exception as e:
             print(f"Error checking expiring items: {e}")
 
-    async def send_daily_summaries(self):
-        """Send daily summaries to all users"""
+    async def send_daily_summaries(self, user_ids: List[str]):
+        """Send today's spending and nutrition summary to `user_ids`"""
         print("📊 Sending daily summaries...")
         
         try:
-            # Similar to above - would iterate through users
-            # Send summary of spending, calories, and pantry status
-            pass
+            await self.daily_summary_pipeline.run(user_ids)
         except Exception as e:
             print(f"Error sending daily summaries: {e}")
 
-    async def send_expiration_notification(self, user_id: str, item_name: str, days_until: int):
-        """Send expiration notification to a user"""
+    async def deliver_notifications(self):
+        """Send pending notifications from the outbox"""
         try:
-            # Get user's push token
-            push_token = self.firebase_service.get_push_token(user_id)
-            
-            if not push_token:
-                return
-            
-            # Create notification message
-            notif_data = self.notification_service.create_expiration_notification(
-                item_name,
-                days_until
-            )
-            
-            # Send push notification
-            await self.notification_service.send_push_notification(
-                push_token,
-                notif_data["title"],
-                notif_data["body"],
-                {
-                    "type": "expiration",
-                    "item_name": item_name,
-                    "days_until": days_until
-                }
-            )
-            
-            # Store in Firestore
-            self.firebase_service.create_notification(
-                user_id,
-                {
-                    "type": "expiration",
-                    "title": notif_data["title"],
-                    "body": notif_data["body"],
-                    "data": {
-                        "item_name": item_name,
-                        "days_until": days_until
-                    }
-                }
-            )
-            
+            await self.outbox_worker.run()
+        except Exception as e:
+            print(f"Error delivering notifications: {e}")
+
+    async def compact_notifications(self):
+        """Delete or archive old read notifications and finished outbox entries"""
+        try:
+            await self.retention_job.run()
+        except Exception as e:
+            print(f"Error compacting notifications: {e}")
+
+    async def backfill_user_timezones(self) -> Optional[Dict[str, int]]:
+        """Give users without a profile timezone the "UTC" default"""
+        try:
+            updated = await asyncio.to_thread(self.firebase_service.backfill_user_timezones)
+            if updated is None:
+                return None
+            print(f"🌐 Users given the UTC timezone: {updated}")
+            return {"users_updated": updated}
+        except Exception as e:
+            print(f"Error backfilling user timezones: {e}")
+            return None
+
+    async def migrate_spend_rollups(self) -> Optional[Dict[str, int]]:
+        """Count receipts written before spend rollups existed into their owners' rollups"""
+        try:
+            migrated = await asyncio.to_thread(self.firebase_service.migrate_spend_rollups)
+            if migrated is None:
+                return None
+            print(f"📈 Receipts folded into spend rollups: {migrated}")
+            return {"receipts_migrated": migrated}
+        except Exception as e:
+            print(f"Error migrating spend rollups: {e}")
+            return None
+
+    async def check_push_receipts(self):
+        """Check Expo push receipts and prune unregistered device tokens"""
+        try:
+            stats = await self.notification_service.check_receipts()
+            if stats["checked"]:
+                print(f"🧾 Push receipts checked: {stats}")
         except Exception as e:
-            print(f"Error sending expiration notification: {e}")
+            print(f"Error checking push receipts: {e}")
 
 
 # Global scheduler instance
@@ -0,0 +1,21 @@
+from datetime import datetime, timezone
+from typing import Dict, List, Iterable, Optional
+from zoneinfo import ZoneInfo, available_timezones
+
+# Loaded once; the tz database doesn't change while the process runs
+ZONES: Dict[str, ZoneInfo] = {name: ZoneInfo(name) for name in sorted(available_timezones())}
+
+
+def timezone_buckets(now: Optional[datetime] = None) -> Dict[int, List[str]]:
+    """Group every IANA timezone by its current local hour (0-23)"""
+    now = now or datetime.now(timezone.utc)
+    buckets: Dict[int, List[str]] = {}
+    for name, zone in ZONES.items():
+        buckets.setdefault(now.astimezone(zone).hour, []).append(name)
+    return buckets
+
+
+def timezones_at_local_hours(hours: Iterable[int], now: Optional[datetime] = None) -> List[str]:
+    """Timezones whose local time is currently within one of `hours`"""
+    buckets = timezone_buckets(now)
+    return [name for hour in hours for name in buckets.get(hour, [])]
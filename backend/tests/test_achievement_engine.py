@@ -0,0 +1,105 @@
+from datetime import datetime, timezone
+
+import services.achievement_engine as achievement_module
+from services.achievement_engine import AchievementEngine
+
+
+def ids(achievements):
+    return [achievement["id"] for achievement in achievements]
+
+
+def consume_on(state, *days):
+    unlocked = []
+    for day in days:
+        unlocked.extend(AchievementEngine.apply(state, "item_consumed", {}, day))
+    return unlocked
+
+
+def test_consume_streak_continues_on_consecutive_days():
+    state = {}
+    days = [f"202610{day:02d}" for day in range(10, 17)]
+    unlocked = consume_on(state, *days[:-1])
+    assert "cooking_streak_7" not in ids(unlocked)
+    assert state["consume_streak"] == {"day": "20261015", "length": 6}
+    assert ids(consume_on(state, days[-1])) == ["cooking_streak_7"]
+
+
+def test_consume_streak_counts_a_day_once():
+    state = {}
+    consume_on(state, "20261010", "20261010", "20261011")
+    assert state["consume_streak"] == {"day": "20261011", "length": 2}
+    assert state["counters"]["consumed"] == 3
+
+
+def test_consume_streak_resets_after_a_missed_day():
+    state = {}
+    consume_on(state, "20261010", "20261011", "20261013")
+    assert state["consume_streak"] == {"day": "20261013", "length": 1}
+
+
+def test_consume_streak_continues_across_a_month_boundary():
+    state = {}
+    consume_on(state, "20261031", "20261101")
+    assert state["consume_streak"]["length"] == 2
+
+
+def test_waste_free_days_count_from_the_last_expired_item():
+    state = {}
+    AchievementEngine.apply(state, "item_expired", {"event_id": "milk"}, "20261001")
+    assert AchievementEngine.metric(state, "waste_free_days", "20261001") == 0
+    assert ids(AchievementEngine.apply(state, "receipt_created", {}, "20261007")) == ["first_receipt"]
+    assert ids(AchievementEngine.apply(state, "receipt_created", {}, "20261008")) == ["waste_free_7"]
+    # An expired item starts the count again
+    AchievementEngine.apply(state, "item_expired", {"event_id": "eggs"}, "20261009")
+    assert AchievementEngine.metric(state, "waste_free_days", "20261012") == 3
+
+
+def test_waste_free_days_use_the_users_local_day(monkeypatch):
+    # 20:00 UTC on Oct 19 is already 09:00 on Oct 20 in Auckland
+    monkeypatch.setattr(achievement_module, "utc_now", lambda: datetime(2026, 10, 19, 20, tzinfo=timezone.utc))
+    assert AchievementEngine.today() == "20261019"
+    assert AchievementEngine.today("Pacific/Auckland") == "20261020"
+
+    utc_state = {"last_waste_day": "20261013", "unlocked": {"first_receipt": "20261001"}}
+    local_state = {"last_waste_day": "20261013", "unlocked": {"first_receipt": "20261001"}}
+    assert AchievementEngine.apply(utc_state, "receipt_created", {}, AchievementEngine.today()) == []
+    unlocked = AchievementEngine.apply(local_state, "receipt_created", {}, AchievementEngine.today("Pacific/Auckland"))
+    assert ids(unlocked) == ["waste_free_7"]
+    assert local_state["unlocked"]["waste_free_7"] == "20261020"
+
+
+def test_duplicate_events_are_counted_once():
+    state = {}
+    assert ids(AchievementEngine.apply(state, "receipt_created", {"event_id": "r1"}, "20261019")) == ["first_receipt"]
+    assert AchievementEngine.apply(state, "receipt_created", {"event_id": "r1"}, "20261019") == []
+    assert state["counters"]["receipts"] == 1
+    assert state["recent_events"] == {"receipt_created": ["r1"]}
+
+
+def test_duplicates_are_tracked_per_event_type():
+    state = {}
+    AchievementEngine.apply(state, "item_consumed", {"event_id": "item-1"}, "20261019")
+    # A burst of another event type doesn't evict item-1
+    for index in range(AchievementEngine.RECENT_EVENTS + 5):
+        AchievementEngine.apply(state, "receipt_created", {"event_id": f"r{index}"}, "20261019")
+    assert len(state["recent_events"]["receipt_created"]) == AchievementEngine.RECENT_EVENTS
+    AchievementEngine.apply(state, "item_consumed", {"event_id": "item-1"}, "20261019")
+    assert state["counters"]["consumed"] == 1
+    # The oldest receipt ids fell out of the window and would count again
+    AchievementEngine.apply(state, "receipt_created", {"event_id": "r0"}, "20261019")
+    assert state["counters"]["receipts"] == AchievementEngine.RECENT_EVENTS + 6
+
+
+def test_unknown_events_unlock_nothing():
+    state = {}
+    assert AchievementEngine.apply(state, "pantry_viewed", {}, "20261019") == []
+    assert state["counters"] == {}
+
+
+def test_negative_savings_do_not_count():
+    state = {}
+    AchievementEngine.apply(state, "comparison_saved", {"savings": 60}, "20261019")
+    AchievementEngine.apply(state, "comparison_saved", {"savings": -20}, "20261019")
+    unlocked = AchievementEngine.apply(state, "comparison_saved", {"savings": 40.5}, "20261019")
+    assert state["savings"] == 100.5
+    assert ids(unlocked) == ["savings_100"]
@@ -0,0 +1,106 @@
+from datetime import date, datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+import numpy as np
+
+from services.analytics_columns import epoch_days, period_starts, period_sums, timestamps
+
+NEW_YORK = ZoneInfo("America/New_York")
+EPOCH = date(1970, 1, 1)
+
+
+def epoch_day(day: date) -> int:
+    return (day - EPOCH).days
+
+
+def stamp(*args, tzinfo=timezone.utc) -> float:
+    return datetime(*args, tzinfo=tzinfo).timestamp()
+
+
+def test_epoch_days_uses_the_local_date():
+    # 02:00 UTC on Oct 19 is still Oct 18 in New York
+    days = epoch_days(np.array([stamp(2026, 10, 19, 2)]), NEW_YORK)
+    assert days.tolist() == [epoch_day(date(2026, 10, 18))]
+
+
+def test_epoch_days_uses_the_offset_in_force_at_each_timestamp():
+    # EDT (UTC-4) in summer, EST (UTC-5) in winter: 04:30 UTC is the same local day in July, the previous one in January
+    days = epoch_days(np.array([stamp(2026, 7, 1, 4, 30), stamp(2026, 1, 15, 4, 30)]), NEW_YORK)
+    assert days.tolist() == [epoch_day(date(2026, 7, 1)), epoch_day(date(2026, 1, 14))]
+
+
+def test_epoch_days_across_the_dst_switch():
+    # Clocks go back at 06:00 UTC on 2026-11-01; the last local hour of Nov 1 ends at 05:00 UTC on Nov 2
+    values = [stamp(2026, 11, 1, 5, 59), stamp(2026, 11, 1, 6, 0), stamp(2026, 11, 2, 4, 59), stamp(2026, 11, 2, 5, 0)]
+    days = epoch_days(np.array(values), NEW_YORK)
+    expected = [date(2026, 11, 1), date(2026, 11, 1), date(2026, 11, 1), date(2026, 11, 2)]
+    assert days.tolist() == [epoch_day(day) for day in expected]
+
+
+def test_epoch_days_marks_missing_timestamps():
+    days = epoch_days(np.array([np.nan, stamp(2026, 3, 1)]), ZoneInfo("UTC"))
+    assert days.tolist() == [-1, epoch_day(date(2026, 3, 1))]
+
+
+def test_naive_and_aware_values_are_the_same_local_day():
+    zone = ZoneInfo("Asia/Tokyo")
+    documents = [
+        {"purchase_date": datetime(2026, 10, 19, 1, 0)},  # wall-clock time in Tokyo
+        {"purchase_date": datetime(2026, 10, 18, 16, 0, tzinfo=timezone.utc)},  # the same instant
+        {"purchase_date": "2026-10-19T01:00:00"},
+        {"purchase_date": None},
+    ]
+    days = epoch_days(timestamps(documents, "purchase_date", zone), zone)
+    assert days.tolist() == [epoch_day(date(2026, 10, 19))] * 3 + [-1]
+
+
+def test_period_starts_week_starts_on_monday():
+    # 2026-10-19 is a Monday
+    days = np.array([epoch_day(date(2026, 10, 18)), epoch_day(date(2026, 10, 19)), epoch_day(date(2026, 10, 25))])
+    starts = period_starts(days, "week")
+    assert starts.tolist() == [epoch_day(date(2026, 10, 12)), epoch_day(date(2026, 10, 19)), epoch_day(date(2026, 10, 19))]
+
+
+def test_period_starts_month_boundaries():
+    days = [date(2026, 1, 31), date(2026, 2, 1), date(2028, 2, 29), date(2026, 12, 31), date(1969, 12, 31)]
+    starts = period_starts(np.array([epoch_day(day) for day in days]), "month")
+    expected = [date(2026, 1, 1), date(2026, 2, 1), date(2028, 2, 1), date(2026, 12, 1), date(1969, 12, 1)]
+    assert starts.tolist() == [epoch_day(day) for day in expected]
+
+
+def test_period_starts_day_is_identity():
+    days = np.array([0, 20000])
+    assert period_starts(days, "day").tolist() == [0, 20000]
+
+
+def test_period_sums_by_month():
+    periods = np.array([epoch_day(date(2026, 9, 1)), epoch_day(date(2026, 10, 1))])
+    days = np.array([
+        epoch_day(date(2026, 8, 31)),  # before the window
+        epoch_day(date(2026, 9, 1)),
+        epoch_day(date(2026, 9, 30)),
+        epoch_day(date(2026, 10, 1)),
+        epoch_day(date(2026, 11, 1)),  # after the window
+        -1,  # missing date
+    ])
+    values = np.array([100.0, 1.0, 2.0, 4.0, 100.0, 100.0])
+    assert period_sums(days, values, periods, "month").tolist() == [3.0, 4.0]
+
+
+def test_period_sums_by_week_across_a_month_boundary():
+    monday = date(2026, 9, 28)
+    periods = np.array([epoch_day(monday), epoch_day(monday + timedelta(days=7))])
+    days = np.array([epoch_day(date(2026, 9, 30)), epoch_day(date(2026, 10, 4)), epoch_day(date(2026, 10, 5))])
+    values = np.array([1.0, 2.0, 4.0])
+    assert period_sums(days, values, periods, "week").tolist() == [3.0, 4.0]
+
+
+def test_period_sums_skips_periods_outside_the_window():
+    # A week that starts inside the window's range but isn't one of its periods
+    periods = np.array([epoch_day(date(2026, 10, 5)), epoch_day(date(2026, 10, 19))])
+    days = np.array([epoch_day(date(2026, 10, 14)), epoch_day(date(2026, 10, 20))])
+    assert period_sums(days, np.array([1.0, 2.0]), periods, "week").tolist() == [0.0, 2.0]
+
+
+def test_period_sums_without_periods():
+    assert period_sums(np.array([1]), np.array([1.0]), np.array([], dtype=np.int64), "day").tolist() == []
@@ -0,0 +1,142 @@
+from datetime import datetime, timezone
+
+import pytest
+
+import services.budget_alert_service as budget_module
+import services.firebase_service as firebase_module
+from services.budget_alert_service import BudgetAlertService
+from services.firebase_service import FirebaseService
+from utils.dates import user_zone
+
+NEW_YORK = {"daily_budget": 50.0, "timezone": "America/New_York"}
+
+
+class FakeSnapshot:
+    def __init__(self, data):
+        self.exists = data is not None
+        self._data = data
+
+    def to_dict(self):
+        return dict(self._data)
+
+
+class FakeRef:
+    def __init__(self, store, doc_id):
+        self.store, self.id = store, doc_id
+
+    def get(self, transaction=None):
+        return FakeSnapshot(self.store.get(self.id))
+
+
+class FakeTransaction:
+    def set(self, ref, data, merge=False):
+        ref.store[ref.id] = {**ref.store.get(ref.id, {}), **data} if merge else data
+
+
+class FakeDb:
+    """spend_rollups documents keyed by id"""
+
+    def __init__(self):
+        self.rollups = {}
+
+    def collection(self, name):
+        assert name == "spend_rollups"
+        return self
+
+    def document(self, doc_id):
+        return FakeRef(self.rollups, doc_id)
+
+    def transaction(self):
+        return FakeTransaction()
+
+
+@pytest.fixture
+def firebase(monkeypatch):
+    monkeypatch.setattr(firebase_module.firestore, "transactional", lambda f: f)
+    service = FirebaseService.__new__(FirebaseService)
+    service.db = FakeDb()
+    service.enqueued = []
+    service.enqueue_notifications = service.enqueued.extend
+    return service
+
+
+def at(monkeypatch, *args):
+    monkeypatch.setattr(budget_module, "utc_now", lambda: datetime(*args, tzinfo=timezone.utc))
+
+
+def spend(firebase, user_id, day, amount):
+    """What the receipt write does to the day rollup"""
+    rollup = firebase.db.rollups.setdefault(f"{user_id}_day_{day}", {})
+    rollup["amount"] = rollup.get("amount", 0) + amount
+
+
+def upload(service, firebase, purchase_date, amount, preferences=NEW_YORK):
+    receipt = {
+        "purchase_date": purchase_date,
+        "total_amount": amount,
+        "spend_periods": FirebaseService.rollup_periods(purchase_date, user_zone(preferences["timezone"])),
+    }
+    spend(firebase, "u1", receipt["spend_periods"]["day"], amount)
+    return service.receipt_changed("u1", preferences, "r", None, receipt)
+
+
+def test_claim_records_each_threshold_once(firebase):
+    thresholds = {90: 45.0, 100: 50.0}
+    spend(firebase, "u1", "2026-10-19", 46)
+    assert firebase.claim_budget_alerts("u1", "2026-10-19", thresholds) == (46.0, [90])
+    assert firebase.claim_budget_alerts("u1", "2026-10-19", thresholds) == (46.0, [])
+    spend(firebase, "u1", "2026-10-19", 10)
+    assert firebase.claim_budget_alerts("u1", "2026-10-19", thresholds) == (56.0, [100])
+    assert firebase.db.rollups["u1_day_2026-10-19"]["alerted"] == [90, 100]
+
+
+def test_claim_without_spend(firebase):
+    assert firebase.claim_budget_alerts("u1", "2026-10-19", {90: 45.0, 100: 50.0}) == (0.0, [])
+    assert firebase.db.rollups == {}
+
+
+def test_one_receipt_crossing_both_thresholds_sends_one_alert(monkeypatch, firebase):
+    at(monkeypatch, 2026, 10, 19, 16)
+    service = BudgetAlertService(firebase)
+    assert upload(service, firebase, datetime(2026, 10, 19, 15, tzinfo=timezone.utc), 60.0) == [90, 100]
+    assert len(firebase.enqueued) == 1
+    alert = firebase.enqueued[0]
+    assert alert["data"] == {"threshold": 100, "spent_today": 60.0, "daily_budget": 50.0}
+    assert alert["dedup_key"] == "budget:u1:2026-10-19:100"
+    assert firebase.db.rollups["u1_day_2026-10-19"]["alerted"] == [90, 100]
+
+
+def test_repeat_receipts_on_the_same_day_do_not_re_alert(monkeypatch, firebase):
+    at(monkeypatch, 2026, 10, 19, 16)
+    service = BudgetAlertService(firebase)
+    purchase = datetime(2026, 10, 19, 15, tzinfo=timezone.utc)
+    assert upload(service, firebase, purchase, 20.0) == []
+    assert upload(service, firebase, purchase, 26.0) == [90]
+    assert upload(service, firebase, purchase, 1.0) == []
+    assert upload(service, firebase, purchase, 5.0) == [100]
+    assert upload(service, firebase, purchase, 30.0) == []
+    assert [alert["data"]["threshold"] for alert in firebase.enqueued] == [90, 100]
+
+
+def test_alerts_follow_the_users_local_day(monkeypatch, firebase):
+    service = BudgetAlertService(firebase)
+    # 03:00 UTC on Oct 19 is still 23:00 on Oct 18 in New York
+    at(monkeypatch, 2026, 10, 19, 3)
+    assert upload(service, firebase, datetime(2026, 10, 19, 2, 30, tzinfo=timezone.utc), 55.0) == [90, 100]
+    assert "u1_day_2026-10-18" in firebase.db.rollups
+    assert firebase.enqueued[-1]["dedup_key"] == "budget:u1:2026-10-18:100"
+
+    # After local midnight it's a new day with its own thresholds
+    at(monkeypatch, 2026, 10, 19, 5)
+    assert upload(service, firebase, datetime(2026, 10, 19, 4, 30, tzinfo=timezone.utc), 46.0) == [90]
+    assert firebase.db.rollups["u1_day_2026-10-19"]["alerted"] == [90]
+    assert firebase.enqueued[-1]["dedup_key"] == "budget:u1:2026-10-19:90"
+
+
+def test_back_dated_and_deleted_receipts_do_not_alert(monkeypatch, firebase):
+    at(monkeypatch, 2026, 10, 19, 16)
+    service = BudgetAlertService(firebase)
+    assert upload(service, firebase, datetime(2026, 10, 18, 15, tzinfo=timezone.utc), 80.0) == []
+    assert service.receipt_changed("u1", NEW_YORK, "r", {"total_amount": 80.0}, None) == []
+    assert service.receipt_changed("u1", {"daily_budget": 0}, "r", None, {"purchase_date": None}) == []
+    assert firebase.enqueued == []
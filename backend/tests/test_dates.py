@@ -0,0 +1,44 @@
+from datetime import date, datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+from utils.dates import day_bounds, local_date, period_start, to_utc, user_zone
+
+NEW_YORK = ZoneInfo("America/New_York")
+
+
+def test_naive_values_are_wall_clock_times_in_the_zone():
+    assert to_utc(datetime(2026, 10, 19, 9, 0), NEW_YORK) == datetime(2026, 10, 19, 13, 0, tzinfo=timezone.utc)
+    assert to_utc("2026-10-19T09:00:00", NEW_YORK) == datetime(2026, 10, 19, 13, 0, tzinfo=timezone.utc)
+
+
+def test_aware_values_keep_their_instant():
+    value = datetime(2026, 10, 19, 9, 0, tzinfo=ZoneInfo("Asia/Tokyo"))
+    assert to_utc(value, NEW_YORK) == datetime(2026, 10, 19, 0, 0, tzinfo=timezone.utc)
+
+
+def test_to_utc_rejects_non_dates():
+    assert to_utc(None) is None
+    assert to_utc("not a date") is None
+
+
+def test_local_date():
+    assert local_date(datetime(2026, 10, 19, 2, 0, tzinfo=timezone.utc), NEW_YORK) == date(2026, 10, 18)
+
+
+def test_day_bounds_across_dst():
+    start, end = day_bounds(date(2026, 11, 1), NEW_YORK)
+    assert start == datetime(2026, 11, 1, 4, 0, tzinfo=timezone.utc)
+    assert end - start == timedelta(hours=25)
+    start, end = day_bounds(date(2026, 3, 8), NEW_YORK)
+    assert end - start == timedelta(hours=23)
+
+
+def test_period_start():
+    assert period_start(date(2026, 10, 25), "week") == date(2026, 10, 19)
+    assert period_start(date(2026, 10, 25), "month") == date(2026, 10, 1)
+    assert period_start(date(2026, 10, 25), "day") == date(2026, 10, 25)
+
+
+def test_unknown_zone_falls_back_to_utc():
+    assert user_zone("Not/AZone") == ZoneInfo("UTC")
+    assert user_zone(None) == ZoneInfo("UTC")
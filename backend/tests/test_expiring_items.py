@@ -0,0 +1,74 @@
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock
+
+from services.firebase_service import FirebaseService
+
+NOW = datetime(2026, 10, 19, 12, tzinfo=timezone.utc)
+
+
+class FakeQuery:
+    """Just enough of a Firestore query: filters by user_id "in", pages by expiration_date"""
+
+    def __init__(self, items, tracker, user_ids=None, limit=None, after=None):
+        self.items, self.tracker = items, tracker
+        self.user_ids, self._limit, self.after = user_ids, limit, after
+
+    def where(self, field, op, value):
+        if field == "user_id":
+            return FakeQuery(self.items, self.tracker, value, self._limit, self.after)
+        return self
+
+    def order_by(self, field):
+        return self
+
+    def limit(self, count):
+        return FakeQuery(self.items, self.tracker, self.user_ids, count, self.after)
+
+    def start_after(self, doc):
+        return FakeQuery(self.items, self.tracker, self.user_ids, self._limit, doc)
+
+    def stream(self):
+        with self.tracker["lock"]:
+            self.tracker["active"] += 1
+            self.tracker["peak"] = max(self.tracker["peak"], self.tracker["active"])
+            self.tracker["queries"] += 1
+        time.sleep(0.01)
+        with self.tracker["lock"]:
+            self.tracker["active"] -= 1
+        docs = [item for item in self.items if self.user_ids is None or item["user_id"] in self.user_ids]
+        if self.after is not None:
+            docs = docs[docs.index(self.after.to_dict()) + 1:]
+        return [MagicMock(to_dict=lambda item=item: item) for item in docs[:self._limit]]
+
+
+def service_with(items):
+    tracker = {"lock": threading.Lock(), "active": 0, "peak": 0, "queries": 0}
+    service = FirebaseService.__new__(FirebaseService)
+    service.db = MagicMock()
+    service.db.collection.return_value = FakeQuery(items, tracker)
+    return service, tracker
+
+
+def test_user_chunks_are_read_concurrently_and_in_order():
+    users = [f"u{index:03d}" for index in range(200)]
+    items = [
+        {"user_id": user, "item_id": f"{user}-{n}", "expiration_date": NOW + timedelta(hours=n)}
+        for user in users for n in range(3)
+    ]
+    service, tracker = service_with(items)
+    streamed = list(service.stream_expiring_items(NOW, NOW + timedelta(days=4), page_size=50, user_ids=users, concurrency=4))
+
+    assert [item["item_id"] for item in streamed] == [item["item_id"] for item in items]
+    # 7 chunks of up to 30 users (3 items each), two 50-item pages per chunk
+    assert tracker["queries"] == 14
+    assert 1 < tracker["peak"] <= 4
+
+
+def test_all_users_runs_one_paged_query():
+    items = [{"user_id": f"u{index}", "item_id": str(index), "expiration_date": NOW} for index in range(5)]
+    service, tracker = service_with(items)
+    streamed = list(service.stream_expiring_items(NOW, NOW + timedelta(days=4), page_size=2))
+    assert len(streamed) == 5
+    assert tracker["queries"] == 3
@@ -0,0 +1,57 @@
+import pytest
+
+from services.category_classifier import CategoryClassifier
+from services.expiration_service import ExpirationService
+from services.ingredient_normalizer import IngredientNormalizer
+from utils.dates import utc_now
+
+
+@pytest.fixture(scope="module")
+def normalizer():
+    return IngredientNormalizer()
+
+
+@pytest.mark.parametrize("raw_name, partial_match", [
+    ("apple pie", "apple"),
+    ("chicken nuggets", "chicken"),
+    ("lemon pepper seasoning", "lemon"),
+    ("coconut milk", "milk"),
+    ("egg noodles", "pasta"),
+])
+def test_partial_matches_are_not_confident(normalizer, raw_name, partial_match):
+    resolved = normalizer.resolve(raw_name)
+    assert resolved["id"] == partial_match
+    assert resolved["coverage"] < 1.0
+    assert resolved["confidence"] < IngredientNormalizer.CONFIDENT_MATCH
+    assert not resolved["confident"]
+
+
+@pytest.mark.parametrize("raw_name, ingredient_id", [
+    ("GV 2% MLK GAL", "milk"),
+    ("bananas", "banana"),
+    ("chicken broth", "chicken_broth"),
+    ("organic baby spinach", "spinach"),
+])
+def test_full_matches_are_confident(normalizer, raw_name, ingredient_id):
+    resolved = normalizer.resolve(raw_name)
+    assert resolved["id"] == ingredient_id
+    assert resolved["confident"]
+
+
+def test_unknown_names_keep_the_cleaned_name(normalizer):
+    resolved = normalizer.resolve("xyzzy thing")
+    assert resolved["id"] is None
+    assert resolved["name"] == "xyzzy thing"
+    assert not resolved["confident"]
+
+
+def test_partial_matches_do_not_set_the_category():
+    # "coconut milk" must not be filed as dairy on the strength of "milk" alone
+    classification = CategoryClassifier().classify("coconut milk", use_model=False)
+    assert classification["confidence"] < IngredientNormalizer.CONFIDENT_MATCH
+
+
+def test_unnamed_items_get_the_category_default():
+    purchase_date = utc_now()
+    expiration = ExpirationService.estimate_many([{"name": None, "category": "snacks", "modifiers": []}], purchase_date)[0]
+    assert (expiration - purchase_date).days == ExpirationService.EXPIRATION_DEFAULTS["snacks"]
@@ -0,0 +1,72 @@
+import json
+
+from services.json_stream import JSONArrayStreamParser
+
+RECIPES = [
+    {"name": "Omelette", "ingredients_needed": ["eggs", "milk"], "instructions": ["Whisk", "Fry"]},
+    {"name": "Pasta \"al limone\"", "ingredients_needed": ["pasta", "lemon"], "notes": "zest, then juice [optional]"},
+    {"name": "Back\\slash {curly}", "ingredients_needed": [], "nested": {"a": [1, {"b": 2}]}},
+]
+
+
+def feed_all(parser, chunks):
+    elements = []
+    for chunk in chunks:
+        elements.extend(parser.feed(chunk))
+    return elements
+
+
+def test_whole_array_in_one_chunk():
+    parser = JSONArrayStreamParser()
+    assert parser.feed(json.dumps(RECIPES)) == RECIPES
+    assert parser.finished
+
+
+def test_every_split_point_yields_the_same_elements():
+    # Splits land inside strings, right after backslashes, between escape pairs and inside nested objects
+    text = json.dumps(RECIPES)
+    for split in range(1, len(text)):
+        parser = JSONArrayStreamParser()
+        assert feed_all(parser, [text[:split], text[split:]]) == RECIPES, split
+        assert parser.finished
+
+
+def test_character_by_character():
+    parser = JSONArrayStreamParser()
+    assert feed_all(parser, json.dumps(RECIPES)) == RECIPES
+
+
+def test_elements_are_returned_as_soon_as_they_close():
+    parser = JSONArrayStreamParser()
+    assert parser.feed('[{"name": "Omelette"}, {"name": "Pa') == [{"name": "Omelette"}]
+    assert parser.feed('ncakes"}') == [{"name": "Pancakes"}]
+    assert not parser.finished
+    assert parser.feed("]") == []
+    assert parser.finished
+
+
+def test_code_fence_and_trailing_text_are_ignored():
+    parser = JSONArrayStreamParser()
+    chunks = ["Here you go:\n```js", "on\n[", '{"name": "Soup"}', "]\n```\n", "Enjoy! [not parsed]"]
+    assert feed_all(parser, chunks) == [{"name": "Soup"}]
+    assert parser.finished
+
+
+def test_brackets_and_quotes_inside_strings_do_not_end_elements():
+    parser = JSONArrayStreamParser()
+    text = '[{"note": "use ] and } freely, even \\"quoted\\" ones \\\\"}]'
+    assert feed_all(parser, [text[:20], text[20:]]) == [{"note": 'use ] and } freely, even "quoted" ones \\'}]
+
+
+def test_non_object_elements():
+    elements = ["plain, string", 'with \\"escape\\"', 42, -1.5e3, True, False, None, [1, [2]], {"a": 1}]
+    text = json.dumps(elements)
+    for split in range(1, len(text)):
+        parser = JSONArrayStreamParser()
+        assert feed_all(parser, [text[:split], text[split:]]) == elements, split
+
+
+def test_empty_array():
+    parser = JSONArrayStreamParser()
+    assert feed_all(parser, ["```json\n[", "  ", "]"]) == []
+    assert parser.finished
@@ -0,0 +1,126 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from services.notification_service import NotificationService
+from tasks.outbox_worker import OutboxWorker
+
+DEAD = {"status": "error", "message": "gone", "details": {"error": "DeviceNotRegistered"}}
+RATE_LIMITED = {"status": "error", "message": "rate limited", "details": {"error": "MessageRateExceeded"}}
+
+
+class FakeFirebase:
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.updates = {}
+
+    def get_push_tokens(self, user_ids):
+        return {uid: self.tokens[uid] for uid in user_ids if uid in self.tokens}
+
+    def update_outbox(self, updates):
+        self.updates.update(updates)
+        return True
+
+
+class FakeExpo:
+    """Answers each message with the ticket scripted for its token"""
+
+    RECEIPT_DELAY_SECONDS = NotificationService.RECEIPT_DELAY_SECONDS
+    is_device_not_registered = staticmethod(NotificationService.is_device_not_registered)
+
+    def __init__(self, tickets):
+        self.tickets = tickets
+        self.sent = []
+
+    async def send_batch_with_tickets(self, messages):
+        self.sent.extend(messages)
+        return [self.tickets[message["token"]] for message in messages]
+
+
+def entry(user_id, attempts=0):
+    return {
+        "outbox_id": f"{user_id}-outbox",
+        "notification_id": f"{user_id}-outbox",
+        "user_id": user_id,
+        "type": "expiration",
+        "title": "Milk expires today",
+        "body": "Use it up",
+        "attempts": attempts,
+    }
+
+
+def deliver(entries, tokens, tickets, **worker_options):
+    firebase = FakeFirebase(tokens)
+    expo = FakeExpo(tickets)
+    worker = OutboxWorker(firebase, expo, **worker_options)
+    stats = asyncio.run(worker.deliver(entries))
+    return stats, firebase.updates, expo.sent
+
+
+def test_ok_on_any_device_is_sent_and_queued_for_receipts():
+    stats, updates, sent = deliver(
+        [entry("u1")],
+        {"u1": ["phone", "tablet"]},
+        {"phone": {"status": "ok", "id": "ticket-1"}, "tablet": RATE_LIMITED},
+    )
+    assert [message["token"] for message in sent] == ["phone", "tablet"]
+    assert sent[0]["data"]["notification_id"] == "u1-outbox"
+    update = updates["u1-outbox"]
+    assert update["status"] == "sent"
+    assert update["attempts"] == 1
+    assert update["ticket_ids"] == ["ticket-1"]
+    assert update["ticket_tokens"] == {"ticket-1": "phone"}
+    assert update["receipt_check_at"] - update["completed_at"] == timedelta(seconds=FakeExpo.RECEIPT_DELAY_SECONDS)
+    assert stats == {"sent": 1, "retrying": 0, "failed": 0, "skipped_no_token": 0}
+
+
+def test_errors_are_retried_with_exponential_backoff():
+    before = datetime.now(timezone.utc)
+    stats, updates, _ = deliver(
+        [entry("u1"), entry("u2", attempts=2)],
+        {"u1": ["a"], "u2": ["b"]},
+        {"a": RATE_LIMITED, "b": RATE_LIMITED},
+    )
+    first, third = updates["u1-outbox"], updates["u2-outbox"]
+    assert first["status"] == third["status"] == "pending"
+    assert (first["attempts"], third["attempts"]) == (1, 3)
+    assert first["last_error"] == "rate limited"
+    # 30s then 120s, each with +/-20% jitter
+    assert timedelta(seconds=24) <= first["next_attempt_at"] - before <= timedelta(seconds=37)
+    assert timedelta(seconds=96) <= third["next_attempt_at"] - before <= timedelta(seconds=145)
+    assert stats["retrying"] == 2
+
+
+def test_backoff_is_capped():
+    worker = OutboxWorker(FakeFirebase({}), FakeExpo({}))
+    assert worker.backoff(20) <= worker.MAX_BACKOFF_SECONDS * 1.2
+
+
+def test_errors_fail_at_max_attempts(monkeypatch):
+    monkeypatch.setenv("OUTBOX_MAX_ATTEMPTS", "3")
+    stats, updates, _ = deliver(
+        [entry("u1", attempts=1), entry("u2", attempts=2)],
+        {"u1": ["a"], "u2": ["b"]},
+        {"a": RATE_LIMITED, "b": RATE_LIMITED},
+    )
+    assert updates["u1-outbox"]["status"] == "pending"
+    failed = updates["u2-outbox"]
+    assert failed["status"] == "failed"
+    assert failed["attempts"] == 3
+    assert failed["last_error"] == "rate limited"
+    assert "completed_at" in failed
+    assert stats == {"sent": 0, "retrying": 1, "failed": 1, "skipped_no_token": 0}
+
+
+def test_unregistered_on_every_device_fails_without_retrying():
+    stats, updates, _ = deliver([entry("u1")], {"u1": ["a", "b"]}, {"a": DEAD, "b": DEAD})
+    assert updates["u1-outbox"]["status"] == "failed"
+    assert updates["u1-outbox"]["attempts"] == 1
+    assert stats["failed"] == 1
+
+
+def test_users_without_tokens_are_skipped():
+    stats, updates, sent = deliver([entry("u1"), entry("u2")], {"u2": ["b"]}, {"b": {"status": "ok", "id": "t"}})
+    assert updates["u1-outbox"]["status"] == "skipped"
+    assert "attempts" not in updates["u1-outbox"]
+    assert [message["user_id"] for message in sent] == ["u2"]
+    assert stats == {"sent": 1, "retrying": 0, "failed": 0, "skipped_no_token": 1}
@@ -0,0 +1,120 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import pytest
+
+import services.firebase_service as firebase_module
+from services.firebase_service import FirebaseService
+from services.notification_service import NotificationService
+
+NOW = datetime.now(timezone.utc)
+
+
+class FakeFirebase:
+    """Outbox entries queued for a receipt check, as get_due_receipt_checks returns them"""
+
+    def __init__(self, entries):
+        self.entries = entries
+        self.recorded = []
+        self.removed = []
+
+    def get_due_receipt_checks(self, limit):
+        due, self.entries = self.entries[:limit], self.entries[limit:]
+        return due
+
+    def update_receipt_checks(self, pending, retry_at):
+        self.recorded.append((pending, retry_at))
+        return True
+
+    def remove_push_tokens(self, dead_tokens):
+        self.removed.extend(dead_tokens)
+        return len(dead_tokens)
+
+
+class FakeClient:
+    def __init__(self, receipts):
+        self.receipts = receipts
+        self.requests = []
+
+    async def post(self, url, json, timeout):
+        self.requests.append(json["ids"])
+        data = {ticket_id: self.receipts[ticket_id] for ticket_id in json["ids"] if ticket_id in self.receipts}
+        return SimpleNamespace(status_code=200, json=lambda: {"data": data})
+
+
+@pytest.fixture
+def expo(monkeypatch):
+    def install(entries, receipts):
+        firebase = FakeFirebase(entries)
+        client = FakeClient(receipts)
+        monkeypatch.setattr(firebase_module, "FirebaseService", lambda: firebase)
+        monkeypatch.setattr(NotificationService, "_client", client)
+        return firebase, client
+    return install
+
+
+def entry(outbox_id, user_id, tickets, completed_at=None):
+    return {
+        "outbox_id": outbox_id,
+        "user_id": user_id,
+        "ticket_tokens": tickets,
+        "completed_at": completed_at or NOW - timedelta(minutes=20),
+    }
+
+
+def test_check_receipts_prunes_unregistered_tokens_and_keeps_unready_tickets(expo):
+    firebase, client = expo(
+        [
+            entry("o1", "u1", {"t1": "tok-a", "t2": "tok-b"}),
+            entry("o2", "u2", {"t3": "tok-c"}),
+        ],
+        {
+            "t1": {"status": "ok"},
+            "t3": {"status": "error", "details": {"error": "DeviceNotRegistered"}},
+        },
+    )
+    stats = asyncio.run(NotificationService().check_receipts())
+
+    assert client.requests == [["t1", "t2", "t3"]]
+    pending, retry_at = firebase.recorded[0]
+    # t2 has no receipt yet and stays queued; o2 is done
+    assert pending == {"o1": {"t2": "tok-b"}, "o2": {}}
+    assert retry_at > NOW
+    assert firebase.removed == [("u2", "tok-c")]
+    assert stats == {"checked": 2, "ok": 1, "errors": 1, "expired": 0, "tokens_removed": 1}
+
+
+def test_check_receipts_drops_expired_tickets_without_asking(expo):
+    firebase, client = expo([entry("o1", "u1", {"t1": "tok-a"}, NOW - timedelta(days=2))], {})
+    stats = asyncio.run(NotificationService().check_receipts())
+
+    assert client.requests == []
+    assert firebase.recorded[0][0] == {"o1": {}}
+    assert stats["expired"] == 1
+
+
+def test_check_receipts_pages_through_the_queue(expo):
+    entries = [entry(f"o{i}", "u1", {f"t{i}": f"tok-{i}"}) for i in range(5)]
+    firebase, _ = expo(entries, {f"t{i}": {"status": "ok"} for i in range(5)})
+    stats = asyncio.run(NotificationService().check_receipts(batch_size=2))
+
+    assert [sorted(pending) for pending, _ in firebase.recorded] == [["o0", "o1"], ["o2", "o3"], ["o4"]]
+    assert stats["ok"] == 5
+
+
+def test_remove_push_tokens_deletes_only_dead_devices(monkeypatch):
+    monkeypatch.setattr(firebase_module.FirebaseService, "__init__", lambda self: None)
+    service = FirebaseService()
+    service.db = MagicMock()
+    batch = service.db.batch.return_value
+    doc = MagicMock(id="u1", exists=True)
+    doc.to_dict.return_value = {"devices": {
+        "phone-1": {"token": "dead"},
+        "tablet": {"token": "live"},
+    }}
+    service.db.get_all.return_value = [doc]
+
+    assert service.remove_push_tokens([("u1", "dead")]) == 1
+    batch.update.assert_called_once_with(doc.reference, {"devices.`phone-1`": firebase_module.firestore.DELETE_FIELD})
@@ -0,0 +1,89 @@
+from datetime import timedelta
+
+import numpy as np
+
+from services.recipe_scorer import RecipeScorer
+from utils.dates import utc_now
+
+
+def expiring_in(days, hours=1):
+    return utc_now() + timedelta(days=days, hours=hours)
+
+
+def pantry(**days_left):
+    return [{"name": name, "expiration_date": expiring_in(days)} for name, days in days_left.items()]
+
+
+def names(results):
+    return [recipe["name"] for recipe in results]
+
+
+RECIPES = [
+    {"name": "omelette", "ingredients": ["egg", "milk", "butter"]},
+    {"name": "banana bread", "ingredients": ["banana", "egg", "butter", "flour"]},
+    {"name": "fried rice", "ingredients": ["rice", "egg", "onion"]},
+    {"name": "chicken curry", "ingredients": ["chicken", "onion", "rice", "coconut"]},
+]
+
+
+def test_scores_prefer_recipes_covering_more_of_the_pantry():
+    # Matched weight x share of the recipe covered: 3 x 3/3, 2 x 2/3, 2 x 2/4, 1 x 1/4
+    results = RecipeScorer(RECIPES).top_k(pantry(egg=10, milk=10, butter=10, rice=10), k=4)
+    assert names(results) == ["omelette", "fried rice", "banana bread", "chicken curry"]
+    assert [recipe["score"] for recipe in results] == [3.0, 1.333, 1.0, 0.25]
+    assert results[0]["missing_count"] == 0 and results[2]["missing_count"] == 2
+
+
+def test_urgent_ingredients_outweigh_fresh_ones():
+    scorer = RecipeScorer([{"name": "curry", "ingredients": ["chicken"]}, {"name": "pilaf", "ingredients": ["rice"]}])
+    assert names(scorer.top_k(pantry(chicken=0, rice=10))) == ["curry", "pilaf"]
+    assert names(scorer.top_k(pantry(chicken=10, rice=2))) == ["pilaf", "curry"]
+
+
+def test_urgency_weights_by_level():
+    scorer = RecipeScorer([{"name": "curry", "ingredients": ["chicken"]}])
+    vector = scorer.pantry_vector([
+        {"name": "chicken", "expiration_date": expiring_in(10)},
+        {"name": "chicken", "expiration_date": expiring_in(0)},  # the most urgent copy counts
+    ])
+    assert vector.tolist() == [RecipeScorer.URGENCY_WEIGHTS["expires_today"]]
+
+
+def test_expired_and_unknown_ingredients_score_zero():
+    scorer = RecipeScorer(RECIPES)
+    results = scorer.top_k([
+        {"name": "chicken", "expiration_date": utc_now() - timedelta(days=2)},
+        {"name": "saffron", "expiration_date": expiring_in(5)},
+    ])
+    assert results == []
+
+
+def test_zero_scores_are_excluded():
+    scorer = RecipeScorer(RECIPES)
+    results = scorer.top_k(pantry(banana=5), k=10)
+    assert names(results) == ["banana bread"]
+
+
+def test_top_k_ties_keep_recipe_order():
+    scorer = RecipeScorer([{"name": f"toast {i}", "ingredients": ["butter"]} for i in range(6)])
+    assert names(scorer.top_k(pantry(butter=10), k=3)) == ["toast 0", "toast 1", "toast 2"]
+
+
+def test_select_top_k_breaks_ties_at_the_cutoff_by_index():
+    scores = np.array([1.0, 3.0, 2.0, 3.0, 2.0, 0.0, 2.0], dtype=np.float32)
+    assert RecipeScorer._select_top_k(scores, 4).tolist() == [1, 3, 2, 4]
+    assert RecipeScorer._select_top_k(scores, 100).tolist() == [1, 3, 2, 4, 6, 0]
+    assert RecipeScorer._select_top_k(scores, 0).tolist() == []
+
+
+def test_rank_orders_suggestions_and_keeps_unmatched_ones_last():
+    suggestions = [
+        {"name": "salad", "ingredients_needed": ["lettuce"]},
+        {"name": "pancakes", "ingredients_needed": ["egg", "milk"]},
+        {"name": "rice bowl", "ingredients_needed": ["rice", "egg"]},
+    ]
+    ranked = RecipeScorer.rank(suggestions, pantry(egg=0, milk=10, rice=10), "ingredients_needed")
+    # pancakes and rice bowl tie (one urgent, one fresh ingredient each); ties keep the suggestion order
+    assert names(ranked) == ["pancakes", "rice bowl", "salad"]
+    assert ranked[-1]["score"] == 0.0 and ranked[-1]["missing_count"] == 1
+    assert "index" not in ranked[0] and ranked[0]["ingredients_needed"]
@@ -0,0 +1,51 @@
+from services.shelf_life_matcher import ShelfLifeMatcher
+
+matcher = ShelfLifeMatcher()
+
+
+def test_longest_pattern_wins():
+    assert matcher.shelf_life_days("chicken") == 2
+    assert matcher.shelf_life_days("chicken broth") == 365
+    assert matcher.shelf_life_days("low sodium chicken broth") == 365
+    assert matcher.shelf_life_days("chicken noodle soup") == 730
+    assert matcher.match(["fresh", "chicken", "broth"])["name"] == "chicken broth"
+    assert matcher.match(["ground", "beef", "chicken"])["name"] == "ground beef"
+
+
+def test_equal_length_goes_to_the_rightmost_match():
+    assert matcher.match(["beef", "pork"])["name"] == "pork"
+
+
+def test_abbreviated_names_are_normalized_before_matching():
+    assert matcher.shelf_life_days("GV CHKN BRTH") == 365
+
+
+def test_frozen_uses_the_items_own_frozen_life():
+    assert matcher.shelf_life_days("frozen chicken") == 270
+    # Per-item values win over the storage default, even when shorter
+    assert matcher.shelf_life_days("frozen bacon") == 30
+
+
+def test_canned_and_dried_fall_back_to_storage_defaults():
+    defaults = matcher.storage_defaults
+    assert matcher.shelf_life_days("canned corn") == defaults["canned"]
+    assert matcher.shelf_life_days("dried beans") == max(matcher.shelf_life_days("beans"), defaults["dried"])
+
+
+def test_modifier_that_is_part_of_the_pattern_is_not_applied_again():
+    assert matcher.shelf_life_days("frozen pizza") == 180
+
+
+def test_cooked_shortens_shelf_life():
+    assert matcher.shelf_life_days("cooked ham") == min(5, matcher.storage_defaults["cooked"])
+
+
+def test_explicit_modifiers_override_the_name():
+    assert matcher.shelf_life_days("chicken", ["frozen"]) == 270
+    assert matcher.shelf_life_days("frozen chicken", []) == 2
+
+
+def test_unknown_names():
+    assert matcher.shelf_life_days("unknown thing") is None
+    assert matcher.shelf_life_days("frozen mystery") is None
+    assert matcher.match([]) is None
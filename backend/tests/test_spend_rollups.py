@@ -0,0 +1,99 @@
+from datetime import datetime, timezone
+from zoneinfo import ZoneInfo
+
+from services.firebase_service import FirebaseService
+
+NEW_YORK = ZoneInfo("America/New_York")
+
+
+def receipt(purchase_date, amount, zone=None):
+    return {
+        "purchase_date": purchase_date,
+        "total_amount": amount,
+        "spend_periods": FirebaseService.rollup_periods(purchase_date, zone),
+    }
+
+
+def test_rollup_periods_in_the_users_timezone():
+    # 02:00 UTC on Monday Oct 19 is still Sunday Oct 18 in New York
+    purchase = datetime(2026, 10, 19, 2, 0, tzinfo=timezone.utc)
+    assert FirebaseService.rollup_periods(purchase, NEW_YORK) == {
+        "day": "2026-10-18", "week": "2026-10-12", "month": "2026-10-01"
+    }
+    assert FirebaseService.rollup_periods(purchase) == {
+        "day": "2026-10-19", "week": "2026-10-19", "month": "2026-10-01"
+    }
+
+
+def test_rollup_periods_reads_naive_dates_in_the_users_timezone():
+    naive = FirebaseService.rollup_periods(datetime(2026, 10, 31, 23, 30), NEW_YORK)
+    iso = FirebaseService.rollup_periods("2026-10-31T23:30:00", NEW_YORK)
+    aware = FirebaseService.rollup_periods(datetime(2026, 11, 1, 3, 30, tzinfo=timezone.utc), NEW_YORK)
+    assert naive == iso == aware == {"day": "2026-10-31", "week": "2026-10-26", "month": "2026-10-01"}
+
+
+def test_rollup_periods_week_spans_months():
+    assert FirebaseService.rollup_periods(datetime(2026, 3, 1, 12, tzinfo=timezone.utc)) == {
+        "day": "2026-03-01", "week": "2026-02-23", "month": "2026-03-01"
+    }
+
+
+def test_rollup_periods_without_a_date():
+    assert FirebaseService.rollup_periods(None) == {}
+    assert FirebaseService.rollup_periods("yesterday") == {}
+
+
+def test_deltas_for_a_new_receipt():
+    deltas = FirebaseService._rollup_deltas(None, receipt(datetime(2026, 10, 19, 12, tzinfo=timezone.utc), 12.5))
+    assert deltas == {
+        ("day", "2026-10-19"): [12.5, 1],
+        ("week", "2026-10-19"): [12.5, 1],
+        ("month", "2026-10-01"): [12.5, 1],
+    }
+
+
+def test_deltas_for_a_deleted_receipt():
+    deltas = FirebaseService._rollup_deltas(receipt(datetime(2026, 10, 19, 12, tzinfo=timezone.utc), 12.5), None)
+    assert deltas[("month", "2026-10-01")] == [-12.5, -1]
+
+
+def test_deltas_moving_a_receipt_across_a_month_boundary():
+    # Sat Oct 31 -> Sun Nov 1: same week, different day and month
+    before = receipt(datetime(2026, 10, 31, 12, tzinfo=timezone.utc), 20.0)
+    after = receipt(datetime(2026, 11, 1, 12, tzinfo=timezone.utc), 20.0)
+    assert FirebaseService._rollup_deltas(before, after) == {
+        ("day", "2026-10-31"): [-20.0, -1],
+        ("day", "2026-11-01"): [20.0, 1],
+        ("month", "2026-10-01"): [-20.0, -1],
+        ("month", "2026-11-01"): [20.0, 1],
+    }
+
+
+def test_deltas_moving_a_receipt_across_a_week_boundary():
+    # Sun Oct 18 -> Mon Oct 19 with a new amount: every period changes or the amount does
+    before = receipt(datetime(2026, 10, 18, 12, tzinfo=timezone.utc), 10.0)
+    after = receipt(datetime(2026, 10, 19, 12, tzinfo=timezone.utc), 15.0)
+    assert FirebaseService._rollup_deltas(before, after) == {
+        ("day", "2026-10-18"): [-10.0, -1],
+        ("day", "2026-10-19"): [15.0, 1],
+        ("week", "2026-10-12"): [-10.0, -1],
+        ("week", "2026-10-19"): [15.0, 1],
+        ("month", "2026-10-01"): [5.0, 0],
+    }
+
+
+def test_deltas_use_the_stamped_periods():
+    # Counted under the periods stamped at write time, even if the date would now bucket differently
+    before = receipt(datetime(2026, 10, 19, 2, tzinfo=timezone.utc), 8.0, NEW_YORK)
+    after = receipt(datetime(2026, 10, 19, 2, tzinfo=timezone.utc), 8.0)
+    deltas = FirebaseService._rollup_deltas(before, after)
+    assert deltas[("day", "2026-10-18")] == [-8.0, -1]
+    assert deltas[("day", "2026-10-19")] == [8.0, 1]
+    assert ("month", "2026-10-01") not in deltas
+
+
+def test_unstamped_receipts_count_nowhere():
+    legacy = {"purchase_date": datetime(2026, 10, 19, tzinfo=timezone.utc), "total_amount": 9.0}
+    assert FirebaseService._rollup_deltas(legacy, None) == {}
+    deltas = FirebaseService._rollup_deltas(legacy, receipt(legacy["purchase_date"], 9.0))
+    assert deltas[("day", "2026-10-19")] == [9.0, 1]
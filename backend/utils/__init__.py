@@ -0,0 +1,3 @@
+from .dates import utc_now, user_zone, zone_of, to_utc, to_local, local_date, day_bounds, period_start
+
+__all__ = ["utc_now", "user_zone", "zone_of", "to_utc", "to_local", "local_date", "day_bounds", "period_start"]
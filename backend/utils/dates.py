@@ -0,0 +1,83 @@
+"""
+Date handling shared by the routers, analytics and scheduled jobs.
+
+One rule everywhere: instants are stored in UTC, and anything bucketed by
+day, week or month uses the user's timezone (`preferences.timezone`,
+default UTC). A naive datetime - a date typed by the user or read off a
+receipt - is a wall-clock time in the user's timezone.
+"""
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Any, Dict, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+UTC = timezone.utc
+GRANULARITIES = ("day", "week", "month")
+
+
+def utc_now() -> datetime:
+    return datetime.now(UTC)
+
+
+def user_zone(timezone_name: Optional[str]) -> ZoneInfo:
+    """ZoneInfo for a profile timezone name; UTC if missing or unknown"""
+    try:
+        return ZoneInfo(timezone_name or "UTC")
+    except Exception:
+        return ZoneInfo("UTC")
+
+
+def zone_of(user: Optional[Dict[str, Any]]) -> ZoneInfo:
+    """Timezone of a user document (or the current_user dict)"""
+    return user_zone(((user or {}).get("preferences") or {}).get("timezone"))
+
+
+def parse_datetime(value: Any) -> Optional[datetime]:
+    """datetime from a Firestore value, datetime, date or ISO string; None if it isn't one"""
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            return None
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, date):
+        return datetime.combine(value, time())
+    return None
+
+
+def to_utc(value: Any, zone: Optional[ZoneInfo] = None) -> Optional[datetime]:
+    """Aware UTC datetime; naive values are wall-clock times in `zone` (default UTC)"""
+    value = parse_datetime(value)
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=zone or UTC)
+    return value.astimezone(UTC)
+
+
+def to_local(value: Any, zone: ZoneInfo) -> Optional[datetime]:
+    """The same instant as an aware datetime in `zone`"""
+    value = to_utc(value, zone)
+    return value.astimezone(zone) if value is not None else None
+
+
+def local_date(value: Any, zone: ZoneInfo) -> Optional[date]:
+    """Calendar day an instant falls on in `zone`"""
+    value = to_local(value, zone)
+    return value.date() if value is not None else None
+
+
+def day_bounds(day: date, zone: ZoneInfo) -> Tuple[datetime, datetime]:
+    """UTC [start, end) of a calendar day in `zone` (23 or 25 hours long across DST changes)"""
+    start = datetime.combine(day, time(), zone)
+    end = datetime.combine(day + timedelta(days=1), time(), zone)
+    return start.astimezone(UTC), end.astimezone(UTC)
+
+
+def period_start(day: date, granularity: str) -> date:
+    """First day of the day / week (Monday) / month containing `day`"""
+    if granularity == "week":
+        return day - timedelta(days=day.weekday())
+    if granularity == "month":
+        return day.replace(day=1)
+    return day
@@ -5,9 +5,11 @@ import { HapticTab } from "@/components/haptic-tab";
 import { IconSymbol } from "@/components/ui/icon-symbol";
 import { Colors } from "@/constants/theme";
 import { useColorScheme } from "@/hooks/use-color-scheme";
+import { useUnreadNotifications } from "@/hooks/use-unread-notifications";
 
 export default function TabLayout() {
   const colorScheme = useColorScheme();
+  const unreadNotifications = useUnreadNotifications();
 
   return (
     <Tabs
@@ -21,6 +23,7 @@ export default function TabLayout() {
         name="index"
         options={{
           title: "Home",
+          tabBarBadge: unreadNotifications > 0 ? unreadNotifications : undefined,
           tabBarIcon: ({ color }) => (
             <IconSymbol size={28} name="house.fill" color={color} />
           ),
@@ -18,15 +18,11 @@ export default function HomeScreen() {
 
   const loadDashboardData = async () => {
     try {
-      const [today, spending, calories] = await Promise.all([
-        analyticsAPI.today(),
-        analyticsAPI.spending(14),
-        analyticsAPI.calories(14),
-      ]);
+      const dashboard = await analyticsAPI.dashboard(14, ["today", "spending", "calories"]);
       
-      setTodayData(today);
-      setSpendingTrends(spending);
-      setCalorieTrends(calories);
+      setTodayData(dashboard.today);
+      setSpendingTrends(dashboard.spending);
+      setCalorieTrends(dashboard.calories);
     } catch (error: any) {
       console.log("Dashboard data not available yet - backend not connected or not authenticated");
       // Set default/mock data for display
@@ -0,0 +1,15 @@
+import { useEffect, useState } from 'react';
+
+import { subscribeToNotifications } from '@/services/notifications';
+
+/**
+ * Live unread notification count, pushed over the notification stream
+ * (falls back to polling while the stream is unavailable).
+ */
+export function useUnreadNotifications(): number {
+  const [count, setCount] = useState(0);
+
+  useEffect(() => subscribeToNotifications({ onUnreadCount: setCount }), []);
+
+  return count;
+}
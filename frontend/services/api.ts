@@ -48,6 +48,72 @@ async function apiRequest<T>(
   return response.json();
 }
 
+// Server-Sent Events over XMLHttpRequest (React Native has no EventSource):
+// the response text grows as events arrive and is parsed incrementally.
+// Returns a function that closes the stream.
+const MAX_STREAM_BYTES = 1_000_000; // reconnect before responseText grows too large
+
+function openEventStream(
+  endpoint: string,
+  onEvent: (event: string, data: any) => void,
+  onClose: (error?: Error) => void
+): () => void {
+  let xhr: XMLHttpRequest | null = null;
+  let closed = false;
+
+  const finish = (error?: Error) => {
+    if (closed) return;
+    closed = true;
+    xhr?.abort();
+    onClose(error);
+  };
+
+  getAuthToken().then((token) => {
+    if (closed) return;
+    const request = new XMLHttpRequest();
+    xhr = request;
+    request.open('GET', `${API_URL}${endpoint}`);
+    request.setRequestHeader('Accept', 'text/event-stream');
+    if (token) {
+      request.setRequestHeader('Authorization', `Bearer ${token}`);
+    }
+
+    let seen = 0;
+    let buffer = '';
+    request.onprogress = () => {
+      if (request.status !== 200) return;
+      buffer += request.responseText.slice(seen);
+      seen = request.responseText.length;
+      const blocks = buffer.split('\n\n');
+      buffer = blocks.pop() ?? '';
+      for (const block of blocks) {
+        let event = 'message';
+        const data: string[] = [];
+        for (const line of block.split('\n')) {
+          if (line.startsWith('event:')) event = line.slice(6).trim();
+          else if (line.startsWith('data:')) data.push(line.slice(5).trim());
+        }
+        if (data.length) {
+          try {
+            onEvent(event, JSON.parse(data.join('\n')));
+          } catch (error) {
+            console.error('Bad stream event:', error);
+          }
+        }
+      }
+      if (seen > MAX_STREAM_BYTES) finish();
+    };
+    request.onload = () => finish(request.status === 200 ? undefined : new Error(`HTTP ${request.status}`));
+    request.onerror = () => finish(new Error('Stream connection failed'));
+    request.send();
+  }).catch((error) => finish(error));
+
+  return () => {
+    closed = true;
+    xhr?.abort();
+  };
+}
+
 // Receipt API
 export const receiptAPI = {
   upload: async (imageBase64: string, purchaseDate?: string) => {
@@ -143,8 +209,9 @@ export const comparisonAPI = {
 
 // Analytics API
 export const analyticsAPI = {
-  spending: async (days: number = 14) => {
-    return apiRequest(`/api/analytics/spending?days=${days}`);
+  spending: async (days: number = 14, granularity?: 'day' | 'week' | 'month') => {
+    const params = granularity ? `&granularity=${granularity}` : '';
+    return apiRequest(`/api/analytics/spending?days=${days}${params}`);
   },
 
   calories: async (days: number = 14) => {
@@ -162,6 +229,11 @@ export const analyticsAPI = {
   today: async () => {
     return apiRequest('/api/analytics/today');
   },
+
+  dashboard: async (days: number = 14, sections?: string[]) => {
+    const params = sections ? `&sections=${sections.join(',')}` : '';
+    return apiRequest(`/api/analytics/dashboard?days=${days}${params}`);
+  },
 };
 
 // Notifications API
@@ -177,10 +249,31 @@ export const notificationsAPI = {
     });
   },
 
-  registerToken: async (expoPushToken: string) => {
+  markAllRead: async () => {
+    return apiRequest('/api/notifications/mark-all-read', {
+      method: 'PUT',
+    });
+  },
+
+  unreadCount: async () => {
+    return apiRequest<{ count: number }>('/api/notifications/unread-count');
+  },
+
+  // Live `unread_count`, `notification` and `read` events; see subscribeToNotifications
+  stream: (
+    onEvent: (event: string, data: any) => void,
+    onClose: (error?: Error) => void
+  ) => {
+    return openEventStream('/api/notifications/stream', onEvent, onClose);
+  },
+
+  registerToken: async (
+    expoPushToken: string,
+    device?: { platform?: string; device_name?: string | null }
+  ) => {
     return apiRequest('/api/notifications/register-token', {
       method: 'POST',
-      body: JSON.stringify({ expo_push_token: expoPushToken }),
+      body: JSON.stringify({ expo_push_token: expoPushToken, ...device }),
     });
   },
 
@@ -196,7 +289,11 @@ export const authAPI = {
   setupProfile: async (preferences: any) => {
     return apiRequest('/api/auth/setup-profile', {
       method: 'POST',
-      body: JSON.stringify(preferences),
+      // Notifications are scheduled in the device's timezone
+      body: JSON.stringify({
+        timezone: Intl.DateTimeFormat().resolvedOptions().timeZone,
+        ...preferences,
+      }),
     });
   },
 
@@ -44,7 +44,10 @@ export async function registerForPushNotificationsAsync(): Promise<string | null
 
     // Register token with backend
     try {
-      await notificationsAPI.registerToken(token);
+      await notificationsAPI.registerToken(token, {
+        platform: Platform.OS,
+        device_name: Device.deviceName ?? Device.modelName,
+      });
       console.log('Push token registered with backend:', token);
     } catch (error) {
       console.error('Error registering push token:', error);
@@ -95,3 +98,80 @@ export async function schedulePantryReminder() {
     },
   });
 }
+
+// Poll the unread count only while the live stream is down
+const FALLBACK_POLL_MS = 60_000;
+const MAX_RECONNECT_DELAY_MS = 60_000;
+
+export interface NotificationStreamHandlers {
+  onUnreadCount?: (count: number) => void;
+  onNotification?: (notification: any) => void;
+  onRead?: (notificationIds: string[]) => void;
+}
+
+/**
+ * Follow the user's notifications over the SSE stream. If the stream
+ * can't be opened or drops, the unread count is polled until it
+ * reconnects (with exponential backoff). Returns an unsubscribe function.
+ */
+export function subscribeToNotifications(handlers: NotificationStreamHandlers): () => void {
+  let stopped = false;
+  let closeStream: (() => void) | null = null;
+  let pollTimer: ReturnType<typeof setInterval> | null = null;
+  let reconnectTimer: ReturnType<typeof setTimeout> | null = null;
+  let reconnectDelay = 1000;
+
+  const poll = async () => {
+    try {
+      const { count } = await notificationsAPI.unreadCount();
+      handlers.onUnreadCount?.(count);
+    } catch (error) {
+      console.error('Error polling unread count:', error);
+    }
+  };
+
+  const startPolling = () => {
+    if (pollTimer) return;
+    poll();
+    pollTimer = setInterval(poll, FALLBACK_POLL_MS);
+  };
+
+  const stopPolling = () => {
+    if (pollTimer) {
+      clearInterval(pollTimer);
+      pollTimer = null;
+    }
+  };
+
+  const connect = () => {
+    reconnectTimer = null;
+    closeStream = notificationsAPI.stream(
+      (event, data) => {
+        // The stream is live again
+        reconnectDelay = 1000;
+        stopPolling();
+        if (event === 'unread_count') handlers.onUnreadCount?.(data.count);
+        else if (event === 'notification') handlers.onNotification?.(data);
+        else if (event === 'read') handlers.onRead?.(data.notification_ids ?? []);
+      },
+      (error) => {
+        if (stopped) return;
+        if (error) {
+          console.log('Notification stream closed, polling until it reconnects:', error.message);
+          startPolling();
+        }
+        reconnectTimer = setTimeout(connect, reconnectDelay);
+        reconnectDelay = Math.min(reconnectDelay * 2, MAX_RECONNECT_DELAY_MS);
+      }
+    );
+  };
+
+  connect();
+
+  return () => {
+    stopped = true;
+    closeStream?.();
+    stopPolling();
+    if (reconnectTimer) clearTimeout(reconnectTimer);
+  };
+}